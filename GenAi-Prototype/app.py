@@ -1,47 +1,15 @@
 # import packages
-from dotenv import load_dotenv
-import os
-import google.generativeai as genai
 import streamlit as st
+from llm import configure_gemini, get_gemini_model
 
-# load environment variables from .env file
-load_dotenv()
-
-# Get Gemini API key from environment
-api_key = os.getenv("GEMINI_API_KEY")
-if not api_key:
+# Configure Gemini client (loads .env; set LLM_STUB_URL to use the local stub server)
+if not configure_gemini():
     raise ValueError("GEMINI_API_KEY not found in environment. Please set it in your .env file.")
 
-# Configure Gemini client
-genai.configure(api_key=api_key)
-
 @st.cache_data
 def get_gemini_response(user_prompt, temperature):
-    # Configure safety settings to be less restrictive
-    safety_settings = [
-        {
-            "category": "HARM_CATEGORY_HARASSMENT",
-            "threshold": "BLOCK_NONE"
-        },
-        {
-            "category": "HARM_CATEGORY_HATE_SPEECH", 
-            "threshold": "BLOCK_NONE"
-        },
-        {
-            "category": "HARM_CATEGORY_SEXUALLY_EXPLICIT",
-            "threshold": "BLOCK_NONE"
-        },
-        {
-            "category": "HARM_CATEGORY_DANGEROUS_CONTENT",
-            "threshold": "BLOCK_NONE"
-        }
-    ]
-    
-    # Create a model instance (Gemini Pro) with relaxed safety settings
-    model = genai.GenerativeModel(
-        "models/gemini-2.5-flash",
-        safety_settings=safety_settings
-    )
+    # Create a model instance (Gemini 2.5 Flash) with relaxed safety settings
+    model = get_gemini_model()
     
     try:
         # Send a prompt and get a response (simple approach like debug version)
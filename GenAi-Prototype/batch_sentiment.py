@@ -0,0 +1,265 @@
+"""Headless sentiment enrichment of the review CSV, with checkpointing and resume.
+
+Streams the CSV in chunks, classifies reviews with the same structured Gemini
+batches as the dashboard (optionally labelling confident reviews with the
+local pre-classifier first) and records every label in a SQLite checkpoint as
+soon as its batch returns. An interrupted or failed run picks up where it
+stopped: reviews already in the checkpoint are never sent again. Near-duplicate
+reviews within a chunk are clustered first (see dedup.py) and only one review
+per cluster is sent; the others are saved with its label. At the end
+the labels are joined back onto the CSV and written to a Parquet file that
+data_analyzer.py can load with "Load Batch Sentiment".
+
+    python batch_sentiment.py                                  # customer_reviews.csv -> customer_reviews_sentiment.parquet
+    python batch_sentiment.py --data big_reviews.csv --concurrency 16 --local
+    LLM_STUB_URL=http://127.0.0.1:8765 python batch_sentiment.py --chunk-size 5000
+"""
+# import packages
+import argparse
+import hashlib
+import os
+import sqlite3
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import pandas as pd
+
+from dedup import find_near_duplicates
+from llm import GEMINI_MODEL, SENTIMENT_BATCH_SIZE, classify_sentiment_batch, configure_gemini
+from local_sentiment import DEFAULT_MIN_CONFIDENCE, MODEL_PATH, LocalSentimentModel, train_on_reviews
+from review_pipeline import get_dataset_path, load_reviews
+
+CHUNK_SIZE = 10_000
+MAX_ATTEMPTS = 3
+# SQLite limits the number of bound parameters per statement
+QUERY_BATCH = 500
+
+
+# Helper function to get the checkpoint and output paths that sit next to a CSV
+def sidecar_paths(csv_path):
+    """Returns (checkpoint path, enriched Parquet path)."""
+    base = os.path.splitext(csv_path)[0]
+    return f"{base}_sentiment.sqlite", f"{base}_sentiment.parquet"
+
+
+# Helper function to hash review texts; identical reviews share one label
+def text_hashes(texts):
+    return [hashlib.sha1(str(text).encode("utf-8")).hexdigest() for text in texts]
+
+
+class Checkpoint:
+    """SQLite table of finished labels keyed by (review text hash, model)."""
+
+    def __init__(self, path, model):
+        self.model = model
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS labels ("
+            "text_hash TEXT, model TEXT, label TEXT, confidence REAL, source TEXT, labelled_at REAL, "
+            "PRIMARY KEY (text_hash, model))"
+        )
+        self.connection.commit()
+
+    def lookup(self, hashes):
+        """Returns {text hash: (label, confidence, source)} for hashes already labelled."""
+        found = {}
+        unique = list(dict.fromkeys(hashes))
+        for start in range(0, len(unique), QUERY_BATCH):
+            batch = unique[start:start + QUERY_BATCH]
+            rows = self.connection.execute(
+                f"SELECT text_hash, label, confidence, source FROM labels "
+                f"WHERE model = ? AND text_hash IN ({','.join('?' * len(batch))})",
+                [self.model] + batch,
+            )
+            found.update((row[0], row[1:]) for row in rows)
+        return found
+
+    def save(self, results, source):
+        """results maps text hash -> (label, confidence); committed immediately."""
+        now = time.time()
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO labels VALUES (?, ?, ?, ?, ?, ?)",
+            [(h, self.model, label, confidence, source, now) for h, (label, confidence) in results.items()],
+        )
+        self.connection.commit()
+
+    def count(self):
+        return self.connection.execute("SELECT COUNT(*) FROM labels WHERE model = ?", [self.model]).fetchone()[0]
+
+    def close(self):
+        self.connection.close()
+
+
+# Helper function to classify one batch with retries and exponential backoff
+def classify_batch(texts_by_hash, model):
+    """Returns {text hash: (label, confidence)}; raises after MAX_ATTEMPTS failures."""
+    hashes = list(texts_by_hash)
+    for attempt in range(MAX_ATTEMPTS):
+        try:
+            results = classify_sentiment_batch(dict(enumerate(texts_by_hash.values())), model)
+            return {hashes[row_id]: result for row_id, result in results.items()}
+        except Exception:
+            if attempt == MAX_ATTEMPTS - 1:
+                raise
+            time.sleep(2 ** attempt)
+
+
+# Function to label every review in the CSV that is not in the checkpoint yet
+def run_job(csv_path, checkpoint, model=GEMINI_MODEL, chunk_size=CHUNK_SIZE, concurrency=8,
+            local_model=None, min_confidence=DEFAULT_MIN_CONFIDENCE, limit=None, dedup=True):
+    """Returns a stats dict. Batches run on a pool with at most 2 x concurrency in flight.
+
+    With dedup on, the reviews a chunk still needs from Gemini are clustered
+    by near-duplicate text and only each cluster's representative is sent.
+    """
+    stats = {"rows": 0, "already_done": 0, "local": 0, "gemini": 0, "duplicates": 0,
+             "failed_batches": 0, "last_error": None}
+    start = time.perf_counter()
+    in_flight = {}
+
+    # Helper function to record finished batches; failures are left for the next run
+    def collect(futures):
+        for future in futures:
+            batch_size, members = in_flight.pop(future)
+            try:
+                results = future.result()
+            except Exception as e:
+                stats["failed_batches"] += 1
+                stats["last_error"] = str(e)
+                continue
+            checkpoint.save(results, "gemini")
+            stats["gemini"] += batch_size
+            # Members of a cluster take the label of the review that was sent
+            copies = {m: results[h] for h in results for m in members.get(h, ())}
+            checkpoint.save(copies, "duplicate")
+            stats["duplicates"] += len(copies)
+
+    pool = ThreadPoolExecutor(max_workers=concurrency)
+    try:
+        for chunk in pd.read_csv(csv_path, chunksize=chunk_size, usecols=["SUMMARY"], nrows=limit):
+            texts = chunk["SUMMARY"].fillna("").astype(str)
+            hashes = text_hashes(texts)
+            stats["rows"] += len(chunk)
+            done = checkpoint.lookup(hashes)
+            pending = {h: t for h, t in zip(hashes, texts) if h not in done}
+            stats["already_done"] += len(chunk) - sum(h in pending for h in hashes)
+
+            # Confident local predictions are saved straight away; the rest go to Gemini
+            if local_model is not None and pending:
+                labels, confidence = local_model.predict(list(pending.values()))
+                confident = {h: (label, float(c)) for h, label, c in zip(pending, labels, confidence) if c >= min_confidence}
+                checkpoint.save(confident, "local")
+                stats["local"] += len(confident)
+                pending = {h: t for h, t in pending.items() if h not in confident}
+
+            # Send one review per near-duplicate cluster; the members wait for its label
+            members = {}
+            if dedup and len(pending) > 1:
+                pending_hashes = list(pending)
+                representatives = find_near_duplicates(list(pending.values()))
+                for h, rep in zip(pending_hashes, representatives):
+                    if pending_hashes[rep] != h:
+                        members.setdefault(pending_hashes[rep], []).append(h)
+                copied = {m for hashes in members.values() for m in hashes}
+                pending = {h: t for h, t in pending.items() if h not in copied}
+
+            items = list(pending.items())
+            for batch_start in range(0, len(items), SENTIMENT_BATCH_SIZE):
+                batch = dict(items[batch_start:batch_start + SENTIMENT_BATCH_SIZE])
+                # Bounded concurrency: wait for a batch to finish before queueing more
+                while len(in_flight) >= 2 * concurrency:
+                    finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    collect(finished)
+                batch_members = {h: members[h] for h in batch if h in members}
+                in_flight[pool.submit(classify_batch, batch, model)] = (len(batch), batch_members)
+            print(f"  {stats['rows']:,} rows read, {checkpoint.count():,} labels checkpointed")
+        collect(wait(in_flight).done)
+    except KeyboardInterrupt:
+        # Keep what already finished; queued batches are dropped and retried on the next run
+        pool.shutdown(wait=False, cancel_futures=True)
+        collect([f for f in list(in_flight) if f.done() and not f.cancelled()])
+        stats["interrupted"] = True
+    finally:
+        pool.shutdown(wait=False)
+    stats["wall_seconds"] = time.perf_counter() - start
+    return stats
+
+
+# Function to join the checkpointed labels onto the CSV and write the enriched Parquet file
+def write_enriched(csv_path, checkpoint, output_path, chunk_size=CHUNK_SIZE, limit=None):
+    """Writes the CSV rows plus AI_Sentiment, AI_Confidence and AI_Source. Returns rows without a label."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    unlabelled = 0
+    writer = None
+    temp_path = f"{output_path}.tmp"
+    try:
+        for chunk in pd.read_csv(csv_path, chunksize=chunk_size, nrows=limit):
+            hashes = text_hashes(chunk["SUMMARY"].fillna("").astype(str))
+            found = checkpoint.lookup(hashes)
+            rows = [found.get(h, (None, None, None)) for h in hashes]
+            chunk["AI_Sentiment"] = pd.Series([r[0] for r in rows], index=chunk.index, dtype="string")
+            chunk["AI_Confidence"] = pd.Series([r[1] for r in rows], index=chunk.index, dtype="float64")
+            chunk["AI_Source"] = pd.Series([r[2] for r in rows], index=chunk.index, dtype="string")
+            unlabelled += int(chunk["AI_Sentiment"].isna().sum())
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(temp_path, table.schema)
+            writer.write_table(table.cast(writer.schema))
+    finally:
+        if writer is not None:
+            writer.close()
+    # Replace the previous output in one step so the dashboard never reads a partial file
+    if writer is not None:
+        os.replace(temp_path, output_path)
+    return unlabelled
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Label every review with Gemini, resumably, outside Streamlit.")
+    parser.add_argument("--data", default=get_dataset_path(), help="Review CSV with a SUMMARY column")
+    parser.add_argument("--model", default=GEMINI_MODEL)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="CSV rows read at a time")
+    parser.add_argument("--concurrency", type=int, default=8, help="Gemini batches in parallel")
+    parser.add_argument("--local", action="store_true", help="Label confident reviews with the local pre-classifier")
+    parser.add_argument("--min-confidence", type=float, default=DEFAULT_MIN_CONFIDENCE)
+    parser.add_argument("--no-dedup", action="store_true", help="Send near-duplicate reviews to Gemini too")
+    parser.add_argument("--limit", type=int, help="Only process the first N rows")
+    parser.add_argument("--checkpoint", help="SQLite checkpoint (default: next to the CSV)")
+    parser.add_argument("--output", help="Enriched Parquet file (default: next to the CSV)")
+    args = parser.parse_args()
+
+    checkpoint_path, output_path = sidecar_paths(args.data)
+    checkpoint_path = args.checkpoint or checkpoint_path
+    output_path = args.output or output_path
+    if not configure_gemini():
+        raise SystemExit("GEMINI_API_KEY not found (or set LLM_STUB_URL to use the stub server).")
+
+    local_model = None
+    if args.local:
+        local_model = LocalSentimentModel.load() if os.path.exists(MODEL_PATH) else train_on_reviews(load_reviews(args.data))
+
+    checkpoint = Checkpoint(checkpoint_path, args.model)
+    try:
+        stats = run_job(args.data, checkpoint, args.model, args.chunk_size, args.concurrency,
+                        local_model, args.min_confidence, args.limit, not args.no_dedup)
+        print(f"Read {stats['rows']:,} rows in {stats['wall_seconds']:.1f}s: {stats['already_done']:,} already labelled, "
+              f"{stats['local']:,} labelled locally, {stats['gemini']:,} labelled by Gemini, "
+              f"{stats['duplicates']:,} copied from a near-duplicate")
+        if stats["duplicates"]:
+            print(f"  Dedup ratio: {stats['duplicates'] / (stats['gemini'] + stats['duplicates']):.0%} of the reviews needing Gemini were near-duplicates")
+        if stats["failed_batches"]:
+            print(f"  {stats['failed_batches']} batches failed (last error: {stats['last_error']}); rerun to retry them")
+        if stats.get("interrupted"):
+            print(f"Interrupted; progress is saved in {checkpoint_path}. Rerun the same command to resume.")
+            return
+        unlabelled = write_enriched(args.data, checkpoint, output_path, args.chunk_size, args.limit)
+        print(f"Wrote {output_path}" + (f" ({unlabelled:,} rows still unlabelled)" if unlabelled else ""))
+    finally:
+        checkpoint.close()
+
+
+if __name__ == "__main__":
+    main()
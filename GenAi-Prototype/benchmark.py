@@ -0,0 +1,269 @@
+"""Benchmarks for the data_analyzer.py data path.
+
+Builds synthetic review and shipping datasets (same schema as data/*.csv),
+runs each stage headlessly and records wall time and peak traced memory.
+
+    python benchmark.py                       # run and compare with the stored baseline
+    python benchmark.py --sizes 1000 100000   # smaller run
+    python benchmark.py --save-baseline       # overwrite benchmark_baseline.json
+
+Each stage runs once untimed before it is measured. Regenerate the baseline
+whenever a stage is added, so the new stage is compared too.
+
+The run exits with status 1 when a stage is slower than the baseline by more
+than --tolerance, its peak memory grows by more than --memory-tolerance, or
+the stub model calls slow down by more than --model-tolerance, so it can gate
+CI. Changes smaller than --min-seconds (or 1 MB, or 0.5 ms) are never flagged.
+"""
+# import packages
+import argparse
+import io
+import json
+import os
+import platform
+import tempfile
+import time
+import tracemalloc
+
+import matplotlib
+matplotlib.use("Agg")
+import altair as alt
+import matplotlib.pyplot as plt
+
+import charts
+from review_pipeline import (
+    add_sentiment_features,
+    filter_by_product,
+    load_reviews,
+    parse_reviews,
+    sentiment_by_product,
+    sentiment_counts,
+)
+from shipping_analytics import load_shipping_logs
+from synthetic_data import make_reviews, make_shipping_logs
+
+DEFAULT_SIZES = [1_000, 100_000, 1_000_000]
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+
+
+# Helper function to mirror st.altair_chart, which ships datasets as Arrow instead of inline JSON
+def arrow_data_transformer(data):
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(data, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return {"name": f"arrow_{sink.getvalue().size}"}
+
+
+alt.data_transformers.register("benchmark_arrow", arrow_data_transformer)
+
+
+# Helper function to time a stage (best of `repeat`) and trace its peak memory on one extra run
+def measure(fn, repeat):
+    # Discarded warm-up run, so lazy imports and first-call setup are not timed even at --repeat 1
+    fn()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"seconds": min(timings), "peak_mb": peak / 1e6}
+
+
+# --- Stages ---
+def stage_aggregation(df):
+    sentiment_by_product(df)
+    product_df = filter_by_product(df, df["PRODUCT"].iloc[0])
+    sentiment_counts(product_df["Sentiment_Category"], "Sentiment")
+
+
+def stage_chart_specs(df):
+    product = "All Products"
+    counts, colors = sentiment_counts(df["Sentiment_Category"], "Sentiment")
+
+    # Plotly figures are serialized to JSON by st.plotly_chart
+    for fig in [
+        charts.sentiment_bar(counts, colors, "Sentiment", "Distribution", "Sentiment Category"),
+        charts.sentiment_scatter(df, product),
+        charts.sentiment_box(df, product),
+    ]:
+        fig.to_json()
+
+    # Altair charts are converted to a Vega-Lite spec plus Arrow datasets
+    with alt.data_transformers.enable("benchmark_arrow"):
+        for chart in [
+            charts.score_histogram(df, product),
+            charts.sentiment_line(df, product),
+            charts.sentiment_heatmap(df, product),
+        ]:
+            chart.to_dict()
+
+    # Matplotlib figures are rendered to PNG by st.pyplot
+    fig = charts.sentiment_pyplot_hist(df, product)
+    fig.savefig(io.BytesIO(), format="png")
+    plt.close(fig)
+    charts.native_scatter_data(df)
+
+
+def stage_model_calls(df, n_calls, latency):
+    """Classifies n_calls reviews against the in-process stub server, one per call and in structured batches."""
+    from stub_server import start_stub_server
+
+    server, url = start_stub_server(latency=latency)
+    os.environ["LLM_STUB_URL"] = url
+    try:
+        from llm import SENTIMENT_BATCH_SIZE, configure_gemini, classify_sentiment, classify_sentiment_batch
+
+        configure_gemini()
+        texts = df["SUMMARY"].head(n_calls).tolist()
+        # Untimed warm-up calls, so client setup is not counted
+        classify_sentiment(texts[0])
+        classify_sentiment_batch({0: texts[0]})
+        start = time.perf_counter()
+        for text in texts:
+            classify_sentiment(text)
+        elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for first in range(0, len(texts), SENTIMENT_BATCH_SIZE):
+            classify_sentiment_batch(dict(enumerate(texts[first:first + SENTIMENT_BATCH_SIZE])))
+        batched = time.perf_counter() - start
+    finally:
+        server.shutdown()
+        os.environ.pop("LLM_STUB_URL", None)
+    return {
+        "seconds": elapsed,
+        "per_call_ms": elapsed / len(texts) * 1000,
+        "calls": len(texts),
+        "batched_per_review_ms": batched / len(texts) * 1000,
+    }
+
+
+# Function to run every stage for one dataset size
+def run_size(n_rows, repeat, workdir):
+    reviews_path = os.path.join(workdir, f"reviews_{n_rows}.csv")
+    shipping_path = os.path.join(workdir, f"shipping_{n_rows}.csv")
+    make_reviews(n_rows).to_csv(reviews_path, index=False)
+    make_shipping_logs(n_rows).to_csv(shipping_path, index=False)
+
+    df = load_reviews(reviews_path)
+    # Later stages read the feature columns, as the app does after ingest
+    add_sentiment_features(df)
+    results = {
+        "ingest": measure(lambda: load_reviews(reviews_path), repeat),
+        "shipping_ingest": measure(lambda: load_shipping_logs(shipping_path), repeat),
+        "clean_text": measure(lambda: parse_reviews(df), repeat),
+        "sentiment_features": measure(lambda: add_sentiment_features(df), repeat),
+        "aggregation": measure(lambda: stage_aggregation(df), repeat),
+        "chart_specs": measure(lambda: stage_chart_specs(df), repeat),
+    }
+    return results, df
+
+
+# Helper function to check one figure against its baseline: returns (ratio, regressed?)
+def check(current, previous, tolerance, min_change):
+    ratio = current / previous if previous else 1.0
+    return ratio, ratio > 1 + tolerance and current - previous > min_change
+
+
+# Function to compare results with a baseline; returns a list of regression messages
+def compare(results, baseline, tolerance, memory_tolerance, min_seconds=0.05, min_mb=1.0):
+    regressions = []
+    for size, stages in results.items():
+        for stage, current in stages.items():
+            previous = baseline.get(size, {}).get(stage)
+            if not previous:
+                continue
+            ratio, slower = check(current["seconds"], previous["seconds"], tolerance, min_seconds)
+            memory_ratio, larger = check(current["peak_mb"], previous["peak_mb"], memory_tolerance, min_mb)
+            if slower:
+                regressions.append(f"{stage} @ {size} rows: {previous['seconds']:.4f}s -> {current['seconds']:.4f}s")
+            if larger:
+                regressions.append(f"{stage} @ {size} rows: peak {previous['peak_mb']:.1f} MB -> {current['peak_mb']:.1f} MB")
+            marker = "  <-- REGRESSION" if slower or larger else ""
+            print(
+                f"  {size:>9} {stage:<18} {current['seconds']:9.4f}s  (baseline {previous['seconds']:.4f}s, x{ratio:.2f})"
+                f"  peak x{memory_ratio:.2f}{marker}"
+            )
+    return regressions
+
+
+# Function to compare the stub model-call overhead with a baseline; returns a list of regression messages
+def compare_model_calls(model_calls, baseline, tolerance, min_ms=0.5):
+    regressions = []
+    for name in ["per_call_ms", "batched_per_review_ms"]:
+        previous = (baseline or {}).get(name)
+        if previous is None or name not in model_calls:
+            continue
+        ratio, slower = check(model_calls[name], previous, tolerance, min_ms)
+        if slower:
+            regressions.append(f"model {name}: {previous:.2f} -> {model_calls[name]:.2f}")
+        print(f"  {'model':>9} {name:<22} {model_calls[name]:9.2f} ms  (baseline {previous:.2f} ms, x{ratio:.2f})"
+              + ("  <-- REGRESSION" if slower else ""))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the GenAi-Prototype data path.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per stage; the best one is kept")
+    parser.add_argument("--llm-calls", type=int, default=50, help="Reviews classified against the stub server")
+    parser.add_argument("--llm-latency", default="none", help="Stub latency spec, see stub_server.py")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown before a stage counts as a regression")
+    parser.add_argument("--memory-tolerance", type=float, default=0.25, help="Allowed growth in a stage's peak memory")
+    parser.add_argument("--model-tolerance", type=float, default=0.5, help="Allowed slowdown of the stub model calls")
+    parser.add_argument("--min-seconds", type=float, default=0.05, help="Slowdowns smaller than this are never flagged")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for n_rows in args.sizes:
+            print(f"Running {n_rows:,} rows...")
+            results[str(n_rows)], df = run_size(n_rows, args.repeat, workdir)
+            for stage, r in results[str(n_rows)].items():
+                print(f"  {stage:<18} {r['seconds']:9.4f}s  peak {r['peak_mb']:9.1f} MB")
+        model_calls = stage_model_calls(df, args.llm_calls, args.llm_latency)
+        print(f"  model_calls        {model_calls['per_call_ms']:9.2f} ms/call over {model_calls['calls']} calls")
+        print(f"  model_batched      {model_calls['batched_per_review_ms']:9.2f} ms/review in structured batches")
+
+    report = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+        "model_calls": model_calls,
+    }
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print("No baseline found; run with --save-baseline to create one.")
+        return
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    print("Comparison with baseline:")
+    regressions = compare(results, baseline["results"], args.tolerance, args.memory_tolerance, args.min_seconds)
+    regressions += compare_model_calls(model_calls, baseline.get("model_calls"), args.model_tolerance)
+    if regressions:
+        print("Regressions found:")
+        for line in regressions:
+            print(f"  {line}")
+        raise SystemExit(1)
+    print("No regressions.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+# import packages
+from lazy_imports import lazy_module
+
+# Chart libraries are imported the first time a chart of that kind is built
+px = lazy_module("plotly.express")
+alt = lazy_module("altair")
+plt = lazy_module("matplotlib.pyplot")
+
+
+# Plotly bar chart for a sentiment label distribution
+def sentiment_bar(counts, colors, label_column, title, axis_title):
+    fig = px.bar(
+        counts,
+        x=label_column,
+        y="Count",
+        title=title,
+        labels={label_column: axis_title, "Count": "Number of Reviews"},
+        color=label_column,
+        color_discrete_map=colors
+    )
+    fig.update_layout(
+        xaxis_title=axis_title,
+        yaxis_title="Number of Reviews",
+        showlegend=False
+    )
+    return fig
+
+
+# Altair histogram of sentiment scores
+def score_histogram(df, product):
+    # Create Altair histogram using add_params instead of add_selection
+    interval = alt.selection_interval()
+    return alt.Chart(df).mark_bar().add_params(
+        interval
+    ).encode(
+        alt.X("SENTIMENT_SCORE:Q", bin=alt.Bin(maxbins=10), title="Sentiment Score"),
+        alt.Y("count():Q", title="Frequency"),
+        tooltip=["count():Q"]
+    ).properties(
+        width=600,
+        height=400,
+        title=f"Distribution of Sentiment Scores - {product}"
+    )
+
+
+# Plotly scatter of product vs sentiment score
+def sentiment_scatter(df, product):
+    """Reads the precomputed size_normalized column (see add_sentiment_features)."""
+    scatter_fig = px.scatter(
+        df,
+        x="PRODUCT",
+        y="SENTIMENT_SCORE",
+        color="SENTIMENT_SCORE",
+        size="size_normalized",
+        title=f"Product Sentiment Scatter Plot - {product}",
+        color_continuous_scale="RdYlGn",
+        hover_data=["SENTIMENT_SCORE"]
+    )
+    scatter_fig.update_layout(xaxis_tickangle=-45)
+    return scatter_fig
+
+
+# Altair line chart of sentiment by review index
+def sentiment_line(df, product):
+    # Add index for trend visualization (only the plotted columns are copied)
+    df_with_index = df[['SENTIMENT_SCORE', 'PRODUCT']].reset_index()
+    return alt.Chart(df_with_index).mark_line(point=True).encode(
+        x=alt.X('index:O', title='Review Index'),
+        y=alt.Y('SENTIMENT_SCORE:Q', title='Sentiment Score'),
+        tooltip=['index:O', 'SENTIMENT_SCORE:Q', 'PRODUCT:N']
+    ).properties(
+        width=600,
+        height=300,
+        title=f"Sentiment Score Trend - {product}"
+    )
+
+
+# Plotly box plot of sentiment by product
+def sentiment_box(df, product):
+    box_fig = px.box(
+        df,
+        x="PRODUCT",
+        y="SENTIMENT_SCORE",
+        title=f"Sentiment Score Distribution Box Plot - {product}",
+        color="PRODUCT"
+    )
+    box_fig.update_layout(xaxis_tickangle=-45, showlegend=False)
+    return box_fig
+
+
+# Altair heatmap of product vs binned sentiment
+def sentiment_heatmap(df, product):
+    """Reads the precomputed Sentiment_Bin column (see add_sentiment_features)."""
+    # Create aggregated data for heatmap
+    heatmap_data = df.groupby(['PRODUCT', 'Sentiment_Bin'], observed=True).size().reset_index(name='Count')
+
+    return alt.Chart(heatmap_data).mark_rect().encode(
+        x=alt.X('PRODUCT:N', title='Product'),
+        y=alt.Y('Sentiment_Bin:N', title='Sentiment Level'),
+        color=alt.Color('Count:Q', scale=alt.Scale(scheme='blues')),
+        tooltip=['PRODUCT:N', 'Sentiment_Bin:N', 'Count:Q']
+    ).properties(
+        width=400,
+        height=200,
+        title=f"Product-Sentiment Heatmap - {product}"
+    )
+
+
+# Matplotlib histogram with a mean line
+def sentiment_pyplot_hist(df, product):
+    # Create matplotlib figure
+    fig, ax = plt.subplots(figsize=(10, 6))
+
+    # Create histogram
+    ax.hist(df['SENTIMENT_SCORE'], bins=15, alpha=0.7, color='skyblue', edgecolor='black')
+    ax.set_xlabel('Sentiment Score')
+    ax.set_ylabel('Frequency')
+    ax.set_title(f'Sentiment Score Distribution (Matplotlib) - {product}')
+    ax.grid(True, alpha=0.3)
+
+    # Add statistics text
+    mean_score = df['SENTIMENT_SCORE'].mean()
+    ax.axvline(mean_score, color='red', linestyle='--', linewidth=2, label=f'Mean: {mean_score:.3f}')
+    ax.legend()
+    return fig
+
+
+# Data for the native Streamlit scatter chart
+def native_scatter_data(df):
+    # Prepare data for st.scatter_chart (needs specific format)
+    scatter_data = df[['SENTIMENT_SCORE']].copy()
+    scatter_data['Product_Index'] = range(len(scatter_data))
+    return scatter_data.rename(columns={'SENTIMENT_SCORE': 'Sentiment'})
@@ -1,116 +1,152 @@
 # import packages
-import streamlit as st
-import pandas as pd
-import plotly.express as px
-import altair as alt
-import matplotlib.pyplot as plt
-import re
 import os
-import google.generativeai as genai
-from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv()
+import time
+import weakref
+import pandas as pd
+import streamlit as st
+import charts
+from paged_table import paged_dataframe
+from batch_sentiment import sidecar_paths
+from llm import SENTIMENT_BATCH_SIZE, classify_sentiment_batch, configure_gemini
+from evaluate_sentiment import agreement_summary
+from local_sentiment import DEFAULT_MIN_CONFIDENCE, MODEL_PATH, LocalSentimentModel, tiered_classify, train_on_reviews
+from dedup import dedup_stats, fan_out, find_near_duplicates
+from incremental_refresh import aggregate_means, product_aggregates, refresh_reviews
+from rollups import GRAINS, review_rollup, sentiment_trend
+from search_index import ReviewSearchIndex
+from shared_dataset import SharedDatasetStore, file_version, to_frame
+from review_pipeline import (
+    add_sentiment_features,
+    clean_text,
+    filter_by_product,
+    get_dataset_path,
+    load_reviews,
+    parse_reviews,
+    sentiment_counts,
+)
 
-# Initialize Google AI (Gemini) client
+# Initialize Google AI (Gemini) client (set LLM_STUB_URL to use the local stub server)
 try:
-    api_key = os.getenv("GEMINI_API_KEY")
-    if api_key:
-        genai.configure(api_key=api_key)
-        gemini_available = True
-    else:
-        gemini_available = False
+    gemini_available = configure_gemini()
+    if not gemini_available:
         st.warning("GEMINI_API_KEY not found. AI sentiment analysis will be disabled.")
 except Exception as e:
     gemini_available = False
     st.warning(f"Gemini client not available: {e}")
 
 
-# Function to get sentiment using Gemini AI
+# Helper function to label one batch with a structured Gemini call. Errors are raised, and
+# st.cache_data does not cache exceptions, so a failed batch is retried on the next call
 @st.cache_data
-def get_sentiment_with_gemini(text):
+def get_batch_sentiments(texts):
+    # Reviews are numbered within the batch so every result maps back to its row
+    batch = dict(enumerate(texts))
+    results = classify_sentiment_batch(batch)
+    return [results[row_id][0] for row_id in batch]
+
+
+# Function to get sentiment for many reviews using structured Gemini batch calls
+def get_sentiments_with_gemini(texts):
+    """texts is a tuple of reviews; returns their labels in the same order, None where a call failed."""
     if not gemini_available:
-        return "Neutral"
-    if not text or pd.isna(text):
-        return "Neutral"
-    
-    try:
-        # Configure safety settings (same as app.py)
-        safety_settings = [
-            {
-                "category": "HARM_CATEGORY_HARASSMENT",
-                "threshold": "BLOCK_NONE"
-            },
-            {
-                "category": "HARM_CATEGORY_HATE_SPEECH", 
-                "threshold": "BLOCK_NONE"
-            },
-            {
-                "category": "HARM_CATEGORY_SEXUALLY_EXPLICIT",
-                "threshold": "BLOCK_NONE"
-            },
-            {
-                "category": "HARM_CATEGORY_DANGEROUS_CONTENT",
-                "threshold": "BLOCK_NONE"
-            }
-        ]
-        
-        # Create model instance
-        model = genai.GenerativeModel(
-            "models/gemini-2.5-flash",
-            safety_settings=safety_settings
-        )
-        
-        # Create prompt for sentiment analysis
-        prompt = f"Classify the sentiment of the following customer review as exactly one word: Positive, Negative, or Neutral.\n\nReview: {text}\n\nSentiment:"
-        
-        # Get response
-        response = model.generate_content(prompt)
-        sentiment = response.text.strip()
-        
-        # Ensure valid response
-        valid_sentiments = ["Positive", "Negative", "Neutral"]
-        if sentiment in valid_sentiments:
-            return sentiment
-        else:
-            # Try to extract valid sentiment from response
-            for valid in valid_sentiments:
-                if valid.lower() in sentiment.lower():
-                    return valid
-            return "Neutral"
-            
-    except Exception as e:
-        st.error(f"Gemini API error: {e}")
-        return "Neutral"
+        return [None] * len(texts)
+    labels = []
+    for start in range(0, len(texts), SENTIMENT_BATCH_SIZE):
+        batch = texts[start:start + SENTIMENT_BATCH_SIZE]
+        try:
+            labels.extend(get_batch_sentiments(batch))
+        except Exception as e:
+            st.error(f"Gemini API error: {e}")
+            labels.extend([None] * len(batch))
+    return labels
+
+
+# Attach to the host-wide Arrow snapshot of the CSV, publishing it if this file version is new.
+# Every Streamlit process on the host maps the same file instead of holding its own copy.
+@st.cache_resource
+def get_shared_reviews(csv_path, version):
+    name = os.path.splitext(os.path.basename(csv_path))[0]
+    return SharedDatasetStore().get_or_publish(name, version, lambda: load_reviews(csv_path))
 
 
-# Helper function to get dataset path
-def get_dataset_path():
-    # Get the current script directory (GenAi-Prototype folder)
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    # Construct the path to the CSV file in the same directory
-    csv_path = os.path.join(current_dir, "customer_reviews.csv")
-    return csv_path
+# Function to load the reviews for this session: a new DataFrame over the shared columns
+def load_session_reviews():
+    csv_path = get_dataset_path()
+    return to_frame(get_shared_reviews(csv_path, file_version(csv_path)))
 
 
-# Helper function to clean text
-def clean_text(text):
-    text = text.lower().strip()
-    text = re.sub(r'[^\w\s]', '', text)
-    return text
+# Load the local pre-classifier: the saved model if there is one, otherwise train on the dataset's scores
+@st.cache_resource
+def get_local_model(csv_path, modified_time):
+    if os.path.exists(MODEL_PATH):
+        return LocalSentimentModel.load(MODEL_PATH)
+    return train_on_reviews(load_reviews(csv_path))
+
+
+# Helper function to classify reviews into (label, source) pairs; with the local model on, only uncertain reviews go to Gemini.
+# Reviews whose Gemini call failed get (None, "failed").
+def classify_reviews(texts):
+    if not st.session_state.get("use_local_model"):
+        return [(label, "gemini" if label is not None else "failed") for label in get_sentiments_with_gemini(tuple(texts))]
+    csv_path = get_dataset_path()
+    model = get_local_model(csv_path, os.path.getmtime(csv_path))
+    result, stats = tiered_classify(
+        texts, model, lambda batch: get_sentiments_with_gemini(tuple(batch)), st.session_state["min_confidence"]
+    )
+    st.session_state["tier_stats"] = stats
+    sources = result["Source"].replace({"llm": "gemini"}).where(result["Label"].notna(), "failed")
+    return list(zip(result["Label"], sources))
+
+
+# Function to label reviews; near-duplicates are classified once and share their representative's label
+def label_reviews(texts):
+    """Returns a DataFrame with AI_Sentiment and AI_Source ("gemini", "local" or "failed") for each review."""
+    results, st.session_state["label_dedup"] = fan_out(texts, classify_reviews)
+    return pd.DataFrame(results, columns=["AI_Sentiment", "AI_Source"], index=texts.index)
+
+
+# Cluster the dataset's near-duplicate reviews once per file version
+@st.cache_data
+def get_duplicate_clusters(csv_path, version):
+    return find_near_duplicates(to_frame(get_shared_reviews(csv_path, version))["SUMMARY"])
+
+
+# Function to get the search index for a dataset, rebuilding it only when the dataset changes
+def get_search_index(df, name):
+    cached = st.session_state.get(f"{name}_search_index")
+    if cached is None or cached[0]() is not df:
+        # CLEANED_SUMMARY is SUMMARY run through clean_text, so either column gives the same tokens
+        text_column = "CLEANED_SUMMARY" if "CLEANED_SUMMARY" in df.columns else "SUMMARY"
+        cached = (weakref.ref(df), ReviewSearchIndex(df[text_column], df["PRODUCT"]))
+        st.session_state[f"{name}_search_index"] = cached
+    return cached[1]
 
 
 st.title("📊 Customer Reviews Data Analyzer")
 st.write("This is your data processing and analysis app.")
 
+# Derived columns recomputed for new and changed reviews on refresh
+derived_columns = {
+    "CLEANED_SUMMARY": lambda rows: rows["SUMMARY"].apply(clean_text),
+    ("AI_Sentiment", "AI_Source"): lambda rows: label_reviews(rows["SUMMARY"]),
+}
+
+with st.expander("⚡ Local Pre-Classifier"):
+    st.toggle("Label confident reviews locally and only send uncertain ones to Gemini", key="use_local_model")
+    st.slider("Minimum local confidence", 0.5, 0.99, DEFAULT_MIN_CONFIDENCE, 0.01, key="min_confidence")
+
 # Layout buttons in a grid
-col1, col2, col3 = st.columns(3)
+col1, col2, col3, col4, col5 = st.columns(5)
 
 with col1:
     if st.button("📥 Ingest Dataset"):
         try:
+            st.session_state["df"] = add_sentiment_features(load_session_reviews())
+            st.session_state["aggregates"] = product_aggregates(st.session_state["df"])
+            st.session_state["rollup"] = review_rollup(st.session_state["df"])
+            get_search_index(st.session_state["df"], "df")
             csv_path = get_dataset_path()
-            st.session_state["df"] = pd.read_csv(csv_path)
+            st.session_state["dedup_stats"] = dedup_stats(get_duplicate_clusters(csv_path, file_version(csv_path)))
             st.success(f"Dataset loaded successfully! ({len(st.session_state['df'])} reviews)")
         except FileNotFoundError:
             st.error("Dataset not found. Please check that customer_reviews.csv is in the GenAi-Prototype folder.")
@@ -119,7 +155,7 @@ with col2:
     if st.button("🧹 Parse Reviews"):
         if "df" in st.session_state:
             with st.spinner("Parsing and cleaning reviews..."):
-                st.session_state["df"]["CLEANED_SUMMARY"] = st.session_state["df"]["SUMMARY"].apply(clean_text)
+                parse_reviews(st.session_state["df"])
                 st.success("Reviews parsed and cleaned!")
         else:
             st.warning("Please ingest the dataset first.")
@@ -132,7 +168,7 @@ with col3:
                     with st.spinner("Analyzing sentiment with Gemini AI... (processing first 10 reviews for demo)"):
                         # Process only first 10 reviews for demo (like M1Lab2)
                         sample_df = st.session_state["df"].head(10).copy()
-                        sample_df.loc[:, "AI_Sentiment"] = sample_df["SUMMARY"].apply(get_sentiment_with_gemini)
+                        sample_df[["AI_Sentiment", "AI_Source"]] = label_reviews(sample_df["SUMMARY"])
                         st.session_state["df_with_ai"] = sample_df
                         st.success("Gemini AI sentiment analysis completed!")
                 except Exception as e:
@@ -142,6 +178,52 @@ with col3:
         else:
             st.warning("Please ingest the dataset first.")
 
+with col4:
+    if st.button("🔄 Refresh Dataset"):
+        if "df" in st.session_state:
+            try:
+                with st.spinner("Refreshing new and changed reviews..."):
+                    current = load_session_reviews()
+                    st.session_state["df"], st.session_state["aggregates"], summary = refresh_reviews(
+                        st.session_state["df"], current, derived_columns, st.session_state["aggregates"],
+                        st.session_state["rollup"],
+                    )
+                    add_sentiment_features(st.session_state["df"])
+                    get_search_index(st.session_state["df"], "df")
+                    csv_path = get_dataset_path()
+                    st.session_state["dedup_stats"] = dedup_stats(get_duplicate_clusters(csv_path, file_version(csv_path)))
+                    # The Gemini sample keeps its reviews; only changed ones are re-classified
+                    if "df_with_ai" in st.session_state:
+                        previous_ai = st.session_state["df_with_ai"]
+                        current_ai = current[current["Order ID"].isin(previous_ai["Order ID"])]
+                        st.session_state["df_with_ai"], _, _ = refresh_reviews(previous_ai, current_ai, derived_columns)
+                        add_sentiment_features(st.session_state["df_with_ai"], st.session_state["df"]["SENTIMENT_SCORE"])
+                    st.success(
+                        f"Dataset refreshed: {summary['new']} new, {summary['changed']} changed, "
+                        f"{summary['removed']} removed, {summary['unchanged']} reused."
+                    )
+            except (FileNotFoundError, ValueError) as e:
+                st.error(f"Refresh failed: {e}")
+        else:
+            st.warning("Please ingest the dataset first.")
+
+with col5:
+    if st.button("📂 Load Batch Sentiment"):
+        if "df" in st.session_state:
+            enriched_path = sidecar_paths(get_dataset_path())[1]
+            if os.path.exists(enriched_path):
+                # Labels for the whole dataset, written by batch_sentiment.py
+                batch_df = pd.read_parquet(enriched_path).dropna(subset=["AI_Sentiment"])
+                st.session_state["df_with_ai"] = add_sentiment_features(batch_df, st.session_state["df"]["SENTIMENT_SCORE"])
+                st.success(
+                    f"Loaded {len(batch_df):,} labelled reviews from {os.path.basename(enriched_path)} "
+                    f"(written {time.strftime('%Y-%m-%d %H:%M', time.localtime(os.path.getmtime(enriched_path)))})."
+                )
+            else:
+                st.warning("No batch results yet. Run `python batch_sentiment.py` to label the whole dataset.")
+        else:
+            st.warning("Please ingest the dataset first.")
+
 # Display the dataset if it exists
 if "df" in st.session_state:
     # Check if AI analysis has been performed
@@ -153,126 +235,143 @@ if "df" in st.session_state:
     # Use AI dataset if available, otherwise use regular dataset
     current_df = st.session_state.get("df_with_ai", st.session_state["df"])
     product = st.selectbox("Choose a product", ["All Products"] + list(current_df["PRODUCT"].unique()))
+    query = st.text_input(
+        "Search reviews",
+        placeholder='Words, "exact phrase" or prefix* (e.g. waterproof "battery life" charg*)',
+    )
     
     # Show which dataset is being displayed
     dataset_type = "Gemini AI-Analyzed Dataset (10 samples)" if ai_analysis_available else "Original Dataset"
     st.subheader(f"📁 {dataset_type} - Reviews for {product}")
 
-    if product != "All Products":
-        filtered_df = current_df[current_df["PRODUCT"] == product]
+    if query:
+        # The product filter is one more postings intersection in the search index
+        start_time = time.perf_counter()
+        rows = get_search_index(current_df, "df_with_ai" if ai_analysis_available else "df").search(query, product)
+        filtered_df = current_df.iloc[rows]
+        st.caption(f"Matching reviews: {len(filtered_df):,} (search took {(time.perf_counter() - start_time) * 1000:.1f} ms)")
     else:
-        filtered_df = current_df
-    
-    st.dataframe(filtered_df)
+        filtered_df = filter_by_product(current_df, product)
+
+    # Only the visible page is sent to the browser; long review text is truncated
+    paged_dataframe(
+        filtered_df,
+        key="reviews",
+        text_columns=[c for c in ["SUMMARY", "CLEANED_SUMMARY"] if c in filtered_df.columns],
+        search_columns=[],
+        columns=[c for c in filtered_df.columns if c not in ("Sentiment_Bin", "size_normalized")],
+    )
     
     # Add sentiment analysis visualization
     st.subheader("📈 Sentiment Score by Product")
-    grouped = st.session_state["df"].groupby(["PRODUCT"])["SENTIMENT_SCORE"].mean()
+    grouped = aggregate_means(st.session_state["aggregates"])
     st.bar_chart(grouped)
+
+    # Sentiment over time, read from the day/week/month rollups instead of the rows
+    st.subheader(f"📅 Sentiment Trend for {product}")
+    grain = st.radio("Group by", GRAINS, index=1, horizontal=True, format_func=str.capitalize)
+    trend = sentiment_trend(st.session_state["rollup"], grain, None if product == "All Products" else [product])
+    st.line_chart(trend["Avg Sentiment"])
+    st.bar_chart(trend["Reviews"])
     
+    if filtered_df.empty:
+        st.info("No reviews match the current search. Clear it to see the charts.")
+
     # Add Gemini AI Sentiment Analysis visualization if available
-    if ai_analysis_available and "AI_Sentiment" in current_df.columns:
+    if ai_analysis_available and "AI_Sentiment" in current_df.columns and not filtered_df.empty:
         st.subheader(f"🤖 Gemini AI Sentiment Analysis Results for {product}")
         
+        # Local labels come from a model trained on the score categories, so they are reported on their own
+        # and left out of the agreement below, which would otherwise partly compare the scores with themselves
+        is_local = filtered_df["AI_Source"].eq("local") if "AI_Source" in filtered_df.columns else pd.Series(False, index=filtered_df.index)
+        # Reviews whose Gemini call failed have no label; they are not charted or counted
+        is_failed = filtered_df["AI_Sentiment"].isna()
+        gemini_df, local_df = filtered_df[~is_local & ~is_failed], filtered_df[is_local]
+        if is_failed.any():
+            st.warning(
+                f"{int(is_failed.sum()):,} reviews could not be labelled because their Gemini call failed. "
+                "Run the analysis again to retry them; labelled batches are reused."
+            )
+
         # Create Plotly bar chart for AI sentiment distribution using filtered data
-        ai_sentiment_counts = filtered_df["AI_Sentiment"].value_counts().reset_index()
-        ai_sentiment_counts.columns = ['AI_Sentiment', 'Count']
+        if not gemini_df.empty:
+            ai_sentiment_counts, ai_colors = sentiment_counts(gemini_df["AI_Sentiment"], "AI_Sentiment")
+            ai_fig = charts.sentiment_bar(
+                ai_sentiment_counts,
+                ai_colors,
+                "AI_Sentiment",
+                f"Gemini AI-Generated Sentiment Classifications - {product}",
+                "Gemini AI Sentiment Category"
+            )
+            st.plotly_chart(ai_fig, use_container_width=True)
 
-        # Define custom order and colors (same as M1Lab2)
-        sentiment_order = ['Negative', 'Neutral', 'Positive']
-        sentiment_colors = {'Negative': 'red', 'Neutral': 'lightgray', 'Positive': 'green'}
-        
-        # Only include sentiment categories that actually exist in the data
-        existing_sentiments = ai_sentiment_counts['AI_Sentiment'].unique()
-        filtered_order = [s for s in sentiment_order if s in existing_sentiments]
-        filtered_colors = {s: sentiment_colors[s] for s in existing_sentiments if s in sentiment_colors}
-        
-        # Reorder the data according to our custom order (only for existing sentiments)
-        ai_sentiment_counts['AI_Sentiment'] = pd.Categorical(ai_sentiment_counts['AI_Sentiment'], categories=filtered_order, ordered=True)
-        ai_sentiment_counts = ai_sentiment_counts.sort_values('AI_Sentiment')
-        
-        ai_fig = px.bar(
-            ai_sentiment_counts,
-            x="AI_Sentiment",
-            y="Count",
-            title=f"Gemini AI-Generated Sentiment Classifications - {product}",
-            labels={"AI_Sentiment": "Gemini AI Sentiment Category", "Count": "Number of Reviews"},
-            color="AI_Sentiment",
-            color_discrete_map=filtered_colors
-        )
-        ai_fig.update_layout(
-            xaxis_title="Gemini AI Sentiment Category",
-            yaxis_title="Number of Reviews",
-            showlegend=False
-        )
-        st.plotly_chart(ai_fig, use_container_width=True)
+            # Compare Gemini labels with the SENTIMENT_SCORE categories (0.4/0.6 cutoffs)
+            agreement = agreement_summary(gemini_df["Sentiment_Category"], gemini_df["AI_Sentiment"])
+            col1, col2 = st.columns(2)
+            with col1:
+                st.metric("Agreement with Score Categories", f"{agreement['accuracy']:.0%}")
+            with col2:
+                st.metric("Cohen's Kappa", f"{agreement['kappa']:.2f}")
+            st.dataframe(agreement["confusion"])
+            st.caption("Rows are score categories, columns are Gemini labels. Run evaluate_sentiment.py for a full evaluation.")
+
+        if not local_df.empty:
+            local_counts, local_colors = sentiment_counts(local_df["AI_Sentiment"], "AI_Sentiment")
+            local_fig = charts.sentiment_bar(
+                local_counts,
+                local_colors,
+                "AI_Sentiment",
+                f"Local Pre-Classifier Labels - {product}",
+                "Local Sentiment Category"
+            )
+            st.plotly_chart(local_fig, use_container_width=True)
+            st.caption(
+                f"{len(local_df):,} reviews were labelled by the local pre-classifier. Its labels are not counted "
+                "in the agreement above: without a saved model it is trained on this dataset's score categories."
+            )
+
+        # Show how many reviews the local pre-classifier kept away from Gemini
+        if st.session_state.get("use_local_model") and "tier_stats" in st.session_state:
+            stats = st.session_state["tier_stats"]
+            st.metric(
+                "Escalated to Gemini",
+                f"{stats['escalated']} of {stats['reviews']}",
+                f"{stats['escalation_rate']:.0%} escalation rate",
+                delta_color="off",
+            )
+
+        # Show how many reviews took their label from a near-duplicate instead of a classifier call
+        if "label_dedup" in st.session_state:
+            dedup = st.session_state["label_dedup"]
+            st.metric(
+                "Labelled from a Near-Duplicate",
+                f"{dedup['duplicates']} of {dedup['reviews']}",
+                f"{dedup['dedup_ratio']:.0%} dedup ratio",
+                delta_color="off",
+            )
     
     # Add Plotly sentiment breakdown visualization
-    if "SENTIMENT_SCORE" in current_df.columns:
+    if "SENTIMENT_SCORE" in current_df.columns and not filtered_df.empty:
         st.subheader(f"📊 Plotly Chart - Sentiment Distribution for {product}")
         
-        # Create sentiment categories based on sentiment scores
-        def categorize_sentiment(score):
-            if score >= 0.6:
-                return "Positive"
-            elif score <= 0.4:
-                return "Negative"
-            else:
-                return "Neutral"
-        
-        # Apply sentiment categorization to filtered data
-        filtered_df_with_sentiment = filtered_df.copy()
-        filtered_df_with_sentiment["Sentiment_Category"] = filtered_df_with_sentiment["SENTIMENT_SCORE"].apply(categorize_sentiment)
-        
-        # Create Plotly bar chart for sentiment distribution using filtered data
-        sentiment_counts = filtered_df_with_sentiment["Sentiment_Category"].value_counts().reset_index()
-        sentiment_counts.columns = ['Sentiment', 'Count']
+        # Sentiment categories are precomputed once per dataset version
+        sentiment_labels = filtered_df["Sentiment_Category"]
 
-        # Define custom order and colors
-        sentiment_order = ['Negative', 'Neutral', 'Positive']
-        sentiment_colors = {'Negative': 'red', 'Neutral': 'lightgray', 'Positive': 'green'}
-        
-        # Only include sentiment categories that actually exist in the data
-        existing_sentiments = sentiment_counts['Sentiment'].unique()
-        filtered_order = [s for s in sentiment_order if s in existing_sentiments]
-        filtered_colors = {s: sentiment_colors[s] for s in existing_sentiments if s in sentiment_colors}
-        
-        # Reorder the data according to our custom order (only for existing sentiments)
-        sentiment_counts['Sentiment'] = pd.Categorical(sentiment_counts['Sentiment'], categories=filtered_order, ordered=True)
-        sentiment_counts = sentiment_counts.sort_values('Sentiment')
-        
-        fig = px.bar(
-            sentiment_counts,
-            x="Sentiment",
-            y="Count",
-            title=f"Distribution of Sentiment Classifications - {product}",
-            labels={"Sentiment": "Sentiment Category", "Count": "Number of Reviews"},
-            color="Sentiment",
-            color_discrete_map=filtered_colors
-        )
-        fig.update_layout(
-            xaxis_title="Sentiment Category",
-            yaxis_title="Number of Reviews",
-            showlegend=False
+        # Create Plotly bar chart for sentiment distribution using filtered data
+        counts, colors = sentiment_counts(sentiment_labels, "Sentiment")
+        fig = charts.sentiment_bar(
+            counts,
+            colors,
+            "Sentiment",
+            f"Distribution of Sentiment Classifications - {product}",
+            "Sentiment Category"
         )
         st.plotly_chart(fig, use_container_width=True)
         
         # Add Altair sentiment score distribution histogram
         st.subheader(f"📈 Altair Chart - Sentiment Score Distribution for {product}")
         
-        # Create Altair histogram using add_params instead of add_selection
-        interval = alt.selection_interval()
-        histogram_chart = alt.Chart(filtered_df).mark_bar().add_params(
-            interval
-        ).encode(
-            alt.X("SENTIMENT_SCORE:Q", bin=alt.Bin(maxbins=10), title="Sentiment Score"),
-            alt.Y("count():Q", title="Frequency"),
-            tooltip=["count():Q"]
-        ).properties(
-            width=600,
-            height=400,
-            title=f"Distribution of Sentiment Scores - {product}"
-        )
+        histogram_chart = charts.score_histogram(filtered_df, product)
         st.altair_chart(histogram_chart, use_container_width=True)
         
         # Add variety of additional chart examples for training purposes
@@ -283,113 +382,34 @@ if "df" in st.session_state:
         
         with tab1:
             st.write("**Plotly Scatter Plot - Product vs Sentiment Score**")
-            # Create a copy of filtered_df and add normalized size column
-            scatter_df = filtered_df.copy()
-            # Transform sentiment scores to positive values for size (min value becomes 1, max becomes proportional)
-            min_sentiment = scatter_df["SENTIMENT_SCORE"].min()
-            max_sentiment = scatter_df["SENTIMENT_SCORE"].max()
-            # Normalize to range [1, 20] for better visualization
-            scatter_df["size_normalized"] = ((scatter_df["SENTIMENT_SCORE"] - min_sentiment) / 
-                                           (max_sentiment - min_sentiment) * 19 + 1)
-            
-            scatter_fig = px.scatter(
-                scatter_df, 
-                x="PRODUCT", 
-                y="SENTIMENT_SCORE",
-                color="SENTIMENT_SCORE",
-                size="size_normalized",
-                title=f"Product Sentiment Scatter Plot - {product}",
-                color_continuous_scale="RdYlGn",
-                hover_data=["SENTIMENT_SCORE"]
-            )
-            scatter_fig.update_layout(xaxis_tickangle=-45)
-            st.plotly_chart(scatter_fig, use_container_width=True)
+            st.plotly_chart(charts.sentiment_scatter(filtered_df, product), use_container_width=True)
         
         with tab2:
             st.write("**Altair Line Chart - Sentiment Trend by Index**")
-            # Add index for trend visualization
-            filtered_df_with_index = filtered_df.reset_index()
-            line_chart = alt.Chart(filtered_df_with_index).mark_line(point=True).encode(
-                x=alt.X('index:O', title='Review Index'),
-                y=alt.Y('SENTIMENT_SCORE:Q', title='Sentiment Score'),
-                tooltip=['index:O', 'SENTIMENT_SCORE:Q', 'PRODUCT:N']
-            ).properties(
-                width=600,
-                height=300,
-                title=f"Sentiment Score Trend - {product}"
-            )
-            st.altair_chart(line_chart, use_container_width=True)
+            st.altair_chart(charts.sentiment_line(filtered_df, product), use_container_width=True)
         
         with tab3:
             st.write("**Plotly Box Plot - Sentiment Distribution by Product**")
             # Use the full dataset for box plot to show distribution across products
-            box_fig = px.box(
-                st.session_state["df"] if product == "All Products" else filtered_df,
-                x="PRODUCT",
-                y="SENTIMENT_SCORE",
-                title=f"Sentiment Score Distribution Box Plot - {product}",
-                color="PRODUCT"
-            )
-            box_fig.update_layout(xaxis_tickangle=-45, showlegend=False)
-            st.plotly_chart(box_fig, use_container_width=True)
+            box_df = st.session_state["df"] if product == "All Products" else filtered_df
+            st.plotly_chart(charts.sentiment_box(box_df, product), use_container_width=True)
         
         with tab4:
             st.write("**Altair Heatmap - Product Sentiment Matrix**")
-            # Create binned sentiment scores for heatmap
-            filtered_df_heatmap = filtered_df.copy()
-            filtered_df_heatmap['Sentiment_Bin'] = pd.cut(
-                filtered_df_heatmap['SENTIMENT_SCORE'], 
-                bins=5, 
-                labels=['Very Low', 'Low', 'Medium', 'High', 'Very High']
-            )
-            
-            # Create aggregated data for heatmap
-            heatmap_data = filtered_df_heatmap.groupby(['PRODUCT', 'Sentiment_Bin']).size().reset_index(name='Count')
-            
-            heatmap_chart = alt.Chart(heatmap_data).mark_rect().encode(
-                x=alt.X('PRODUCT:N', title='Product'),
-                y=alt.Y('Sentiment_Bin:N', title='Sentiment Level'),
-                color=alt.Color('Count:Q', scale=alt.Scale(scheme='blues')),
-                tooltip=['PRODUCT:N', 'Sentiment_Bin:N', 'Count:Q']
-            ).properties(
-                width=400,
-                height=200,
-                title=f"Product-Sentiment Heatmap - {product}"
-            )
-            st.altair_chart(heatmap_chart, use_container_width=True)
+            st.altair_chart(charts.sentiment_heatmap(filtered_df, product), use_container_width=True)
         
         with tab5:
             st.write("**Matplotlib Pyplot - Sentiment Score Histogram**")
-            # Create matplotlib figure
-            fig, ax = plt.subplots(figsize=(10, 6))
-            
-            # Create histogram
-            ax.hist(filtered_df['SENTIMENT_SCORE'], bins=15, alpha=0.7, color='skyblue', edgecolor='black')
-            ax.set_xlabel('Sentiment Score')
-            ax.set_ylabel('Frequency')
-            ax.set_title(f'Sentiment Score Distribution (Matplotlib) - {product}')
-            ax.grid(True, alpha=0.3)
-            
-            # Add statistics text
-            mean_score = filtered_df['SENTIMENT_SCORE'].mean()
-            std_score = filtered_df['SENTIMENT_SCORE'].std()
-            ax.axvline(mean_score, color='red', linestyle='--', linewidth=2, label=f'Mean: {mean_score:.3f}')
-            ax.legend()
-            
             # Display using st.pyplot()
-            st.pyplot(fig)
-            plt.close()  # Close figure to free memory
+            pyplot_fig = charts.sentiment_pyplot_hist(filtered_df, product)
+            st.pyplot(pyplot_fig)
+            charts.plt.close(pyplot_fig)  # Close figure to free memory
         
         with tab6:
             st.write("**Streamlit Native Scatter Chart**")
-            # Prepare data for st.scatter_chart (needs specific format)
-            scatter_data = filtered_df[['SENTIMENT_SCORE']].copy()
-            scatter_data['Product_Index'] = range(len(scatter_data))
-            scatter_data = scatter_data.rename(columns={'SENTIMENT_SCORE': 'Sentiment'})
-            
             # Create native Streamlit scatter chart
             st.scatter_chart(
-                data=scatter_data,
+                data=charts.native_scatter_data(filtered_df),
                 x='Product_Index',
                 y='Sentiment',
                 size=None,  # Optional: can add size column
@@ -399,16 +419,28 @@ if "df" in st.session_state:
     
     # Add some basic statistics
     st.subheader("📊 Dataset Statistics")
-    col1, col2, col3 = st.columns(3)
+    col1, col2, col3, col4 = st.columns(4)
     
+    # Read the statistics from the per-product aggregates instead of rescanning every row
+    aggregates = st.session_state["aggregates"]
     with col1:
-        st.metric("Total Reviews", len(st.session_state["df"]))
+        st.metric("Total Reviews", int(aggregates["count"].sum()))
     
     with col2:
-        st.metric("Products", st.session_state["df"]["PRODUCT"].nunique())
+        st.metric("Products", len(aggregates))
     
     with col3:
-        avg_sentiment = st.session_state["df"]["SENTIMENT_SCORE"].mean()
+        avg_sentiment = aggregates["sum"].sum() / aggregates["count"].sum()
         st.metric("Avg Sentiment", f"{avg_sentiment:.3f}")
 
+    with col4:
+        if "dedup_stats" in st.session_state:
+            dedup = st.session_state["dedup_stats"]
+            st.metric(
+                "Near-Duplicate Reviews",
+                f"{dedup['dedup_ratio']:.0%}",
+                help=f"{dedup['duplicates']} of {dedup['reviews']} reviews repeat another review almost word for word "
+                f"({dedup['clusters']} distinct reviews). Only one review per cluster is sent to Gemini.",
+            )
+
 # run the app with: streamlit run data_analyzer.py
@@ -0,0 +1,172 @@
+# import packages
+import numpy as np
+import pandas as pd
+
+from search_index import normalize_text
+
+SHINGLE_SIZE = 3
+NUM_PERM = 64
+BANDS = 16
+# Estimated Jaccard similarity of word shingles at which two reviews count as duplicates
+DEFAULT_THRESHOLD = 0.8
+# Shingles hashed per step when building signatures (bounds the temporary arrays)
+SHINGLE_BATCH = 100_000
+GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+
+
+# Helper function to hash the word shingles of each text into one flat array plus offsets
+def shingle_hashes(texts, size=SHINGLE_SIZE):
+    """Returns (uint64 shingle hashes, offsets) where text i owns hashes[offsets[i]:offsets[i + 1]].
+
+    Words are numbered once with pd.factorize and each shingle hash mixes the
+    numbers of its `size` consecutive words, so nothing is hashed string by
+    string. Texts shorter than one shingle get a single shingle of all their
+    words (an empty text gets one of no words).
+    """
+    words = pd.Series(texts, dtype=object).str.split()
+    lengths = words.str.len().to_numpy(dtype=np.int64)
+    word_ids = pd.factorize(words.explode().dropna())[0].astype(np.uint64) + np.uint64(1)
+    word_ends = np.cumsum(lengths)
+    word_starts = word_ends - lengths
+
+    counts = np.maximum(1, lengths - size + 1)
+    offsets = np.r_[0, np.cumsum(counts)]
+    # Position of the first word of every shingle, and how many words it really has
+    first = np.repeat(word_starts, counts) + (np.arange(offsets[-1]) - np.repeat(offsets[:-1], counts))
+    width = np.minimum(size, np.repeat(lengths, counts))
+    padded = np.r_[word_ids, np.zeros(size, dtype=np.uint64)]
+    hashes = np.zeros(offsets[-1], dtype=np.uint64)
+    # Integer overflow is intended here: it mixes the word numbers into one hash
+    with np.errstate(over="ignore"):
+        for i in range(size):
+            hashes = hashes * GOLDEN + np.where(i < width, padded[first + i], np.uint64(0))
+            hashes ^= hashes >> np.uint64(29)
+    return hashes, offsets.astype(np.int64)
+
+
+# Function to compute MinHash signatures and LSH band keys
+def minhash(texts, num_perm=NUM_PERM, bands=BANDS, seed=0):
+    """Returns (signatures, band keys) for a list of normalized texts.
+
+    Each permutation is a multiply-shift hash (the high 32 bits of a * h + b),
+    which needs no modulo. Signatures keep the low 16 bits of each minimum,
+    enough to estimate similarity (b-bit MinHash) in half the memory; band
+    keys are computed from the full minimums, one uint64 per band of
+    num_perm // bands consecutive values.
+    """
+    rng = np.random.default_rng(seed)
+    a = (rng.integers(0, 1 << 63, num_perm, dtype=np.uint64) | np.uint64(1))[:, None]
+    b = rng.integers(0, 1 << 63, num_perm, dtype=np.uint64)[:, None]
+    rows = num_perm // bands
+
+    hashes, offsets = shingle_hashes(texts)
+    signatures = np.empty((len(texts), num_perm), dtype=np.uint16)
+    band_keys = np.empty((len(texts), bands), dtype=np.uint64)
+    start = 0
+    with np.errstate(over="ignore"):
+        while start < len(texts):
+            # Whole texts per step, about SHINGLE_BATCH shingles at a time
+            stop = int(np.searchsorted(offsets, offsets[start] + SHINGLE_BATCH, side="right")) - 1
+            stop = min(max(start + 1, stop), len(texts))
+            chunk = hashes[offsets[start]:offsets[stop]]
+            values = ((a * chunk[None, :] + b) >> np.uint64(32)).astype(np.uint32)
+            mins = np.minimum.reduceat(values, offsets[start:stop] - offsets[start], axis=1).T
+            signatures[start:stop] = mins.astype(np.uint16)
+            keys = np.zeros((stop - start, bands), dtype=np.uint64)
+            for i in range(rows):
+                keys = keys * GOLDEN + mins[:, i::rows]
+            band_keys[start:stop] = keys
+            start = stop
+    return signatures, band_keys
+
+
+# Helper function to merge pairs into connected components; every item ends up labelled with its smallest member
+def connected_components(n, left, right):
+    labels = np.arange(n)
+    while len(left):
+        roots = np.minimum(labels[left], labels[right])
+        before = labels.copy()
+        np.minimum.at(labels, labels[left], roots)
+        np.minimum.at(labels, labels[right], roots)
+        # Pointer jumping until every item points at its root
+        while True:
+            jumped = labels[labels]
+            if np.array_equal(jumped, labels):
+                break
+            labels = jumped
+        if np.array_equal(labels, before):
+            break
+    return labels
+
+
+# Function to cluster near-duplicate texts with MinHash LSH
+def find_near_duplicates(texts, threshold=DEFAULT_THRESHOLD, num_perm=NUM_PERM, bands=BANDS, seed=0):
+    """Returns an int array with, for every text, the position of its cluster's representative.
+
+    Texts are normalized like CLEANED_SUMMARY. Identical texts are grouped
+    first; the distinct texts are then MinHashed, candidate pairs come from
+    sharing any LSH band, and a pair is kept when its estimated similarity is
+    at least threshold. The representative is the first text of each cluster.
+    """
+    normalized = normalize_text(pd.Series(texts).reset_index(drop=True))
+    codes, uniques = pd.factorize(normalized)
+    n_unique = len(uniques)
+    labels = np.arange(n_unique)
+
+    if n_unique > 1:
+        signatures, band_keys = minhash(uniques, num_perm, bands, seed)
+        left, right = [], []
+        for band in range(bands):
+            # Texts with the same band key form a run after sorting; pair each with the run's first text
+            order = np.argsort(band_keys[:, band], kind="stable")
+            keys = band_keys[order, band]
+            starts = np.r_[0, np.flatnonzero(keys[1:] != keys[:-1]) + 1]
+            run_first = order[starts][np.cumsum(np.r_[False, keys[1:] != keys[:-1]])]
+            paired = order != run_first
+            left.append(run_first[paired])
+            right.append(order[paired])
+        left, right = np.concatenate(left), np.concatenate(right)
+        if len(left):
+            # One int64 key per pair makes dropping the pairs found by several bands a 1-D unique
+            pairs = np.unique(left * n_unique + right)
+            pairs = np.stack([pairs // n_unique, pairs % n_unique], axis=1)
+            # Keep only pairs whose signatures agree on enough positions
+            similar = np.concatenate([
+                (signatures[pairs[i:i + 100_000, 0]] == signatures[pairs[i:i + 100_000, 1]]).mean(axis=1) >= threshold
+                for i in range(0, len(pairs), 100_000)
+            ])
+            labels = connected_components(n_unique, pairs[similar, 0], pairs[similar, 1])
+
+    # factorize numbers texts by first appearance, so the smallest label is also the earliest row
+    first_row = np.empty(n_unique, dtype=np.int64)
+    first_row[codes[::-1]] = np.arange(len(codes))[::-1]
+    return first_row[labels[codes]]
+
+
+# Helper function to summarize a clustering: reviews, clusters and the share of duplicates
+def dedup_stats(representatives):
+    rows = len(representatives)
+    clusters = len(np.unique(representatives))
+    return {
+        "reviews": rows,
+        "clusters": clusters,
+        "duplicates": rows - clusters,
+        "dedup_ratio": (rows - clusters) / rows if rows else 0.0,
+    }
+
+
+# Function to run an expensive step on cluster representatives only and copy the results to the members
+def fan_out(texts, compute, representatives=None):
+    """Returns (results aligned with texts, dedup stats).
+
+    compute takes a Series of representative texts and returns one result per
+    text in the same order, for example a list of sentiment labels.
+    """
+    texts = pd.Series(texts).reset_index(drop=True)
+    if representatives is None:
+        representatives = find_near_duplicates(texts)
+    unique = np.unique(representatives)
+    results = np.asarray(list(compute(texts.iloc[unique])) if len(unique) else [], dtype=object)
+    position = np.empty(len(texts), dtype=np.int64)
+    position[unique] = np.arange(len(unique))
+    return results[position[representatives]].tolist(), dedup_stats(representatives)
@@ -0,0 +1,381 @@
+"""Evaluate LLM sentiment classifiers against labelled reviews.
+
+Runs one or more classifiers (provider:model:prompt) over a review CSV and
+compares their labels with the reference labels: SENTIMENT_SCORE thresholded
+at 0.4/0.6 by default, or a label column given with --label-column. Reports a
+confusion matrix, accuracy, Cohen's kappa, per-product accuracy, and cost and
+latency per 1k reviews, so models and prompt versions can be compared.
+
+    python evaluate_sentiment.py                                  # Gemini 2.5 Flash, prompt v1
+    python evaluate_sentiment.py --classifier gemini:models/gemini-2.5-flash:v1 \\
+        --classifier openai:gpt-4o:m1-lab --min-accuracy 0.8
+    python evaluate_sentiment.py --classifier gemini:models/gemini-2.5-flash:batch-json   # the app's batch call
+    LLM_STUB_URL=http://127.0.0.1:8765 python evaluate_sentiment.py --limit 1000
+
+Calls run concurrently in batches and every reply is cached on disk by
+(provider, model, prompt, review text), so re-running only pays for new reviews.
+"""
+# import packages
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from llm import (
+    SENTIMENT_BATCH_SIZE,
+    SENTIMENT_PROMPT,
+    batch_generation_config,
+    build_batch_prompt,
+    configure_gemini,
+    get_gemini_model,
+    get_stub_url,
+    parse_batch_sentiment,
+    parse_sentiment,
+)
+from review_pipeline import SENTIMENT_ORDER, categorize_scores, get_dataset_path, load_reviews
+
+CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".sentiment_eval_cache.jsonl")
+DEFAULT_CLASSIFIERS = ["gemini:models/gemini-2.5-flash:v1"]
+
+# Prompt versions; {text} is replaced by the review
+PROMPTS = {
+    "v1": SENTIMENT_PROMPT,
+    "m1-lab": "Classify the sentiment of the following review as exactly one word: Positive, Negative, or Neutral.\n\nWhat's the sentiment of this review? {text}",
+}
+# Prompt versions that classify SENTIMENT_BATCH_SIZE reviews per call as structured JSON (Gemini only);
+# batch-json is the call the app and batch_sentiment.py make through classify_sentiment_batch
+BATCH_PROMPTS = {"batch-json"}
+
+# USD per 1M (input, output) tokens; check the provider's pricing page before relying on these
+PRICING = {
+    "models/gemini-2.5-flash": (0.30, 2.50),
+    "models/gemini-2.5-flash-lite": (0.10, 0.40),
+    "models/gemini-2.5-pro": (1.25, 10.00),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+}
+
+
+# --- Model calls ---
+# Helper function to count billed output tokens; Gemini 2.5 bills thinking tokens as output too
+def gemini_output_tokens(usage):
+    return usage.candidates_token_count + (getattr(usage, "thoughts_token_count", 0) or 0)
+
+
+def call_gemini(model, prompt):
+    """Returns (reply text, input tokens, output tokens)."""
+    response = get_gemini_model(model).generate_content(prompt)
+    usage = response.usage_metadata
+    return response.text, usage.prompt_token_count, gemini_output_tokens(usage)
+
+
+def call_gemini_batch(model, reviews):
+    """Makes the app's structured batch call. Returns ({row id: label}, missing ids, input tokens, output tokens)."""
+    response = get_gemini_model(model).generate_content(
+        build_batch_prompt(reviews), generation_config=batch_generation_config(len(reviews))
+    )
+    parsed, missing = parse_batch_sentiment(response.text, list(reviews))
+    usage = response.usage_metadata
+    labels = {row_id: label for row_id, (label, _) in parsed.items()}
+    return labels, missing, usage.prompt_token_count, gemini_output_tokens(usage)
+
+
+_openai_client = None
+
+
+def call_openai(model, prompt):
+    """Returns (reply text, input tokens, output tokens)."""
+    global _openai_client
+    if _openai_client is None:
+        import openai
+
+        stub_url = get_stub_url()
+        _openai_client = openai.OpenAI(base_url=f"{stub_url}/v1", api_key="stub-key") if stub_url else openai.OpenAI()
+    response = _openai_client.responses.create(model=model, input=prompt, temperature=0, max_output_tokens=16)
+    return response.output[0].content[0].text, response.usage.input_tokens, response.usage.output_tokens
+
+
+PROVIDERS = {"gemini": call_gemini, "openai": call_openai}
+
+
+# --- Reply cache ---
+class ReplyCache:
+    """Append-only JSON-lines cache of model replies."""
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        if path and os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    entry = json.loads(line)
+                    self.entries[entry["key"]] = entry
+
+    @staticmethod
+    def key(provider, model, prompt_version, text):
+        return hashlib.sha256(f"{provider}\0{model}\0{prompt_version}\0{text}".encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def add(self, entries):
+        for entry in entries:
+            self.entries[entry["key"]] = entry
+        if self.path and entries:
+            with open(self.path, "a") as f:
+                for entry in entries:
+                    f.write(json.dumps(entry) + "\n")
+
+
+# Helper function to classify one review and time the call
+def classify_one(provider, model, prompt_version, text, key):
+    start = time.perf_counter()
+    try:
+        reply, input_tokens, output_tokens = PROVIDERS[provider](model, PROMPTS[prompt_version].format(text=text))
+    except Exception as e:
+        return {"key": key, "label": None, "error": str(e), "latency": time.perf_counter() - start}
+    return {
+        "key": key,
+        "label": parse_sentiment(reply),
+        "input_tokens": input_tokens,
+        "output_tokens": output_tokens,
+        "latency": time.perf_counter() - start,
+    }
+
+
+# Helper function to classify several reviews with one structured batch call
+def classify_batch(model, texts, keys):
+    """Returns one result per review. Tokens are split evenly over the reviews and each
+    review gets the latency of the whole call; reviews the reply skipped count as errors."""
+    start = time.perf_counter()
+    try:
+        labels, missing, input_tokens, output_tokens = call_gemini_batch(model, dict(enumerate(texts)))
+    except Exception as e:
+        latency = time.perf_counter() - start
+        return [{"key": key, "label": None, "error": str(e), "latency": latency} for key in keys]
+    latency = time.perf_counter() - start
+    results = []
+    for i, key in enumerate(keys):
+        if i in missing:
+            results.append({"key": key, "label": None, "error": "missing from the batch reply", "latency": latency})
+            continue
+        results.append({
+            "key": key,
+            "label": labels[i],
+            "input_tokens": input_tokens / len(keys),
+            "output_tokens": output_tokens / len(keys),
+            "latency": latency,
+        })
+    return results
+
+
+# Function to classify a column of reviews in concurrent batches, reusing cached replies
+def classify_reviews(texts, classifier, cache, batch_size=50, concurrency=8):
+    """Returns (result dicts aligned with texts, number of uncached calls, wall seconds they took)."""
+    provider, model, prompt_version = classifier
+    keys = [ReplyCache.key(provider, model, prompt_version, text) for text in texts]
+    results = [cache.get(key) for key in keys]
+    missing = [i for i, result in enumerate(results) if result is None]
+
+    wall_seconds = 0.0
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for start in range(0, len(missing), batch_size):
+            batch = missing[start:start + batch_size]
+            batch_start = time.perf_counter()
+            if prompt_version in BATCH_PROMPTS:
+                # One structured call per SENTIMENT_BATCH_SIZE reviews, as the app makes them
+                groups = [batch[g:g + SENTIMENT_BATCH_SIZE] for g in range(0, len(batch), SENTIMENT_BATCH_SIZE)]
+                replies = [reply for group in pool.map(
+                    lambda group: classify_batch(model, [texts[i] for i in group], [keys[i] for i in group]), groups
+                ) for reply in group]
+            else:
+                replies = list(pool.map(lambda i: classify_one(provider, model, prompt_version, texts[i], keys[i]), batch))
+            wall_seconds += time.perf_counter() - batch_start
+            # Failed calls are reported but not cached, so the next run retries them
+            cache.add([reply for reply in replies if reply["label"] is not None])
+            for i, reply in zip(batch, replies):
+                results[i] = reply
+            print(f"  {classifier_name(classifier)}: {min(start + batch_size, len(missing))}/{len(missing)} uncached reviews")
+    return results, len(missing), wall_seconds
+
+
+# --- Metrics ---
+def confusion_matrix(reference, predicted):
+    """Counts with reference labels as rows and predicted labels as columns."""
+    matrix = pd.crosstab(
+        pd.Categorical(reference, categories=SENTIMENT_ORDER),
+        pd.Categorical(predicted, categories=SENTIMENT_ORDER),
+        dropna=False,
+    )
+    # Plain string labels (not categorical) so the matrix serializes cleanly to Arrow
+    matrix.index = pd.Index(SENTIMENT_ORDER, name="Reference")
+    matrix.columns = pd.Index(SENTIMENT_ORDER, name="Predicted")
+    return matrix
+
+
+def cohen_kappa(matrix):
+    """Agreement corrected for chance, from a square confusion matrix."""
+    counts = matrix.to_numpy(dtype=np.float64)
+    total = counts.sum()
+    if total == 0:
+        return float("nan")
+    observed = np.trace(counts) / total
+    expected = (counts.sum(axis=0) * counts.sum(axis=1)).sum() / total ** 2
+    return float((observed - expected) / (1 - expected)) if expected < 1 else 1.0
+
+
+def agreement_summary(reference, predicted):
+    """Returns accuracy, Cohen's kappa and the confusion matrix for two label columns."""
+    reference = pd.Series(reference).astype("string").reset_index(drop=True)
+    predicted = pd.Series(predicted).astype("string").reset_index(drop=True)
+    matrix = confusion_matrix(reference, predicted)
+    return {
+        "accuracy": float((reference == predicted).mean()) if len(reference) else float("nan"),
+        "kappa": cohen_kappa(matrix),
+        "confusion": matrix,
+    }
+
+
+def per_product_accuracy(df, reference_column, predicted_column):
+    matches = df[reference_column].astype("string") == df[predicted_column].astype("string")
+    return matches.groupby(df["PRODUCT"]).agg(["mean", "count"]).rename(columns={"mean": "Accuracy", "count": "Reviews"})
+
+
+def cost_per_1k(model, input_tokens, output_tokens, n_reviews):
+    """USD per 1k reviews from mean token usage, or None when the model has no price."""
+    if model not in PRICING or n_reviews == 0:
+        return None
+    input_price, output_price = PRICING[model]
+    return (input_tokens * input_price + output_tokens * output_price) / 1e6 / n_reviews * 1000
+
+
+def classifier_name(classifier):
+    return ":".join(classifier)
+
+
+# Function to evaluate one classifier on a labelled DataFrame
+def evaluate(df, classifier, cache, batch_size=50, concurrency=8, reference_column="Reference"):
+    texts = df["SUMMARY"].fillna("").tolist()
+    results, uncached, wall_seconds = classify_reviews(texts, classifier, cache, batch_size, concurrency)
+    labelled = df.assign(Predicted=[r["label"] for r in results])
+    ok = labelled["Predicted"].notna()
+    summary = agreement_summary(labelled.loc[ok, reference_column], labelled.loc[ok, "Predicted"])
+
+    succeeded = [r for r in results if r["label"] is not None]
+    latencies = np.array([r["latency"] for r in succeeded]) if succeeded else np.array([np.nan])
+    input_tokens = sum(r["input_tokens"] for r in succeeded)
+    output_tokens = sum(r["output_tokens"] for r in succeeded)
+    return {
+        "classifier": classifier_name(classifier),
+        "reviews": len(df),
+        "errors": int((~ok).sum()),
+        "accuracy": summary["accuracy"],
+        "kappa": summary["kappa"],
+        "confusion": summary["confusion"],
+        "per_product": per_product_accuracy(labelled[ok], reference_column, "Predicted"),
+        "mean_latency_ms": float(np.nanmean(latencies) * 1000),
+        "p95_latency_ms": float(np.nanpercentile(latencies, 95) * 1000),
+        # Wall time per 1k with this run's concurrency; only measured when something was uncached
+        "wall_seconds_per_1k": wall_seconds / uncached * 1000 if uncached else None,
+        "tokens_per_review": (input_tokens + output_tokens) / len(succeeded) if succeeded else None,
+        "cost_per_1k_usd": cost_per_1k(classifier[1], input_tokens, output_tokens, len(succeeded)),
+        "predictions": labelled["Predicted"],
+    }
+
+
+# Function to pick the cheapest classifier that meets the accuracy bar (then the fastest)
+def recommend(reports, min_accuracy):
+    passing = [r for r in reports if r["accuracy"] >= min_accuracy]
+    if not passing:
+        return None
+    return min(passing, key=lambda r: (
+        r["cost_per_1k_usd"] if r["cost_per_1k_usd"] is not None else float("inf"),
+        r["mean_latency_ms"],
+    ))
+
+
+def print_report(report):
+    print(f"\n=== {report['classifier']} ===")
+    print(f"Reviews: {report['reviews']}  errors: {report['errors']}")
+    print(f"Accuracy: {report['accuracy']:.1%}  Cohen's kappa: {report['kappa']:.3f}")
+    cost = report["cost_per_1k_usd"]
+    wall = report["wall_seconds_per_1k"]
+    print(
+        f"Latency: mean {report['mean_latency_ms']:.0f} ms, p95 {report['p95_latency_ms']:.0f} ms per call; "
+        f"{f'{wall:.1f} s' if wall is not None else 'n/a (all cached)'} wall time per 1k reviews"
+    )
+    print(f"Cost per 1k reviews: {f'${cost:.4f}' if cost is not None else 'unknown (no price for model)'}")
+    print("\nConfusion matrix:")
+    print(report["confusion"].to_string())
+    print("\nAccuracy by product:")
+    print(report["per_product"].to_string(float_format=lambda x: f"{x:.1%}"))
+
+
+def parse_classifier(spec):
+    provider, _, rest = spec.partition(":")
+    model, _, prompt_version = rest.rpartition(":")
+    if provider not in PROVIDERS or not model or prompt_version not in set(PROMPTS) | BATCH_PROMPTS:
+        raise argparse.ArgumentTypeError(
+            f"expected provider:model:prompt with provider in {sorted(PROVIDERS)} "
+            f"and prompt in {sorted(set(PROMPTS) | BATCH_PROMPTS)}"
+        )
+    if prompt_version in BATCH_PROMPTS and provider != "gemini":
+        raise argparse.ArgumentTypeError(f"prompt {prompt_version} is a structured Gemini batch call")
+    return provider, model, prompt_version
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate sentiment classifiers against labelled reviews.")
+    parser.add_argument("--data", default=get_dataset_path(), help="Review CSV (needs SUMMARY and PRODUCT)")
+    parser.add_argument("--label-column", help="Column with reference labels (default: SENTIMENT_SCORE at 0.4/0.6)")
+    parser.add_argument("--classifier", type=parse_classifier, action="append",
+                        help="provider:model:prompt, repeatable (default: %(default)s)")
+    parser.add_argument("--limit", type=int, help="Only evaluate the first N reviews")
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--min-accuracy", type=float, default=0.8, help="Accuracy bar for the recommendation")
+    parser.add_argument("--cache", default=CACHE_PATH, help="Reply cache file ('' disables caching)")
+    parser.add_argument("--json", help="Also write the summary to this JSON file")
+    args = parser.parse_args()
+    classifiers = args.classifier or [parse_classifier(spec) for spec in DEFAULT_CLASSIFIERS]
+
+    df = load_reviews(args.data)
+    if args.limit:
+        df = df.head(args.limit)
+    reference = df[args.label_column] if args.label_column else categorize_scores(df["SENTIMENT_SCORE"])
+    df = df.assign(Reference=pd.Series(reference, index=df.index).astype("string"))
+
+    if any(c[0] == "gemini" for c in classifiers) and not configure_gemini():
+        raise SystemExit("GEMINI_API_KEY not found (or set LLM_STUB_URL to use the stub server).")
+
+    cache = ReplyCache(args.cache)
+    reports = []
+    for classifier in classifiers:
+        report = evaluate(df, classifier, cache, args.batch_size, args.concurrency)
+        print_report(report)
+        reports.append(report)
+
+    best = recommend(reports, args.min_accuracy)
+    print()
+    if best:
+        print(f"Cheapest classifier with accuracy >= {args.min_accuracy:.0%}: {best['classifier']}")
+    else:
+        print(f"No classifier reached accuracy >= {args.min_accuracy:.0%}.")
+
+    if args.json:
+        skip = {"confusion", "per_product", "predictions"}
+        with open(args.json, "w") as f:
+            json.dump([
+                dict({k: v for k, v in r.items() if k not in skip},
+                     confusion=r["confusion"].to_dict(), per_product=r["per_product"]["Accuracy"].to_dict())
+                for r in reports
+            ], f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Startup timing report for a Streamlit app.
+
+Runs the app's first script run (what a new session sees before any click)
+in a fresh interpreter with `python -X importtime`, then summarizes import
+time by top-level package next to the time to first paint.
+
+    python import_report.py data_analyzer.py
+    python import_report.py ../M3/Lesson_03/Lab2/M3Lab2.py --top 30
+"""
+# import packages
+import argparse
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s+)(\S+)")
+
+# Runs the first script run headlessly and prints its wall time
+FIRST_PAINT_SNIPPET = """
+import sys, time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file(sys.argv[1], default_timeout=120)
+at.run()
+print(f"FIRST_PAINT {time.perf_counter() - start:.4f}")
+"""
+
+
+# Helper function to add up -X importtime output: self time per top-level package, and the total
+def summarize_import_times(stderr):
+    """Returns ({package: self seconds}, total import seconds)."""
+    by_package = defaultdict(float)
+    entries = []
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        by_package[name.split(".")[0]] += int(self_us) / 1e6
+        entries.append((len(indent), int(cumulative_us) / 1e6))
+
+    # Lines come out as imports finish, so a nested import can be printed before the outermost one that
+    # contains it. Only the outermost imports count towards the total, once every indent is known.
+    top_level_indent = min((indent for indent, _ in entries), default=0)
+    total = sum(cumulative for indent, cumulative in entries if indent == top_level_indent)
+    return dict(by_package), total
+
+
+# Function to run the app once under -X importtime
+def collect_import_times(script_path):
+    """Returns (first paint seconds, {package: self seconds}, total import seconds)."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", FIRST_PAINT_SNIPPET, script_path],
+        capture_output=True,
+        text=True,
+        cwd=os.path.dirname(script_path),
+    )
+    first_paint = None
+    for line in result.stdout.splitlines():
+        if line.startswith("FIRST_PAINT"):
+            first_paint = float(line.split()[1])
+
+    if first_paint is None:
+        raise RuntimeError(f"App run failed:\n{result.stderr[-2000:]}")
+    by_package, total = summarize_import_times(result.stderr)
+    return first_paint, by_package, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize -X importtime for a Streamlit app's first run.")
+    parser.add_argument("script", help="Path to the Streamlit app")
+    parser.add_argument("--top", type=int, default=20, help="Number of packages to list")
+    args = parser.parse_args()
+
+    first_paint, by_package, total = collect_import_times(os.path.abspath(args.script))
+    print(f"Time to first paint: {first_paint * 1000:8.1f} ms (includes loading Streamlit)")
+    print(f"Total import time:   {total * 1000:8.1f} ms\n")
+    print(f"{'package':<32} {'self ms':>10}")
+    for name, seconds in sorted(by_package.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"{name:<32} {seconds * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
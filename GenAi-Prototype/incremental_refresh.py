@@ -0,0 +1,94 @@
+# import packages
+import pandas as pd
+
+KEY_COLUMN = "Order ID"
+CONTENT_COLUMNS = ["PRODUCT", "DATE", "SUMMARY", "SENTIMENT_SCORE"]
+
+
+# Helper function to hash the content of every review, indexed by Order ID
+def row_hashes(df):
+    columns = [c for c in CONTENT_COLUMNS if c in df.columns]
+    hashes = pd.util.hash_pandas_object(df[columns], index=False)
+    hashes.index = df[KEY_COLUMN].to_numpy()
+    if not hashes.index.is_unique:
+        raise ValueError(f"{KEY_COLUMN} must be unique for an incremental refresh")
+    return hashes
+
+
+# Function to find new, changed and removed reviews between two versions of the dataset
+def diff_reviews(previous, current):
+    """Returns (new_ids, changed_ids, removed_ids) as pandas Index objects of Order IDs."""
+    previous_hashes = row_hashes(previous)
+    current_hashes = row_hashes(current)
+
+    new_ids = current_hashes.index.difference(previous_hashes.index)
+    removed_ids = previous_hashes.index.difference(current_hashes.index)
+    common_ids = current_hashes.index.intersection(previous_hashes.index)
+    changed = current_hashes.loc[common_ids].to_numpy() != previous_hashes.loc[common_ids].to_numpy()
+    return new_ids, common_ids[changed], removed_ids
+
+
+# Helper function to get the per-product sum and count of sentiment scores
+def product_aggregates(df):
+    return df.groupby("PRODUCT")["SENTIMENT_SCORE"].agg(["sum", "count"])
+
+
+# Helper function to update product aggregates with only the rows that left and arrived
+def update_aggregates(aggregates, removed_rows, added_rows):
+    updated = aggregates.sub(product_aggregates(removed_rows), fill_value=0)
+    updated = updated.add(product_aggregates(added_rows), fill_value=0)
+    return updated[updated["count"] > 0]
+
+
+# Helper function to turn aggregates into the average sentiment per product
+def aggregate_means(aggregates):
+    return aggregates["sum"] / aggregates["count"]
+
+
+# Function to merge a new version of the dataset into the previous one
+def refresh_reviews(previous, current, derived, aggregates=None, rollup=None):
+    """Recomputes derived columns only for new and changed rows.
+
+    derived maps a column name to a function that takes the rows needing that
+    column and returns the values; columns not present in `previous` are skipped.
+    A tuple of column names is filled from one call that returns a DataFrame.
+    A rollup (see rollups.py), if given, is updated in place with the same rows.
+    Returns (merged DataFrame, updated aggregates, summary dict).
+    """
+    new_ids, changed_ids, removed_ids = diff_reviews(previous, current)
+    dirty_ids = new_ids.append(changed_ids)
+
+    merged = current.set_index(KEY_COLUMN)
+    carried = previous.set_index(KEY_COLUMN)
+    for column, compute in derived.items():
+        columns = list(column) if isinstance(column, tuple) else [column]
+        if not all(c in carried.columns for c in columns):
+            continue
+        # Unchanged rows keep their previous value; only dirty rows are recomputed
+        merged[columns] = carried[columns].reindex(merged.index)
+        if len(dirty_ids):
+            merged.loc[dirty_ids, columns] = compute(merged.loc[dirty_ids]).to_numpy().reshape(len(dirty_ids), -1)
+
+    if aggregates is None:
+        aggregates = product_aggregates(current)
+    else:
+        aggregates = update_aggregates(
+            aggregates,
+            carried.loc[removed_ids.append(changed_ids)],
+            merged.loc[dirty_ids],
+        )
+    if rollup is not None:
+        rollup.remove(carried.loc[removed_ids.append(changed_ids)])
+        rollup.add(merged.loc[dirty_ids])
+
+    summary = {
+        "new": len(new_ids),
+        "changed": len(changed_ids),
+        "removed": len(removed_ids),
+        "unchanged": len(merged) - len(dirty_ids),
+    }
+    # Keep the previous column order, with any new source columns at the end
+    merged = merged.reset_index()
+    ordered = [c for c in previous.columns if c in merged.columns]
+    merged = merged[ordered + [c for c in merged.columns if c not in ordered]]
+    return merged, aggregates, summary
@@ -0,0 +1,36 @@
+# import packages
+import importlib
+import threading
+import time
+
+# Seconds spent on the first import of each lazily loaded module
+LOAD_TIMES = {}
+_lock = threading.Lock()
+
+
+class LazyModule:
+    """Stands in for a module and imports it on first attribute access."""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def _load(self):
+        with _lock:
+            if self._module is None:
+                start = time.perf_counter()
+                self._module = importlib.import_module(self._name)
+                LOAD_TIMES[self._name] = time.perf_counter() - start
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._module or self._load(), attr)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+# Helper function to declare a module that is imported the first time it is used
+def lazy_module(name):
+    return LazyModule(name)
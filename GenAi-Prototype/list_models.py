@@ -1,18 +1,10 @@
 # import packages
-from dotenv import load_dotenv
-import os
-import google.generativeai as genai
+from llm import configure_gemini, load_gemini
 
-# load environment variables from .env file
-load_dotenv()
-
-# Get Gemini API key from environment
-api_key = os.getenv("GEMINI_API_KEY")
-if not api_key:
+# Configure Gemini client (loads .env; set LLM_STUB_URL to use the local stub server)
+if not configure_gemini():
     raise ValueError("GEMINI_API_KEY not found in environment. Please set it in your .env file.")
-
-# Configure Gemini client
-genai.configure(api_key=api_key)
+genai = load_gemini()
 
 # List all available models
 print("Available models:")
@@ -0,0 +1,213 @@
+# import packages
+import json
+import os
+import pandas as pd
+from dotenv import load_dotenv
+from lazy_imports import lazy_module
+
+# The Gemini SDK is slow to import, so it is loaded on the first model call
+genai = lazy_module("google.generativeai")
+
+# Load environment variables
+load_dotenv()
+
+GEMINI_MODEL = "models/gemini-2.5-flash"
+VALID_SENTIMENTS = ["Positive", "Negative", "Neutral"]
+SENTIMENT_PROMPT = "Classify the sentiment of the following customer review as exactly one word: Positive, Negative, or Neutral.\n\nReview: {text}\n\nSentiment:"
+
+# Structured batch classification: many reviews per call, answered as JSON
+SENTIMENT_BATCH_SIZE = 25
+SENTIMENT_BATCH_PROMPT = (
+    "Classify the sentiment of each customer review below as Positive, Negative, or Neutral. "
+    "Return one result per review with its id, the label and your confidence from 0 to 1.\n\n{reviews}"
+)
+SENTIMENT_BATCH_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "results": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "id": {"type": "integer"},
+                    "label": {"type": "string", "enum": VALID_SENTIMENTS},
+                    "confidence": {"type": "number"},
+                },
+                "required": ["id", "label", "confidence"],
+            },
+        },
+    },
+    "required": ["results"],
+}
+# About {"id": 12, "label": "Negative", "confidence": 0.92} per review plus the wrapper
+TOKENS_PER_RESULT = 24
+RESULT_OVERHEAD_TOKENS = 16
+# Gemini 2.5 models count thinking tokens against max_output_tokens, and this SDK cannot turn thinking off
+GEMINI_THINKING_HEADROOM = 1024
+
+# Settings recorded by configure_gemini() and applied by load_gemini() on first use
+_gemini_settings = {}
+_gemini_configured = False
+
+# Relaxed safety settings so product complaints are not blocked
+SAFETY_SETTINGS = [
+    {
+        "category": "HARM_CATEGORY_HARASSMENT",
+        "threshold": "BLOCK_NONE"
+    },
+    {
+        "category": "HARM_CATEGORY_HATE_SPEECH",
+        "threshold": "BLOCK_NONE"
+    },
+    {
+        "category": "HARM_CATEGORY_SEXUALLY_EXPLICIT",
+        "threshold": "BLOCK_NONE"
+    },
+    {
+        "category": "HARM_CATEGORY_DANGEROUS_CONTENT",
+        "threshold": "BLOCK_NONE"
+    }
+]
+
+
+# Helper function to get the local stub server URL (empty when not load testing)
+def get_stub_url():
+    """Returns LLM_STUB_URL without a trailing slash, or an empty string."""
+    return os.getenv("LLM_STUB_URL", "").rstrip("/")
+
+
+# Helper function to configure the Gemini client
+def configure_gemini():
+    """Checks Gemini settings (real API or stub server). Returns True if usable.
+
+    The SDK is only imported and configured later, by load_gemini().
+    """
+    global _gemini_configured
+    _gemini_settings.clear()
+    _gemini_configured = False
+
+    stub_url = get_stub_url()
+    if stub_url:
+        # The stub speaks the REST protocol, so skip gRPC and point the client at it
+        _gemini_settings.update(
+            api_key=os.getenv("GEMINI_API_KEY") or "stub-key",
+            transport="rest",
+            client_options={"api_endpoint": stub_url},
+        )
+        return True
+
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        return False
+    _gemini_settings.update(api_key=api_key)
+    return True
+
+
+# Helper function to import and configure the Gemini SDK on first use
+def load_gemini():
+    """Returns the configured google.generativeai module."""
+    global _gemini_configured
+    if not _gemini_configured:
+        genai.configure(**_gemini_settings)
+        _gemini_configured = True
+    return genai
+
+
+# Helper function to create a Gemini model instance
+def get_gemini_model(model_name=GEMINI_MODEL):
+    return load_gemini().GenerativeModel(model_name, safety_settings=SAFETY_SETTINGS)
+
+
+# Function to classify the sentiment of one review with Gemini
+def classify_sentiment(text, model_name=GEMINI_MODEL):
+    """Returns Positive, Negative or Neutral. API errors are raised to the caller."""
+    if not text or pd.isna(text):
+        return "Neutral"
+
+    # Create prompt for sentiment analysis
+    response = get_gemini_model(model_name).generate_content(SENTIMENT_PROMPT.format(text=text))
+    return parse_sentiment(response.text)
+
+
+# Helper function to map a model reply to Positive, Negative or Neutral
+def parse_sentiment(reply):
+    sentiment = reply.strip()
+
+    # Ensure valid response
+    if sentiment in VALID_SENTIMENTS:
+        return sentiment
+    # Try to extract valid sentiment from response
+    for valid in VALID_SENTIMENTS:
+        if valid.lower() in sentiment.lower():
+            return valid
+    return "Neutral"
+
+
+# Helper function to get the output token limit for a batch of n reviews
+def batch_max_tokens(n_reviews):
+    return RESULT_OVERHEAD_TOKENS + TOKENS_PER_RESULT * n_reviews
+
+
+# Helper function to get the generation settings of a structured batch call for n reviews
+def batch_generation_config(n_reviews):
+    return {
+        "response_mime_type": "application/json",
+        "response_schema": SENTIMENT_BATCH_SCHEMA,
+        "max_output_tokens": batch_max_tokens(n_reviews) + GEMINI_THINKING_HEADROOM,
+        "temperature": 0,
+    }
+
+
+# Helper function to build the batch prompt; each review is tagged with its row id
+def build_batch_prompt(reviews):
+    """reviews maps row id -> text."""
+    lines = [f"[{row_id}] {' '.join(str(text).split())}" for row_id, text in reviews.items()]
+    return SENTIMENT_BATCH_PROMPT.format(reviews="\n".join(lines))
+
+
+# Function to parse a structured batch reply strictly
+def parse_batch_sentiment(reply, expected_ids):
+    """Returns ({row id: (label, confidence)}, missing ids).
+
+    Raises ValueError when the reply is not the expected JSON shape or names
+    an id that was not asked for; ids the model skipped are returned as missing.
+    """
+    data = json.loads(reply)
+    if not isinstance(data, dict) or not isinstance(data.get("results"), list):
+        raise ValueError("Expected a JSON object with a results list")
+    expected = set(expected_ids)
+    parsed = {}
+    for item in data["results"]:
+        row_id, label, confidence = item.get("id"), item.get("label"), item.get("confidence")
+        if not isinstance(row_id, int) or row_id not in expected or row_id in parsed:
+            raise ValueError(f"Unexpected or repeated id in reply: {row_id!r}")
+        if label not in VALID_SENTIMENTS:
+            raise ValueError(f"Invalid label for id {row_id}: {label!r}")
+        if not isinstance(confidence, (int, float)):
+            raise ValueError(f"Invalid confidence for id {row_id}: {confidence!r}")
+        parsed[row_id] = (label, min(max(float(confidence), 0.0), 1.0))
+    return parsed, [row_id for row_id in expected_ids if row_id not in parsed]
+
+
+# Function to classify a batch of reviews with one structured Gemini call
+def classify_sentiment_batch(reviews, model_name=GEMINI_MODEL):
+    """reviews maps row id -> text. Returns {row id: (label, confidence)}.
+
+    Empty reviews are Neutral without a call. Ids the model skips are retried
+    once in a smaller call; API and parse errors are raised to the caller.
+    """
+    results = {row_id: ("Neutral", 1.0) for row_id, text in reviews.items() if not text or pd.isna(text)}
+    pending = {row_id: text for row_id, text in reviews.items() if row_id not in results}
+    for _ in range(2):
+        if not pending:
+            break
+        response = get_gemini_model(model_name).generate_content(
+            build_batch_prompt(pending),
+            generation_config=batch_generation_config(len(pending)),
+        )
+        parsed, missing = parse_batch_sentiment(response.text, list(pending))
+        results.update(parsed)
+        pending = {row_id: pending[row_id] for row_id in missing}
+    if pending:
+        raise ValueError(f"No sentiment returned for ids {sorted(pending)}")
+    return results
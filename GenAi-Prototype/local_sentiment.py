@@ -0,0 +1,209 @@
+"""Local sentiment pre-classifier with LLM fallback for uncertain reviews.
+
+A logistic regression over hashed word unigrams and bigrams, trained on the
+SENTIMENT_SCORE categories and run with vectorized NumPy. Reviews it is
+confident about are labelled locally; the rest are escalated to an LLM.
+
+    python local_sentiment.py train                        # fit on customer_reviews.csv, save sentiment_model.npz
+    python local_sentiment.py evaluate --holdout 0.3       # accuracy and escalation rate per confidence threshold
+"""
+# import packages
+import argparse
+import os
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from review_pipeline import SENTIMENT_ORDER, categorize_scores, get_dataset_path, load_reviews
+from search_index import normalize_text
+
+N_FEATURES = 2 ** 18
+CHUNK_SIZE = 50_000
+DEFAULT_MIN_CONFIDENCE = 0.8
+MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sentiment_model.npz")
+
+
+# Helper function to turn texts into a sparse bag of hashed unigrams and bigrams
+def hashed_features(texts, n_features=N_FEATURES):
+    """Returns (rows, columns, values) of a binary, L2-normalized feature matrix."""
+    texts = normalize_text(pd.Series(texts).reset_index(drop=True))
+    tokens = texts.str.split().explode().dropna()
+    rows = tokens.index.to_numpy(np.int64)
+    # Hash each distinct token once; crc32 is stable across processes, unlike hash()
+    codes, uniques = pd.factorize(tokens)
+    token_hashes = np.array([zlib.crc32(t.encode("utf-8")) for t in uniques], dtype=np.int64)[codes]
+
+    # Bigrams are consecutive tokens of the same review
+    same_row = rows[1:] == rows[:-1]
+    bigram_hashes = (token_hashes[:-1] * 1_000_003 + token_hashes[1:] + 1)[same_row]
+    feature_rows = np.concatenate([rows, rows[1:][same_row]])
+    columns = np.concatenate([token_hashes, bigram_hashes]) % n_features
+
+    # Binary features: keep each (row, column) pair once
+    keys = np.sort(feature_rows * n_features + columns)
+    keys = keys[np.concatenate([[True], keys[1:] != keys[:-1]])] if len(keys) else keys
+    feature_rows, columns = keys // n_features, keys % n_features
+    per_row = np.bincount(feature_rows, minlength=len(texts))
+    values = (1.0 / np.sqrt(per_row[feature_rows])).astype(np.float32)
+    return feature_rows, columns, values
+
+
+class LocalSentimentModel:
+    """Multinomial logistic regression over hashed features."""
+
+    def __init__(self, weights, bias, classes=SENTIMENT_ORDER):
+        self.weights = weights
+        self.bias = bias
+        self.classes = list(classes)
+
+    @property
+    def n_features(self):
+        return self.weights.shape[0]
+
+    @staticmethod
+    def _scores(weights, bias, rows, columns, values, n_rows):
+        # Sparse matrix times weights: one bincount per class
+        return np.stack([
+            np.bincount(rows, weights=values * weights[columns, k], minlength=n_rows)
+            for k in range(weights.shape[1])
+        ], axis=1) + bias
+
+    @staticmethod
+    def _softmax(scores):
+        scores = scores - scores.max(axis=1, keepdims=True)
+        exp = np.exp(scores)
+        return exp / exp.sum(axis=1, keepdims=True)
+
+    @classmethod
+    def fit(cls, texts, labels, n_features=N_FEATURES, epochs=200, learning_rate=0.5, l2=1e-4):
+        """Trains with full-batch AdaGrad on cross-entropy; labels are Positive/Negative/Neutral."""
+        classes = list(SENTIMENT_ORDER)
+        y = pd.Categorical(labels, categories=classes).codes
+        if (y < 0).any():
+            raise ValueError(f"labels must be one of {classes}")
+        rows, columns, values = hashed_features(texts, n_features)
+        n_rows = len(y)
+        targets = np.eye(len(classes))[y]
+
+        weights = np.zeros((n_features, len(classes)))
+        bias = np.log(np.bincount(y, minlength=len(classes)) + 1.0)
+        weight_g2 = np.full_like(weights, 1e-8)
+        bias_g2 = np.full_like(bias, 1e-8)
+        for _ in range(epochs):
+            error = (cls._softmax(cls._scores(weights, bias, rows, columns, values, n_rows)) - targets) / n_rows
+            # Transposed sparse product: gradient per feature column
+            gradient = np.stack([
+                np.bincount(columns, weights=values * error[rows, k], minlength=n_features)
+                for k in range(len(classes))
+            ], axis=1) + l2 * weights
+            bias_gradient = error.sum(axis=0)
+            weight_g2 += gradient ** 2
+            bias_g2 += bias_gradient ** 2
+            weights -= learning_rate * gradient / np.sqrt(weight_g2)
+            bias -= learning_rate * bias_gradient / np.sqrt(bias_g2)
+        return cls(weights.astype(np.float32), bias.astype(np.float32), classes)
+
+    def predict_proba(self, texts):
+        texts = pd.Series(texts).reset_index(drop=True)
+        chunks = []
+        for start in range(0, len(texts), CHUNK_SIZE):
+            chunk = texts.iloc[start:start + CHUNK_SIZE]
+            rows, columns, values = hashed_features(chunk, self.n_features)
+            chunks.append(self._softmax(self._scores(self.weights, self.bias, rows, columns, values, len(chunk))))
+        return np.concatenate(chunks) if chunks else np.empty((0, len(self.classes)))
+
+    def predict(self, texts):
+        """Returns (labels, confidence) where confidence is the top class probability."""
+        probabilities = self.predict_proba(texts)
+        labels = np.array(self.classes, dtype=object)[probabilities.argmax(axis=1)]
+        return labels, probabilities.max(axis=1)
+
+    def save(self, path=MODEL_PATH):
+        np.savez_compressed(path, weights=self.weights, bias=self.bias, classes=np.array(self.classes))
+
+    @classmethod
+    def load(cls, path=MODEL_PATH):
+        with np.load(path) as data:
+            return cls(data["weights"], data["bias"], data["classes"].tolist())
+
+
+# Function to train the local model on reviews labelled by SENTIMENT_SCORE
+def train_on_reviews(df, **fit_args):
+    return LocalSentimentModel.fit(df["SUMMARY"].fillna(""), categorize_scores(df["SENTIMENT_SCORE"]), **fit_args)
+
+
+# Function to label reviews locally and escalate uncertain ones to an LLM
+def tiered_classify(texts, model, llm_classify, min_confidence=DEFAULT_MIN_CONFIDENCE):
+    """Returns (DataFrame with Label, Confidence and Source columns, stats dict).
+
+    llm_classify takes a list of review texts and returns their labels in
+    order; it only receives reviews where the local model's confidence is
+    below min_confidence, so they can be sent to the LLM in batches.
+    """
+    texts = pd.Series(texts).reset_index(drop=True)
+    labels, confidence = model.predict(texts.fillna(""))
+    escalate = confidence < min_confidence
+    if escalate.any():
+        labels[escalate] = llm_classify(texts[escalate].tolist())
+    result = pd.DataFrame({
+        "Label": labels,
+        "Confidence": confidence,
+        "Source": np.where(escalate, "llm", "local"),
+    })
+    stats = {
+        "reviews": len(texts),
+        "local": int((~escalate).sum()),
+        "escalated": int(escalate.sum()),
+        "escalation_rate": float(escalate.mean()) if len(texts) else 0.0,
+    }
+    return result, stats
+
+
+# Function to show accuracy and escalation rate on held-out reviews for several thresholds
+def threshold_report(model, df, thresholds=(0.5, 0.6, 0.7, 0.8, 0.9)):
+    reference = np.asarray(categorize_scores(df["SENTIMENT_SCORE"]), dtype=object)
+    labels, confidence = model.predict(df["SUMMARY"].fillna(""))
+    rows = []
+    for threshold in thresholds:
+        local = confidence >= threshold
+        rows.append({
+            "Min Confidence": threshold,
+            "Escalation Rate": 1 - local.mean(),
+            "Local Accuracy": (labels[local] == reference[local]).mean() if local.any() else np.nan,
+        })
+    overall = (labels == reference).mean()
+    return pd.DataFrame(rows), overall
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train or evaluate the local sentiment pre-classifier.")
+    parser.add_argument("command", choices=["train", "evaluate"])
+    parser.add_argument("--data", default=get_dataset_path(), help="Review CSV with SUMMARY and SENTIMENT_SCORE")
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--holdout", type=float, default=0.3, help="Fraction held out for evaluate")
+    parser.add_argument("--epochs", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    df = load_reviews(args.data).dropna(subset=["SENTIMENT_SCORE"])
+    if args.command == "train":
+        model = train_on_reviews(df, epochs=args.epochs)
+        model.save(args.model)
+        print(f"Trained on {len(df):,} reviews; model saved to {args.model}")
+        return
+
+    shuffled = df.sample(frac=1.0, random_state=args.seed)
+    n_test = max(1, int(len(shuffled) * args.holdout))
+    test, train = shuffled.iloc[:n_test], shuffled.iloc[n_test:]
+    model = train_on_reviews(train, epochs=args.epochs)
+    report, overall = threshold_report(model, test)
+    print(f"Trained on {len(train):,} reviews, evaluated on {len(test):,}; accuracy without escalation {overall:.1%}")
+    print(report.to_string(index=False, formatters={
+        "Escalation Rate": "{:.1%}".format,
+        "Local Accuracy": lambda x: "n/a" if pd.isna(x) else f"{x:.1%}",
+    }))
+
+
+if __name__ == "__main__":
+    main()
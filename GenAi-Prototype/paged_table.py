@@ -0,0 +1,107 @@
+# import packages
+import math
+import weakref
+import pandas as pd
+import streamlit as st
+
+
+# Helper function to shorten long text so only a preview is sent to the browser
+def truncate_text(series, max_chars):
+    text = series.astype("string")
+    too_long = text.str.len() > max_chars
+    return text.where(~too_long, text.str.slice(0, max_chars) + "…")
+
+
+# Helper function to get the row order for a sort, reusing it across reruns
+def sorted_positions(df, key, sort_column, ascending):
+    """Returns row positions in sorted order, cached in session state for this frame."""
+    cached = st.session_state.get(f"{key}_order")
+    if cached is None or cached[0]() is not df or cached[1:3] != (sort_column, ascending):
+        order = df[sort_column].argsort(kind="stable").to_numpy()
+        if not ascending:
+            order = order[::-1]
+        cached = (weakref.ref(df), sort_column, ascending, order)
+        st.session_state[f"{key}_order"] = cached
+    return cached[3]
+
+
+# Helper function to drop the table's row selection; a selection is a position on the page, so it must
+# not carry over to the different rows shown after a page, search or sort change
+def clear_selection(key):
+    st.session_state.pop(f"{key}_table", None)
+
+
+# Function to show a DataFrame one page at a time
+def paged_dataframe(df, key, page_size=25, text_columns=None, max_chars=120, search_columns=None, columns=None):
+    """Renders a searchable, sortable table that only serializes the visible page.
+
+    Searching and sorting run on the server over the whole frame; long text in
+    text_columns is truncated, and selecting a row shows its full text. Pass
+    search_columns=[] to hide the search box when the caller does its own search,
+    and columns to show only some columns.
+    """
+    if columns is None:
+        columns = list(df.columns)
+    if text_columns is None:
+        text_columns = [c for c in df.columns if df[c].dtype == object or pd.api.types.is_string_dtype(df[c])]
+    if search_columns is None:
+        search_columns = text_columns
+
+    col1, col2, col3 = st.columns([3, 2, 1])
+    with col1:
+        query = ""
+        if search_columns:
+            query = st.text_input("Search rows", key=f"{key}_search", placeholder="Type to filter...",
+                                  on_change=clear_selection, args=(key,))
+    with col2:
+        sort_column = st.selectbox("Sort by", ["(original order)"] + list(columns), key=f"{key}_sort",
+                                   on_change=clear_selection, args=(key,))
+    with col3:
+        ascending = st.toggle("Ascending", value=True, key=f"{key}_ascending", on_change=clear_selection, args=(key,))
+
+    # Search and sort on the server; the browser only ever receives one page
+    view = df
+    if query:
+        mask = pd.Series(False, index=df.index)
+        for column in search_columns:
+            mask |= df[column].astype("string").str.contains(query, case=False, regex=False, na=False)
+        view = df[mask]
+    if sort_column != "(original order)":
+        if view is df:
+            view = df.iloc[sorted_positions(df, key, sort_column, ascending)]
+        else:
+            view = view.sort_values(sort_column, ascending=ascending, kind="stable")
+
+    total_rows = len(view)
+    page_count = max(1, math.ceil(total_rows / page_size))
+    # Keep the page in range when a search shrinks the result
+    if st.session_state.setdefault(f"{key}_page", 1) > page_count:
+        st.session_state[f"{key}_page"] = page_count
+    page = st.number_input("Page", min_value=1, max_value=page_count, step=1, key=f"{key}_page",
+                           on_change=clear_selection, args=(key,))
+    start = (page - 1) * page_size
+    page_df = view.iloc[start:start + page_size]
+
+    # Truncate long text on the visible page only
+    display_df = page_df[columns].copy()
+    for column in text_columns:
+        if column in display_df.columns:
+            display_df[column] = truncate_text(display_df[column], max_chars)
+
+    event = st.dataframe(display_df, on_select="rerun", selection_mode="single-row", key=f"{key}_table")
+    st.caption(
+        f"Rows {start + 1 if total_rows else 0}–{min(start + page_size, total_rows)} of {total_rows:,} "
+        f"(page {page} of {page_count}). Select a row to see its full text."
+    )
+
+    # Expand the selected row on demand; the bounds check covers a page that shrank under a new dataset
+    selected = event.selection.rows if event is not None else []
+    if selected and selected[0] < len(page_df):
+        row = page_df.iloc[selected[0]]
+        with st.expander("Full row", expanded=True):
+            for column in text_columns:
+                if column in row.index:
+                    st.markdown(f"**{column}**")
+                    st.write(row[column])
+
+    return view
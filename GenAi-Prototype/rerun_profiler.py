@@ -0,0 +1,172 @@
+"""Measure what one widget interaction costs in a Streamlit app.
+
+Drives an app headlessly with streamlit.testing.v1.AppTest and, for every
+rerun, records wall time, the cProfile of the script thread and the size of
+the serialized ForwardMsg deltas that would be sent over the websocket.
+
+    python rerun_profiler.py data_analyzer.py
+    python rerun_profiler.py ../M1/Lesson_03/Lab2/M1Lab2_solution.py \\
+        --step "click:📥 Load Dataset" --step "select:Choose a product:*"
+
+Steps:
+    click:<button label>              press a button
+    select:<selectbox label>:<option> choose an option ("*" = each option in turn)
+    multiselect:<label>:<a>|<b>       set a multiselect
+    text:<text input label>:<value>   type into a text input
+
+Tabs cannot be switched: Streamlit runs the body of every tab on each rerun,
+so their cost is already part of every measurement. Images from st.pyplot are
+fetched over HTTP separately and are not counted in the delta payload.
+"""
+# import packages
+import argparse
+import cProfile
+import io
+import json
+import os
+import pstats
+import time
+from unittest.mock import patch
+
+from streamlit.testing.v1 import AppTest
+from streamlit.testing.v1 import app_test
+from streamlit.testing.v1.local_script_runner import LocalScriptRunner
+
+# Default interaction scripts for apps that need more than a first load
+SCENARIOS = {
+    "data_analyzer.py": ["click:📥 Ingest Dataset", "click:🧹 Parse Reviews", "select:Choose a product:*"],
+    "M1Lab2_solution.py": ["click:📥 Load Dataset", "select:Choose a product:*"],
+    "streamlit_app.py": ["click:📥 Ingest Dataset", "click:🧹 Parse Reviews", "select:Choose a product:*"],
+    "app.py": ["text:Enter your prompt::Summarize the reviews in one sentence."],
+}
+
+
+class ProfilingScriptRunner(LocalScriptRunner):
+    """LocalScriptRunner that profiles the script thread and keeps its output messages."""
+
+    last_profile = None
+    last_messages = []
+
+    def _run_script_thread(self):
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            super()._run_script_thread()
+        finally:
+            profiler.disable()
+            ProfilingScriptRunner.last_profile = profiler
+
+    def run(self, *args, **kwargs):
+        tree = super().run(*args, **kwargs)
+        ProfilingScriptRunner.last_messages = list(self.forward_msgs())
+        return tree
+
+
+# Helper function to find a widget by its label
+def find_widget(at, kind, label):
+    for widget in getattr(at, kind):
+        if widget.label == label:
+            return widget
+    raise LookupError(f"No {kind} labelled {label!r}")
+
+
+# Helper function to expand "select:<label>:*" into one step per option
+def expand_steps(at, steps):
+    for step in steps:
+        kind, _, rest = step.partition(":")
+        label, _, value = rest.rpartition(":") if kind != "click" else (rest, "", "")
+        if kind == "select" and value == "*":
+            for option in find_widget(at, "selectbox", label).options:
+                yield f"select:{label}:{option}", kind, label, option
+        else:
+            yield step, kind, label, value
+
+
+# Helper function to apply one step and rerun the script
+def apply_step(at, kind, label, value, timeout):
+    if kind == "click":
+        find_widget(at, "button", label).click()
+    elif kind == "select":
+        find_widget(at, "selectbox", label).set_value(value)
+    elif kind == "multiselect":
+        find_widget(at, "multiselect", label).set_value(value.split("|") if value else [])
+    elif kind == "text":
+        find_widget(at, "text_input", label).input(value)
+    else:
+        raise ValueError(f"Unknown step type: {kind}")
+    at.run(timeout=timeout)
+
+
+# Function to run the app once and collect the measurement for that rerun
+def measure_rerun(name, action):
+    start = time.perf_counter()
+    action()
+    wall = time.perf_counter() - start
+    messages = ProfilingScriptRunner.last_messages
+    return {
+        "step": name,
+        "wall_ms": wall * 1000,
+        "payload_bytes": sum(msg.ByteSize() for msg in messages),
+        "messages": len(messages),
+    }, ProfilingScriptRunner.last_profile
+
+
+# Function to profile an app through a list of steps
+def profile_app(script_path, steps, timeout=60):
+    """Returns (per-rerun records, merged pstats.Stats)."""
+    records = []
+    at = AppTest.from_file(script_path, default_timeout=timeout)
+
+    with patch.object(app_test, "LocalScriptRunner", ProfilingScriptRunner):
+        record, profile = measure_rerun("initial load", lambda: at.run(timeout=timeout))
+        stats = pstats.Stats(profile)
+        if at.exception:
+            record["exception"] = at.exception[0].message
+        records.append(record)
+
+        for name, kind, label, value in expand_steps(at, steps):
+            record, profile = measure_rerun(name, lambda: apply_step(at, kind, label, value, timeout))
+            stats.add(profile)
+            if at.exception:
+                record["exception"] = at.exception[0].message
+            records.append(record)
+
+    return records, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile Streamlit rerun cost with AppTest.")
+    parser.add_argument("script", help="Path to the Streamlit app")
+    parser.add_argument("--step", action="append", default=None, help="Interaction step (repeatable), see module docstring")
+    parser.add_argument("--top", type=int, default=15, help="Number of hot spots to print")
+    parser.add_argument("--sort", default="cumulative", help="pstats sort key, e.g. cumulative or tottime")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--json", help="Write the per-rerun records to this file")
+    args = parser.parse_args()
+
+    script_path = os.path.abspath(args.script)
+    steps = args.step if args.step is not None else SCENARIOS.get(os.path.basename(script_path), [])
+    records, stats = profile_app(script_path, steps, args.timeout)
+
+    print(f"{'step':<50} {'wall ms':>10} {'payload KB':>11} {'msgs':>6}")
+    for r in records:
+        print(f"{r['step'][:50]:<50} {r['wall_ms']:>10.1f} {r['payload_bytes'] / 1024:>11.1f} {r['messages']:>6}")
+        if "exception" in r:
+            print(f"    exception: {r['exception']}")
+    interactions = records[1:] or records
+    print(f"\nMean per interaction: {sum(r['wall_ms'] for r in interactions) / len(interactions):.1f} ms, "
+          f"{sum(r['payload_bytes'] for r in interactions) / len(interactions) / 1024:.1f} KB")
+
+    print(f"\nTop {args.top} hot spots by {args.sort} time across all reruns:")
+    output = io.StringIO()
+    stats.stream = output
+    stats.sort_stats(args.sort).print_stats(args.top)
+    print(output.getvalue())
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(records, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
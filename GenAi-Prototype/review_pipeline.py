@@ -0,0 +1,95 @@
+# import packages
+import os
+import re
+import numpy as np
+import pandas as pd
+
+SENTIMENT_ORDER = ['Negative', 'Neutral', 'Positive']
+SENTIMENT_BIN_LABELS = ['Very Low', 'Low', 'Medium', 'High', 'Very High']
+SENTIMENT_COLORS = {'Negative': 'red', 'Neutral': 'lightgray', 'Positive': 'green'}
+
+
+# Helper function to get dataset path
+def get_dataset_path():
+    # Get the current script directory (GenAi-Prototype folder)
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    # Construct the path to the CSV file in the same directory
+    csv_path = os.path.join(current_dir, "customer_reviews.csv")
+    return csv_path
+
+
+# Helper function to load the reviews CSV
+def load_reviews(csv_path=None):
+    return pd.read_csv(csv_path or get_dataset_path())
+
+
+# Helper function to clean text
+def clean_text(text):
+    text = text.lower().strip()
+    text = re.sub(r'[^\w\s]', '', text)
+    return text
+
+
+# Helper function to add the CLEANED_SUMMARY column
+def parse_reviews(df):
+    df["CLEANED_SUMMARY"] = df["SUMMARY"].apply(clean_text)
+    return df
+
+
+# Helper function to filter reviews by product ("All Products" keeps everything)
+def filter_by_product(df, product):
+    if product != "All Products":
+        return df[df["PRODUCT"] == product]
+    return df
+
+
+# Helper function to get the average sentiment score per product
+def sentiment_by_product(df):
+    return df.groupby(["PRODUCT"])["SENTIMENT_SCORE"].mean()
+
+
+# Helper function to turn sentiment labels into ordered counts for a bar chart
+def sentiment_counts(labels, label_column):
+    """Returns (counts DataFrame, color map) ordered Negative, Neutral, Positive."""
+    counts = labels.value_counts()
+    # Categorical labels also count categories with no rows; drop those
+    counts = counts[counts > 0].reset_index()
+    counts.columns = [label_column, 'Count']
+
+    # Only include sentiment categories that actually exist in the data
+    existing_sentiments = counts[label_column].unique()
+    filtered_order = [s for s in SENTIMENT_ORDER if s in existing_sentiments]
+    filtered_colors = {s: SENTIMENT_COLORS[s] for s in existing_sentiments if s in SENTIMENT_COLORS}
+
+    # Reorder the data according to our custom order (only for existing sentiments)
+    counts[label_column] = pd.Categorical(counts[label_column], categories=filtered_order, ordered=True)
+    counts = counts.sort_values(label_column)
+    return counts, filtered_colors
+
+
+# Helper function to categorize a whole column of sentiment scores at once
+def categorize_scores(scores):
+    values = scores.to_numpy(dtype=np.float64)
+    labels = np.select([values >= 0.6, values <= 0.4], ["Positive", "Negative"], default="Neutral")
+    return pd.Categorical(labels, categories=SENTIMENT_ORDER)
+
+
+# Function to add the sentiment feature columns used by the charts
+def add_sentiment_features(df, reference_scores=None):
+    """Adds Sentiment_Category, Sentiment_Bin and size_normalized in place.
+
+    Bins and sizes follow the range of reference_scores (by default the whole
+    dataset), so every product filter and sample shares the same scale.
+    """
+    scores = df["SENTIMENT_SCORE"]
+    reference = scores if reference_scores is None else reference_scores
+    low, high = reference.min(), reference.max()
+    df["Sentiment_Category"] = categorize_scores(scores)
+    if reference.notna().any():
+        _, edges = pd.cut(reference, bins=len(SENTIMENT_BIN_LABELS), retbins=True)
+        df["Sentiment_Bin"] = pd.cut(scores, bins=edges, labels=SENTIMENT_BIN_LABELS)
+    else:
+        df["Sentiment_Bin"] = pd.Categorical([None] * len(df), categories=SENTIMENT_BIN_LABELS)
+    # Normalize to range [1, 20] for the scatter marker size (a single score gets size 1)
+    df["size_normalized"] = ((scores - low) / ((high - low) or 1) * 19 + 1).astype(np.float32)
+    return df
@@ -0,0 +1,141 @@
+# import packages
+import numpy as np
+import pandas as pd
+
+GRAINS = ("day", "week", "month")
+# pandas frequencies matching the bucket starts below (weeks start on Monday)
+GRAIN_FREQ = {"day": "D", "week": "W-MON", "month": "MS"}
+
+
+# Helper function to turn dates (strings, datetimes or day numbers) into days since 1970-01-01
+def to_days(dates):
+    values = np.asarray(dates)
+    if np.issubdtype(values.dtype, np.integer):
+        return values.astype(np.int64)
+    return pd.to_datetime(values).to_numpy().astype("datetime64[D]").astype(np.int64)
+
+
+# Helper function to get the first day of the day, week or month bucket of each day
+def bucket_start(days, grain):
+    if grain == "day":
+        return days
+    if grain == "week":
+        # 1970-01-01 was a Thursday, so Monday-based weeks are offset by 3 days
+        return days - (days + 3) % 7
+    if grain == "month":
+        return days.astype("datetime64[D]").astype("datetime64[M]").astype("datetime64[D]").astype(np.int64)
+    raise ValueError(f"Unknown grain: {grain}")
+
+
+class Rollup:
+    """Additive per-bucket aggregates at day, week and month grain.
+
+    Each grain keeps one row per (bucket, *dims) with the number of rows and
+    the sum of every measure. Rows are added and removed incrementally, so
+    the cost of an update is the size of the change, and a trend reads the
+    pre-aggregated buckets instead of the raw rows. Means and rates are
+    ratios of the sums, which is what makes removal exact.
+
+    measures maps a name to a function that takes rows and returns the value
+    to sum per row, for example a score or a 1/0 flag.
+    """
+
+    def __init__(self, date_column, dims, measures):
+        self.date_column = date_column
+        self.dims = list(dims)
+        self.measures = dict(measures)
+        self.tables = {grain: None for grain in GRAINS}
+
+    def _update(self, rows, sign):
+        rows = rows[rows[self.date_column].notna()]
+        if len(rows) == 0:
+            return
+        # Aggregate to days once; weeks and months are rolled up from the daily sums
+        frame = pd.DataFrame({"bucket": to_days(rows[self.date_column])})
+        for dim in self.dims:
+            frame[dim] = rows[dim].to_numpy()
+        frame["rows"] = 1
+        for name, value in self.measures.items():
+            frame[name] = np.asarray(value(rows), dtype=np.float64)
+        daily = frame.groupby(["bucket"] + self.dims, observed=True).sum()
+
+        for grain in GRAINS:
+            if grain == "day":
+                delta = daily
+            else:
+                keys = bucket_start(daily.index.get_level_values("bucket").to_numpy(), grain)
+                delta = daily.groupby([keys] + self.dims, observed=True).sum().rename_axis(["bucket"] + self.dims)
+            delta = delta * sign
+            table = self.tables[grain]
+            table = delta if table is None else table.add(delta, fill_value=0)
+            # Buckets whose last row was removed disappear
+            self.tables[grain] = table[table["rows"] > 0]
+
+    def add(self, rows):
+        self._update(rows, 1)
+        return self
+
+    def remove(self, rows):
+        self._update(rows, -1)
+        return self
+
+    def trend(self, grain, **filters):
+        """Returns the summed rows and measures per bucket, with empty buckets as 0.
+
+        filters map a dim to the values to keep (None keeps all), e.g. PRODUCT=["Alpine Skis"].
+        """
+        columns = ["rows"] + list(self.measures)
+        table = self.tables[grain]
+        if table is None:
+            return pd.DataFrame(columns=columns, index=pd.DatetimeIndex([], name="Date"), dtype=np.float64)
+        for dim, values in filters.items():
+            if values is not None:
+                table = table[table.index.get_level_values(dim).isin(list(values))]
+        totals = table.groupby(level="bucket").sum()[columns]
+        totals.index = pd.DatetimeIndex(totals.index.to_numpy().astype("datetime64[D]"), name="Date")
+        if len(totals):
+            totals = totals.asfreq(GRAIN_FREQ[grain], fill_value=0)
+        return totals
+
+
+# Function to build the sentiment rollup of the review dataset (DATE, PRODUCT, SENTIMENT_SCORE)
+def review_rollup(df):
+    rollup = Rollup("DATE", ["PRODUCT"], {
+        "sentiment": lambda rows: rows["SENTIMENT_SCORE"].fillna(0),
+        "scored": lambda rows: rows["SENTIMENT_SCORE"].notna(),
+    })
+    return rollup.add(df)
+
+
+# Function to get review counts and average sentiment per bucket
+def sentiment_trend(rollup, grain, products=None):
+    totals = rollup.trend(grain, PRODUCT=products)
+    return pd.DataFrame({
+        "Reviews": totals["rows"].astype(np.int64),
+        "Avg Sentiment": totals["sentiment"] / totals["scored"].where(totals["scored"] > 0),
+    })
+
+
+# Function to build the shipment rollup of a ShippingLogs object, per region and carrier
+def shipping_rollup(logs):
+    rows = pd.DataFrame({
+        "Shipping Date": logs.ship_day,
+        "Region": pd.Categorical.from_codes(logs.region, logs.regions),
+        "Carrier": pd.Categorical.from_codes(logs.carrier, logs.carriers),
+        "late": logs.late,
+    })
+    rollup = Rollup("Shipping Date", ["Region", "Carrier"], {
+        "delivered": lambda rows: rows["late"] >= 0,
+        "late": lambda rows: rows["late"] == 1,
+    })
+    return rollup.add(rows)
+
+
+# Function to get shipment volume and late rate per bucket
+def shipping_trend(rollup, grain, regions=None, carriers=None):
+    totals = rollup.trend(grain, Region=regions, Carrier=carriers)
+    return pd.DataFrame({
+        "Shipments": totals["rows"].astype(np.int64),
+        "Delivered": totals["delivered"].astype(np.int64),
+        "Late Rate": totals["late"] / totals["delivered"].where(totals["delivered"] > 0),
+    })
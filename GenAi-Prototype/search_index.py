@@ -0,0 +1,137 @@
+# import packages
+import re
+from bisect import bisect_left
+import numpy as np
+import pandas as pd
+
+CHUNK_SIZE = 50_000
+QUERY_PATTERN = re.compile(r'"([^"]*)"|(\S+)')
+
+
+# Helper function to clean a column of text the same way as clean_text, vectorized
+def normalize_text(texts):
+    return texts.fillna("").astype(str).str.lower().str.strip().str.replace(r"[^\w\s]", "", regex=True)
+
+
+# Helper function to split a query into terms, quoted phrases and prefixes ("charg*")
+def parse_query(query):
+    """Returns a list of (kind, value) with kind in "term", "phrase" or "prefix"."""
+    parts = []
+    for phrase, word in QUERY_PATTERN.findall(query.lower()):
+        if phrase:
+            words = normalize_text(pd.Series([phrase]))[0].split()
+            if len(words) > 1:
+                parts.append(("phrase", words))
+            elif words:
+                parts.append(("term", words[0]))
+        elif word.endswith("*") and len(word) > 1:
+            prefix = normalize_text(pd.Series([word[:-1]]))[0]
+            if prefix:
+                parts.append(("prefix", prefix))
+        else:
+            cleaned = normalize_text(pd.Series([word]))[0]
+            if cleaned:
+                parts.append(("term", cleaned))
+    return parts
+
+
+class ReviewSearchIndex:
+    """Inverted index from cleaned review tokens to row positions.
+
+    Postings are stored CSR-style: one int32 array of row positions grouped by
+    token, with `offsets[t]:offsets[t + 1]` holding the sorted rows for token t.
+    The vocabulary is sorted, so prefix queries are a bisect over it. Product
+    postings are stored the same way so a product filter is one more intersection.
+    """
+
+    def __init__(self, texts, products=None):
+        self.texts = normalize_text(pd.Series(texts).reset_index(drop=True))
+
+        # Tokenize in chunks and keep only (token id << 32 | row) integers, never one object per token
+        token_ids = {}
+        key_chunks = []
+        for start in range(0, len(self.texts), CHUNK_SIZE):
+            tokens = self.texts.iloc[start:start + CHUNK_SIZE].str.split().explode().dropna()
+            codes, uniques = pd.factorize(tokens)
+            chunk_ids = np.array([token_ids.setdefault(t, len(token_ids)) for t in uniques], dtype=np.int64)
+            key_chunks.append((chunk_ids[codes] << 32) | tokens.index.to_numpy(np.int64))
+
+        # Renumber tokens in sorted order; sorting the keys then groups rows by token
+        # and puts repeated words of a review next to each other
+        self.vocabulary = sorted(token_ids)
+        rank = np.empty(len(token_ids), dtype=np.int64)
+        rank[[token_ids[t] for t in self.vocabulary]] = np.arange(len(self.vocabulary))
+        keys = np.concatenate(key_chunks) if key_chunks else np.empty(0, dtype=np.int64)
+        keys = np.sort((rank[keys >> 32] << 32) | (keys & 0xFFFFFFFF))
+        keys = keys[np.concatenate([[True], keys[1:] != keys[:-1]])] if len(keys) else keys
+        self.postings = (keys & 0xFFFFFFFF).astype(np.int32)
+        self.offsets = np.concatenate([[0], np.cumsum(np.bincount(keys >> 32, minlength=len(self.vocabulary)))])
+        self.token_ids = {token: i for i, token in enumerate(self.vocabulary)}
+
+        self.product_rows = {}
+        if products is not None:
+            product_codes, product_names = pd.factorize(pd.Series(products).reset_index(drop=True))
+            order = np.argsort(product_codes, kind="stable")
+            bounds = np.searchsorted(product_codes[order], np.arange(len(product_names) + 1))
+            self.product_rows = {
+                name: order[bounds[i]:bounds[i + 1]].astype(np.int32) for i, name in enumerate(product_names)
+            }
+
+    def __len__(self):
+        return len(self.texts)
+
+    def term_rows(self, token):
+        """Returns the sorted row positions containing token."""
+        token_id = self.token_ids.get(token)
+        if token_id is None:
+            return np.empty(0, dtype=np.int32)
+        return self.postings[self.offsets[token_id]:self.offsets[token_id + 1]]
+
+    def prefix_rows(self, prefix):
+        """Returns the sorted row positions with any token starting with prefix."""
+        start = bisect_left(self.vocabulary, prefix)
+        end = bisect_left(self.vocabulary, prefix + "\uffff")
+        if start == end:
+            return np.empty(0, dtype=np.int32)
+        return np.unique(self.postings[self.offsets[start]:self.offsets[end]])
+
+    def phrase_rows(self, words, within=None):
+        """Returns rows containing every word, then keeps those where they appear in order."""
+        row_lists = [self.term_rows(word) for word in words]
+        candidates = self._intersect(row_lists if within is None else row_lists + [within])
+        if len(candidates) == 0:
+            return candidates
+        # Only candidate rows are checked for the exact phrase
+        pattern = r"(?<!\S)" + r"\s+".join(map(re.escape, words)) + r"(?!\S)"
+        matches = self.texts.iloc[candidates].str.contains(pattern, regex=True).to_numpy()
+        return candidates[matches]
+
+    def _intersect(self, row_lists):
+        # Start from the shortest postings list so every step is as small as possible
+        row_lists = sorted(row_lists, key=len)
+        result = row_lists[0]
+        for rows in row_lists[1:]:
+            if len(result) == 0:
+                break
+            result = np.intersect1d(result, rows, assume_unique=True)
+        return result
+
+    def search(self, query, product=None):
+        """Returns sorted row positions matching every part of the query (and the product)."""
+        row_lists = []
+        phrases = []
+        for kind, value in parse_query(query):
+            if kind == "term":
+                row_lists.append(self.term_rows(value))
+            elif kind == "prefix":
+                row_lists.append(self.prefix_rows(value))
+            else:
+                phrases.append(value)
+        if product is not None and product != "All Products":
+            row_lists.append(self.product_rows.get(product, np.empty(0, dtype=np.int32)))
+
+        rows = self._intersect(row_lists) if row_lists else None
+        # Phrases are verified last, only on rows that survived everything else
+        for words in phrases:
+            rows = self.phrase_rows(words, within=rows)
+        return np.arange(len(self), dtype=np.int32) if rows is None else rows
@@ -0,0 +1,189 @@
+# import packages
+import json
+import os
+import numpy as np
+import pandas as pd
+
+LOW_VOLUME_THRESHOLD = 5
+# Name given to null carriers, regions and statuses
+UNKNOWN = "Unknown"
+DEFAULT_PERCENTILES = (50, 90, 95, 99)
+
+
+# Helper function to get the shipping log path (shared data folder at the repo root)
+def get_shipping_path():
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(current_dir, "..", "data", "shipping_logs.csv")
+
+
+# Helper function to code a category column; nulls get the name UNKNOWN instead of factorize's -1
+def _factorize(values):
+    codes, names = pd.factorize(values, sort=True)
+    names = list(names)
+    if (codes < 0).any():
+        codes = np.where(codes < 0, len(names), codes)
+        names.append(UNKNOWN)
+    return codes, names
+
+
+ARRAY_COLUMNS = ["order_id", "ship_day", "carrier", "region", "status", "delivery_days", "late", "latitude", "longitude"]
+
+
+class ShippingLogs:
+    """Shipping log held as typed NumPy columns.
+
+    Carrier, Region and Status are stored as small integer codes plus a list
+    of names, so group-bys are np.bincount calls over the codes. `late` is
+    1/0 for delivered shipments and -1 when the shipment has not arrived.
+    Null categories are coded as UNKNOWN.
+    """
+
+    def __init__(self, order_id, ship_day, carrier, region, status, delivery_days, late,
+                 latitude, longitude, carriers, regions, statuses):
+        self.order_id = order_id
+        self.ship_day = ship_day
+        self.carrier = carrier
+        self.region = region
+        self.status = status
+        self.delivery_days = delivery_days
+        self.late = late
+        self.latitude = latitude
+        self.longitude = longitude
+        self.carriers = carriers
+        self.regions = regions
+        self.statuses = statuses
+
+    def __len__(self):
+        return len(self.order_id)
+
+    @classmethod
+    def from_frame(cls, df):
+        # Rows without a shipping date cannot be placed on any day
+        df = df[df["Shipping Date"].notna()]
+        carrier, carriers = _factorize(df["Carrier"])
+        region, regions = _factorize(df["Region"])
+        status, statuses = _factorize(df["Status"])
+        late = df["Late"].map({True: 1, False: 0, "True": 1, "False": 0}).fillna(-1)
+        ship_day = pd.to_datetime(df["Shipping Date"]).to_numpy().astype("datetime64[D]").astype(np.int32)
+        return cls(
+            order_id=df["Order ID"].to_numpy(np.int64),
+            ship_day=ship_day,
+            carrier=carrier.astype(np.int16),
+            region=region.astype(np.int16),
+            status=status.astype(np.int16),
+            delivery_days=df["Delivery Days"].to_numpy(np.float32),
+            late=late.to_numpy(np.int8),
+            latitude=df["Latitude"].to_numpy(np.float32),
+            longitude=df["Longitude"].to_numpy(np.float32),
+            carriers=carriers,
+            regions=regions,
+            statuses=statuses,
+        )
+
+    def to_arrow(self):
+        """Returns the columns as a pyarrow Table, with the category names in its metadata."""
+        import pyarrow as pa
+
+        names = {"carriers": self.carriers, "regions": self.regions, "statuses": self.statuses}
+        table = pa.table({column: getattr(self, column) for column in ARRAY_COLUMNS})
+        return table.replace_schema_metadata({"names": json.dumps(names)})
+
+    @classmethod
+    def from_arrow(cls, table):
+        """Builds ShippingLogs over a table from to_arrow(); columns are read-only views, not copies."""
+        names = json.loads(table.schema.metadata[b"names"])
+        columns = {column: table.column(column).to_numpy() for column in ARRAY_COLUMNS}
+        return cls(**columns, **names)
+
+    def subset(self, mask):
+        """Returns the rows where mask is True, keeping the same category codes."""
+        return ShippingLogs(
+            self.order_id[mask], self.ship_day[mask], self.carrier[mask], self.region[mask],
+            self.status[mask], self.delivery_days[mask], self.late[mask],
+            self.latitude[mask], self.longitude[mask],
+            self.carriers, self.regions, self.statuses,
+        )
+
+    def filter_mask(self, carriers=None, regions=None, statuses=None):
+        """Builds a boolean mask from lists of carrier, region and status names (None = all)."""
+        mask = np.ones(len(self), dtype=bool)
+        for codes, names, selected in [
+            (self.carrier, self.carriers, carriers),
+            (self.region, self.regions, regions),
+            (self.status, self.statuses, statuses),
+        ]:
+            if selected is not None:
+                wanted = np.zeros(len(names), dtype=bool)
+                wanted[[names.index(n) for n in selected if n in names]] = True
+                mask &= wanted[codes]
+        return mask
+
+
+# Function to load the shipping log CSV into typed columns
+def load_shipping_logs(csv_path=None):
+    df = pd.read_csv(
+        csv_path or get_shipping_path(),
+        usecols=["Order ID", "Shipping Date", "Carrier", "Latitude", "Longitude",
+                 "Status", "Delivery Days", "Late", "Region"],
+        dtype={"Carrier": "category", "Region": "category", "Status": "category",
+               "Latitude": np.float32, "Longitude": np.float32, "Delivery Days": np.float32},
+    )
+    return ShippingLogs.from_frame(df)
+
+
+# Helper function to count shipments, deliveries and late deliveries per group code
+def _late_counts(codes, late, n_groups):
+    delivered = late >= 0
+    shipments = np.bincount(codes, minlength=n_groups)
+    delivered_counts = np.bincount(codes[delivered], minlength=n_groups)
+    late_counts = np.bincount(codes[delivered], weights=late[delivered], minlength=n_groups)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        late_rate = late_counts / delivered_counts
+    return shipments, delivered_counts, late_counts.astype(np.int64), late_rate
+
+
+# Function to get the late rate by carrier or region
+def late_rate_by(logs, by="carrier"):
+    codes, names = (logs.carrier, logs.carriers) if by == "carrier" else (logs.region, logs.regions)
+    shipments, delivered, late, late_rate = _late_counts(codes, logs.late, len(names))
+    result = pd.DataFrame(
+        {"Shipments": shipments, "Delivered": delivered, "Late": late, "Late Rate": late_rate},
+        index=pd.Index(names, name=by.capitalize()),
+    )
+    return result[result["Shipments"] > 0].sort_values("Late Rate", ascending=False)
+
+
+# Function to get the late rate for every carrier and region pair
+def late_rate_by_carrier_region(logs):
+    n_regions = len(logs.regions)
+    codes = logs.carrier.astype(np.int32) * n_regions + logs.region
+    _, delivered, _, late_rate = _late_counts(codes, logs.late, len(logs.carriers) * n_regions)
+    matrix = pd.DataFrame(
+        late_rate.reshape(len(logs.carriers), n_regions),
+        index=pd.Index(logs.carriers, name="Carrier"),
+        columns=pd.Index(logs.regions, name="Region"),
+    )
+    # Pairs without deliveries have no late rate
+    return matrix.where(delivered.reshape(matrix.shape) > 0)
+
+
+# Function to get delivery-day percentiles, overall or per carrier/region
+def delivery_day_percentiles(logs, by=None, percentiles=DEFAULT_PERCENTILES):
+    columns = [f"p{p}" for p in percentiles]
+    delivered = ~np.isnan(logs.delivery_days)
+    if by is None:
+        values = np.percentile(logs.delivery_days[delivered], percentiles) if delivered.any() else [np.nan] * len(percentiles)
+        return pd.DataFrame([values], columns=columns, index=["All"])
+
+    codes, names = (logs.carrier, logs.carriers) if by == "carrier" else (logs.region, logs.regions)
+    codes = codes[delivered]
+    days = logs.delivery_days[delivered]
+    # Sort once by group, then take percentiles over each contiguous slice
+    order = np.argsort(codes, kind="stable")
+    bounds = np.searchsorted(codes[order], np.arange(len(names) + 1))
+    rows = {}
+    for i, name in enumerate(names):
+        group = days[order[bounds[i]:bounds[i + 1]]]
+        if len(group):
+            rows[name] = np.percentile(group, percentiles)
+    return pd.DataFrame.from_dict(rows, orient="index", columns=columns).rename_axis(by.capitalize())
@@ -0,0 +1,183 @@
+# import packages
+import os
+import numpy as np
+import pandas as pd
+import streamlit as st
+from shipping_analytics import (
+    LOW_VOLUME_THRESHOLD,
+    ShippingLogs,
+    delivery_day_percentiles,
+    get_shipping_path,
+    late_rate_by,
+    late_rate_by_carrier_region,
+    load_shipping_logs,
+)
+from rollups import GRAINS, shipping_rollup, shipping_trend
+from shared_dataset import SharedDatasetStore, file_version
+from spatial_index import GridIndex, top_issue_cells
+
+
+# Load the shipping log once per file version and share it across sessions; the typed
+# columns are memory-mapped from a host-wide Arrow snapshot, so other processes share them too
+@st.cache_resource
+def get_logs(csv_path, modified_time):
+    table = SharedDatasetStore().get_or_publish(
+        "shipping_logs", file_version(csv_path), lambda: load_shipping_logs(csv_path).to_arrow()
+    )
+    return ShippingLogs.from_arrow(table)
+
+
+# Build the spatial grid once per file version
+@st.cache_resource
+def get_spatial_index(csv_path, modified_time, cell_size):
+    logs = get_logs(csv_path, modified_time)
+    return GridIndex(logs.latitude, logs.longitude, cell_size=cell_size)
+
+
+# Pre-aggregate shipments per day, week and month once per file version
+@st.cache_resource
+def get_rollup(csv_path, modified_time):
+    return shipping_rollup(get_logs(csv_path, modified_time))
+
+
+# Get late-shipment density per grid cell for the current filters
+@st.cache_data(max_entries=64)
+def get_cell_stats(csv_path, modified_time, cell_size, carriers, regions):
+    logs = get_logs(csv_path, modified_time)
+    index = get_spatial_index(csv_path, modified_time, cell_size)
+    return index.cell_stats(logs.late, logs.filter_mask(carriers=list(carriers), regions=list(regions)))
+
+
+# Compute every metric once per filter combination
+@st.cache_data(max_entries=64)
+def get_metrics(csv_path, modified_time, carriers, regions):
+    logs = get_logs(csv_path, modified_time)
+    view = logs.subset(logs.filter_mask(carriers=list(carriers), regions=list(regions)))
+    delivered = view.late >= 0
+    return {
+        "shipments": len(view),
+        "delivered": int(delivered.sum()),
+        "late_rate": float(view.late[delivered].mean()) if delivered.any() else None,
+        "by_carrier": late_rate_by(view, "carrier"),
+        "by_region": late_rate_by(view, "region"),
+        "carrier_region": late_rate_by_carrier_region(view),
+        "percentiles": delivery_day_percentiles(view),
+        "percentiles_by_carrier": delivery_day_percentiles(view, by="carrier"),
+    }
+
+
+st.title("🚚 Shipping Log Analytics")
+st.write("Carrier, region and lateness metrics for the Avalanche shipping logs.")
+
+csv_path = get_shipping_path()
+try:
+    modified_time = os.path.getmtime(csv_path)
+    logs = get_logs(csv_path, modified_time)
+except FileNotFoundError:
+    st.error("Shipping logs not found. Please check that data/shipping_logs.csv exists.")
+    st.stop()
+
+# Sidebar filters
+carriers = st.sidebar.multiselect("Carriers", logs.carriers, default=logs.carriers)
+regions = st.sidebar.multiselect("Regions", logs.regions, default=logs.regions)
+metrics = get_metrics(csv_path, modified_time, tuple(carriers), tuple(regions))
+
+# Headline numbers
+col1, col2, col3 = st.columns(3)
+with col1:
+    st.metric("Shipments", f"{metrics['shipments']:,}")
+with col2:
+    st.metric("Delivered", f"{metrics['delivered']:,}")
+with col3:
+    late_rate = metrics["late_rate"]
+    st.metric("Late Rate", f"{late_rate:.1%}" if late_rate is not None else "n/a")
+
+# Late rate by carrier and region
+st.subheader("⏰ Late Rate by Carrier")
+st.bar_chart(metrics["by_carrier"]["Late Rate"])
+st.dataframe(metrics["by_carrier"])
+
+st.subheader("🌍 Late Rate by Region")
+st.bar_chart(metrics["by_region"]["Late Rate"])
+st.dataframe(metrics["by_region"])
+
+st.subheader("🗺️ Late Rate by Carrier and Region")
+st.dataframe(metrics["carrier_region"].style.format("{:.1%}", na_rep="–").background_gradient(cmap="Reds", axis=None))
+
+# Delivery time percentiles
+st.subheader("📦 Delivery Days Percentiles")
+st.dataframe(metrics["percentiles"])
+st.dataframe(metrics["percentiles_by_carrier"])
+
+# Volume and late rate over time, read from the rollups
+st.subheader("📈 Shipments over Time")
+grain = st.radio("Group by", GRAINS, horizontal=True, format_func=str.capitalize)
+trend = shipping_trend(get_rollup(csv_path, modified_time), grain, regions, carriers)
+st.line_chart(trend["Shipments"])
+st.line_chart(trend["Late Rate"])
+
+threshold = st.number_input("Low-volume threshold (shipments per day)", min_value=1, value=LOW_VOLUME_THRESHOLD, step=1)
+daily_volume = shipping_trend(get_rollup(csv_path, modified_time), "day", regions, carriers)["Shipments"]
+low_days = daily_volume[daily_volume < threshold]
+st.write(f"**{len(low_days)}** low-volume shipping days")
+st.dataframe(low_days)
+
+# Late-shipment density map
+st.subheader("📍 Late Shipments by Location")
+cell_size = st.select_slider("Grid cell size (degrees)", options=[0.5, 1.0, 2.0, 5.0, 10.0], value=5.0)
+cell_stats = get_cell_stats(csv_path, modified_time, cell_size, tuple(carriers), tuple(regions))
+map_df = cell_stats[cell_stats["delivered"] > 0].copy()
+# Redder cells have a higher late rate; bigger cells ship more
+map_df["color"] = [[255, int(200 * (1 - rate)), 0, 160] for rate in map_df["late_rate"]]
+map_df["size"] = 2000 + 20000 * map_df["shipments"] / max(map_df["shipments"].max(), 1)
+st.map(map_df, latitude="latitude", longitude="longitude", color="color", size="size")
+
+min_delivered = st.number_input("Minimum deliveries per location", min_value=1, value=5, step=1)
+st.write("**Top locations with shipping issues**")
+st.dataframe(
+    top_issue_cells(cell_stats, n=10, min_delivered=min_delivered).drop(columns="cell"),
+    hide_index=True,
+)
+
+# Search shipping logs by location
+st.subheader("🔎 Search Shipments by Location")
+col1, col2, col3 = st.columns(3)
+with col1:
+    search_lat = st.number_input("Latitude", min_value=-90.0, max_value=90.0, value=40.7, format="%.4f")
+with col2:
+    search_lon = st.number_input("Longitude", min_value=-180.0, max_value=180.0, value=-74.0, format="%.4f")
+with col3:
+    radius_km = st.number_input("Radius (km)", min_value=1.0, value=100.0, step=10.0)
+
+index = get_spatial_index(csv_path, modified_time, cell_size)
+positions, distances = index.radius(search_lat, search_lon, radius_km)
+# Apply the sidebar filters to the matches only
+keep = logs.filter_mask(carriers=carriers, regions=regions)[positions]
+positions, distances = positions[keep], distances[keep]
+nearby = logs.subset(positions)
+delivered = nearby.late >= 0
+
+col1, col2 = st.columns(2)
+with col1:
+    st.metric("Shipments in Radius", f"{len(nearby):,}")
+with col2:
+    st.metric("Late Rate in Radius", f"{nearby.late[delivered].mean():.1%}" if delivered.any() else "n/a")
+
+closest = np.argsort(distances)[:100]
+# Shipments not delivered yet (late == -1) are neither late nor on time
+late = nearby.late[closest]
+st.dataframe(
+    pd.DataFrame({
+        "Order ID": nearby.order_id[closest],
+        "Carrier": [logs.carriers[c] for c in nearby.carrier[closest]],
+        "Status": [logs.statuses[c] for c in nearby.status[closest]],
+        "Late": pd.array(np.where(late >= 0, late == 1, None), dtype="boolean"),
+        "Distance (km)": distances[closest].round(1),
+        "Latitude": nearby.latitude[closest],
+        "Longitude": nearby.longitude[closest],
+    }),
+    hide_index=True,
+)
+st.caption("Showing the 100 closest shipments.")
+
+# run the app with: streamlit run shipping_dashboard.py
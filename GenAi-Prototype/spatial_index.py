@@ -0,0 +1,156 @@
+# import packages
+import numpy as np
+import pandas as pd
+
+EARTH_RADIUS_KM = 6371.0
+# Length of one degree of latitude on the same sphere haversine_km uses
+KM_PER_DEGREE = np.pi * EARTH_RADIUS_KM / 180
+# Margin added to radius query boxes so float32 coordinates on the edge are not dropped
+BOX_MARGIN_DEGREES = 1e-4
+
+
+# Helper function to get great-circle distances in km from one point to many
+def haversine_km(lat, lon, latitudes, longitudes):
+    lat1, lon1 = np.radians(lat), np.radians(lon)
+    lat2, lon2 = np.radians(latitudes), np.radians(longitudes)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+class GridIndex:
+    """Buckets points into a fixed lat/lon grid for fast box and radius queries.
+
+    Points are sorted by cell id (row-major), so every grid row of a query box
+    is one contiguous slice of the sorted order and only cells that overlap
+    the box are ever touched. Longitudes are not wrapped at +/-180. Points
+    with a missing (non-finite) coordinate are kept in a cell past the grid,
+    so they never match a query and are not counted in cell_stats.
+    """
+
+    def __init__(self, latitudes, longitudes, cell_size=0.5):
+        self.latitudes = np.asarray(latitudes, dtype=np.float32)
+        self.longitudes = np.asarray(longitudes, dtype=np.float32)
+        self.cell_size = cell_size
+        valid = np.isfinite(self.latitudes) & np.isfinite(self.longitudes)
+        has_points = valid.any()
+        self.min_lat = float(np.nanmin(self.latitudes[valid])) if has_points else 0.0
+        self.min_lon = float(np.nanmin(self.longitudes[valid])) if has_points else 0.0
+        self.n_rows = int((np.nanmax(self.latitudes[valid]) - self.min_lat) // cell_size) + 1 if has_points else 1
+        self.n_cols = int((np.nanmax(self.longitudes[valid]) - self.min_lon) // cell_size) + 1 if has_points else 1
+
+        # Points without coordinates go to the extra cell n_rows * n_cols, after every real cell
+        self.cells = np.full(len(self.latitudes), self.n_rows * self.n_cols, dtype=np.int64)
+        self.cells[valid] = self._cell_ids(self.latitudes[valid], self.longitudes[valid])
+        self.order = np.argsort(self.cells, kind="stable")
+        # starts[c]:starts[c + 1] is the slice of `order` holding cell c
+        self.starts = np.concatenate([[0], np.cumsum(np.bincount(self.cells, minlength=self.n_rows * self.n_cols + 1))])
+
+    def _cell_ids(self, latitudes, longitudes):
+        rows = ((latitudes - self.min_lat) // self.cell_size).astype(np.int64)
+        cols = ((longitudes - self.min_lon) // self.cell_size).astype(np.int64)
+        return rows * self.n_cols + cols
+
+    def _clamp(self, value, upper):
+        return int(min(max(value, 0), upper - 1))
+
+    def bbox(self, min_lat, max_lat, min_lon, max_lon):
+        """Returns the indices of points inside the box (inclusive)."""
+        if max_lat < self.min_lat or max_lon < self.min_lon:
+            return np.empty(0, dtype=np.int64)
+        row0 = self._clamp((min_lat - self.min_lat) // self.cell_size, self.n_rows)
+        row1 = self._clamp((max_lat - self.min_lat) // self.cell_size, self.n_rows)
+        col0 = self._clamp((min_lon - self.min_lon) // self.cell_size, self.n_cols)
+        col1 = self._clamp((max_lon - self.min_lon) // self.cell_size, self.n_cols)
+
+        slices = [
+            self.order[self.starts[row * self.n_cols + col0]:self.starts[row * self.n_cols + col1 + 1]]
+            for row in range(row0, row1 + 1)
+        ]
+        candidates = np.concatenate(slices) if slices else np.empty(0, dtype=np.int64)
+        # Edge cells are only partly inside the box
+        lat = self.latitudes[candidates]
+        lon = self.longitudes[candidates]
+        inside = (lat >= min_lat) & (lat <= max_lat) & (lon >= min_lon) & (lon <= max_lon)
+        return np.sort(candidates[inside])
+
+    def radius(self, lat, lon, radius_km):
+        """Returns (indices, distances in km) of points within radius_km of (lat, lon)."""
+        lat_delta = radius_km / KM_PER_DEGREE + BOX_MARGIN_DEGREES
+        # A circle is widest in longitude at its poleward edge, so size the box with that latitude
+        max_abs_lat = abs(lat) + lat_delta
+        if max_abs_lat >= 90:
+            lon_delta = 360.0
+        else:
+            lon_delta = radius_km / (KM_PER_DEGREE * np.cos(np.radians(max_abs_lat))) + BOX_MARGIN_DEGREES
+        candidates = self.bbox(lat - lat_delta, lat + lat_delta, lon - lon_delta, lon + lon_delta)
+        distances = haversine_km(lat, lon, self.latitudes[candidates], self.longitudes[candidates])
+        within = distances <= radius_km
+        return candidates[within], distances[within]
+
+    def verify_radius(self, n_queries=300, seed=0):
+        """Compares radius() with a brute-force haversine scan; returns (points within radius, missed, extra)."""
+        rng = np.random.default_rng(seed)
+        located = np.flatnonzero(self.cells < self.n_rows * self.n_cols)
+        checked = missed = extra = 0
+        for _ in range(n_queries if len(located) else 0):
+            point = located[rng.integers(len(located))]
+            lat = float(self.latitudes[point]) + rng.uniform(-2, 2)
+            lon = float(self.longitudes[point]) + rng.uniform(-2, 2)
+            radius_km = rng.uniform(1, 1000)
+            found, _ = self.radius(lat, lon, radius_km)
+            expected = np.flatnonzero(haversine_km(lat, lon, self.latitudes, self.longitudes) <= radius_km)
+            checked += len(expected)
+            missed += len(np.setdiff1d(expected, found))
+            extra += len(np.setdiff1d(found, expected))
+        return checked, missed, extra
+
+    def cell_stats(self, late, mask=None):
+        """Shipments, deliveries and late rate per occupied cell, with the cell centre for a map.
+
+        late is 1/0 for delivered shipments and -1 otherwise; mask limits the points counted.
+        """
+        cells = self.cells if mask is None else self.cells[mask]
+        late = np.asarray(late) if mask is None else np.asarray(late)[mask]
+        n_cells = self.n_rows * self.n_cols
+        # Points without coordinates cannot be placed on the map
+        located = cells < n_cells
+        cells, late = cells[located], late[located]
+        delivered = late >= 0
+        shipments = np.bincount(cells, minlength=n_cells)
+        delivered_counts = np.bincount(cells[delivered], minlength=n_cells)
+        late_counts = np.bincount(cells[delivered], weights=late[delivered], minlength=n_cells)
+
+        occupied = np.flatnonzero(shipments)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            late_rate = late_counts[occupied] / delivered_counts[occupied]
+        return pd.DataFrame({
+            "cell": occupied,
+            "latitude": self.min_lat + (occupied // self.n_cols + 0.5) * self.cell_size,
+            "longitude": self.min_lon + (occupied % self.n_cols + 0.5) * self.cell_size,
+            "shipments": shipments[occupied],
+            "delivered": delivered_counts[occupied],
+            "late": late_counts[occupied].astype(np.int64),
+            "late_rate": late_rate,
+        })
+
+
+# Function to list the grid cells with the most late shipments
+def top_issue_cells(cell_stats, n=10, min_delivered=5):
+    ranked = cell_stats[cell_stats["delivered"] >= min_delivered]
+    return ranked.sort_values(["late", "late_rate"], ascending=False).head(n)
+
+
+if __name__ == "__main__":
+    # Self-check: radius queries must return exactly what a full haversine scan returns
+    from synthetic_data import make_shipping_logs
+
+    logs = make_shipping_logs(200_000)
+    # Some rows without coordinates, as a bad CSV row would have; they must never be returned
+    rng = np.random.default_rng(1)
+    logs.loc[rng.choice(len(logs), 500, replace=False), "Latitude"] = np.nan
+    logs.loc[rng.choice(len(logs), 500, replace=False), "Longitude"] = np.nan
+    index = GridIndex(logs["Latitude"], logs["Longitude"])
+    checked, missed, extra = index.verify_radius()
+    print(f"{checked:,} points within radius checked: {missed} missed, {extra} extra")
+    if missed or extra:
+        raise SystemExit(1)
@@ -0,0 +1,418 @@
+"""Local stand-in for the OpenAI, Gemini and Cortex endpoints used by the apps.
+
+Start the stub, then point an app at it with LLM_STUB_URL:
+
+    python stub_server.py --port 8765 --latency lognormal:0.8,0.5 --error-rate 0.02
+    LLM_STUB_URL=http://127.0.0.1:8765 streamlit run data_analyzer.py
+
+No API key or network access is needed. GET /stats reports request counts,
+injected errors and observed latency so throughput can be measured.
+"""
+# import packages
+import argparse
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+POSITIVE_WORDS = {"great", "love", "excellent", "comfortable", "warm", "perfect", "amazing", "good", "best", "reliable"}
+NEGATIVE_WORDS = {"issues", "poor", "broke", "failure", "failures", "cold", "disappointed", "defective", "leak", "worst", "unsatisfactory"}
+
+
+# --- Latency and error injection ---
+def parse_latency(spec):
+    """Parses a latency spec such as 'fixed:0.5', 'uniform:0.2,1.5' or 'lognormal:0.8,0.5' into a sampler."""
+    name, _, args = spec.partition(":")
+    params = [float(x) for x in args.split(",") if x]
+    if name == "none":
+        return lambda rng: 0.0
+    if name == "fixed":
+        return lambda rng: params[0]
+    if name == "uniform":
+        return lambda rng: rng.uniform(params[0], params[1])
+    if name == "normal":
+        return lambda rng: max(0.0, rng.gauss(params[0], params[1]))
+    if name == "lognormal":
+        # First parameter is the median in seconds, second is sigma of the underlying normal
+        mu = math.log(params[0])
+        return lambda rng: rng.lognormvariate(mu, params[1])
+    if name == "exponential":
+        return lambda rng: rng.expovariate(1.0 / params[0])
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+class StubConfig:
+    """Runtime settings shared by every request handler."""
+
+    def __init__(self, latency="none", error_rate=0.0, token_delay=0.0, reply_words=40, seed=None):
+        self.sample_latency = parse_latency(latency)
+        self.error_rate = error_rate
+        self.token_delay = token_delay
+        self.reply_words = reply_words
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "errors": 0, "latency_total": 0.0, "by_route": {}}
+        # Gemini context caches by name -> {"text", "resource"}
+        self.context_caches = {}
+
+    def draw(self):
+        """Returns (latency seconds, inject error) for one request."""
+        with self.lock:
+            return self.sample_latency(self.rng), self.rng.random() < self.error_rate
+
+    def record(self, route, latency, failed):
+        with self.lock:
+            self.stats["requests"] += 1
+            self.stats["errors"] += int(failed)
+            self.stats["latency_total"] += latency
+            self.stats["by_route"][route] = self.stats["by_route"].get(route, 0) + 1
+
+    def snapshot(self):
+        with self.lock:
+            stats = dict(self.stats, by_route=dict(self.stats["by_route"]))
+        stats["mean_latency"] = stats["latency_total"] / stats["requests"] if stats["requests"] else 0.0
+        return stats
+
+
+# --- Fake model output ---
+def lexicon_label(review):
+    """Returns (label, confidence) from counts of positive and negative words."""
+    words = set(re.findall(r"[a-z]+", review.lower()))
+    score = len(words & POSITIVE_WORDS) - len(words & NEGATIVE_WORDS)
+    label = "Positive" if score > 0 else "Negative" if score < 0 else "Neutral"
+    return label, round(min(0.99, 0.55 + 0.15 * abs(score)), 2)
+
+
+def fake_reply(prompt, reply_words=40):
+    """Builds a deterministic reply for a prompt, answering sentiment prompts with a single label."""
+    if "Positive, Negative, or Neutral" in prompt:
+        return lexicon_label(prompt.rsplit("Review:", 1)[-1])[0]
+    if "Return only a JSON query spec" in prompt:
+        return fake_query_spec(prompt)
+
+    seed = int(hashlib.md5(prompt.encode("utf-8")).hexdigest(), 16)
+    rng = random.Random(seed)
+    vocabulary = re.findall(r"[A-Za-z]+", prompt) or ["stub"]
+    return " ".join(rng.choice(vocabulary) for _ in range(reply_words)).capitalize() + "."
+
+
+def fake_query_spec(prompt):
+    """Answers a query planner prompt: filters on listed values the question mentions, and a mean or a count."""
+    question = prompt.rsplit("<question>", 1)[-1].split("</question>", 1)[0].lower()
+    filters, numbers = [], []
+    for column, kind, values in re.findall(r"^- (\S+) \(([^)]*)\)(?:: (.*))?$", prompt, flags=re.MULTILINE):
+        if kind == "text" and values:
+            mentioned = [v for v in json.loads(f"[{values}]") if v.lower() in question]
+            if mentioned:
+                filters.append({"column": column, "op": "in", "value": mentioned})
+        elif kind.startswith("number"):
+            numbers.append(column)
+    # Average the first number column named in the question, e.g. "sentiment" for SENTIMENT_SCORE
+    named = [c for c in numbers if any(word in question for word in c.lower().split("_"))]
+    if re.search(r"\b(average|mean)\b", question) and (named or numbers):
+        aggregate = {"function": "mean", "column": (named or numbers)[0]}
+    else:
+        aggregate = {"function": "count"}
+    return json.dumps({"filters": filters, "group_by": [], "aggregate": aggregate})
+
+
+def fake_json_reply(prompt):
+    """Answers a JSON-mode sentiment prompt: a results list for "[id] review" lines, otherwise one label."""
+    reviews = re.findall(r"^\[(\d+)\] (.*)$", prompt, flags=re.MULTILINE)
+    if reviews:
+        results = []
+        for row_id, review in reviews:
+            label, confidence = lexicon_label(review)
+            results.append({"id": int(row_id), "label": label, "confidence": confidence})
+        return json.dumps({"results": results})
+    label, confidence = lexicon_label(prompt.rsplit("Review:", 1)[-1])
+    return json.dumps({"label": label, "confidence": confidence})
+
+
+def contents_text(contents):
+    """Joins the text parts of Gemini contents."""
+    return "\n".join(part.get("text", "") for content in contents for part in content.get("parts", []))
+
+
+def count_tokens(text):
+    """Rough token estimate used for the usage fields."""
+    return max(1, int(len(text.split()) * 1.3))
+
+
+def chunk_words(text, size=4):
+    """Splits text into small pieces for streaming."""
+    words = text.split(" ")
+    return [" ".join(words[i:i + size]) + (" " if i + size < len(words) else "") for i in range(0, len(words), size)]
+
+
+# --- Provider response shapes ---
+def openai_response(model, text, prompt):
+    """Mimics client.responses.create(...) so response.output[0].content[0].text works."""
+    return {
+        "id": f"resp_{uuid.uuid4().hex}",
+        "object": "response",
+        "created_at": int(time.time()),
+        "status": "completed",
+        "model": model,
+        "output": [{
+            "type": "message",
+            "id": f"msg_{uuid.uuid4().hex}",
+            "status": "completed",
+            "role": "assistant",
+            "content": [{"type": "output_text", "text": text, "annotations": []}],
+        }],
+        "parallel_tool_calls": True,
+        "tool_choice": "auto",
+        "tools": [],
+        "usage": {
+            "input_tokens": count_tokens(prompt),
+            "output_tokens": count_tokens(text),
+            "total_tokens": count_tokens(prompt) + count_tokens(text),
+        },
+    }
+
+
+def gemini_response(text, prompt, finish_reason="STOP"):
+    """Mimics a generateContent payload so response.text works."""
+    candidate = {"content": {"parts": [{"text": text}], "role": "model"}, "index": 0}
+    if finish_reason:
+        candidate["finishReason"] = finish_reason
+    return {
+        "candidates": [candidate],
+        "usageMetadata": {
+            "promptTokenCount": count_tokens(prompt),
+            "candidatesTokenCount": count_tokens(text),
+            "totalTokenCount": count_tokens(prompt) + count_tokens(text),
+        },
+    }
+
+
+def cached_content_resource(name, body, prompt):
+    """Mimics a CachedContent resource so CachedContent.create/get work."""
+    ttl = float(str(body.get("ttl", "3600s")).rstrip("s"))
+    now = time.time()
+    stamp = lambda t: time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(t))
+    return {
+        "name": name,
+        "model": body.get("model", "models/gemini-2.5-flash"),
+        "displayName": body.get("displayName", ""),
+        "createTime": stamp(now),
+        "updateTime": stamp(now),
+        "expireTime": stamp(now + ttl),
+        "usageMetadata": {"totalTokenCount": count_tokens(prompt)},
+    }
+
+
+def cortex_response(model, text):
+    """Mimics the Cortex inference:complete REST payload."""
+    return {"model": model, "choices": [{"message": {"content": text}}]}
+
+
+def error_body(route):
+    """Returns a provider-shaped rate limit error."""
+    if route == "gemini":
+        return {"error": {"code": 429, "message": "Stub rate limit", "status": "RESOURCE_EXHAUSTED"}}
+    return {"error": {"message": "Stub rate limit", "type": "rate_limit_error", "code": "rate_limit_exceeded"}}
+
+
+# --- HTTP handler ---
+class StubHandler(BaseHTTPRequestHandler):
+    config = StubConfig()
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_events(self, events):
+        """Writes server-sent events, pausing token_delay between chunks."""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        for event_name, payload in events:
+            if event_name:
+                self.wfile.write(f"event: {event_name}\n".encode("utf-8"))
+            self.wfile.write(f"data: {json.dumps(payload)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+            time.sleep(self.config.token_delay)
+        self.close_connection = True
+
+    def read_json(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == "/stats":
+            self.send_json(200, self.config.snapshot())
+        elif path == "/healthz":
+            self.send_json(200, {"status": "ok"})
+        elif path.startswith("/v1beta/cachedContents/"):
+            cache = self.config.context_caches.get(path[len("/v1beta/"):])
+            if cache:
+                self.send_json(200, cache["resource"])
+            else:
+                self.send_json(404, {"error": {"code": 404, "message": "Cached content not found", "status": "NOT_FOUND"}})
+        elif path.startswith("/v1beta/models"):
+            self.send_json(200, {"models": [{
+                "name": "models/gemini-2.5-flash",
+                "baseModelId": "gemini-2.5-flash",
+                "version": "stub",
+                "displayName": "Gemini 2.5 Flash (stub)",
+                "description": "Local stub model for load testing.",
+                "inputTokenLimit": 1048576,
+                "outputTokenLimit": 65536,
+                "supportedGenerationMethods": ["generateContent", "streamGenerateContent"],
+                "temperature": 1.0,
+                "maxTemperature": 2.0,
+                "topP": 0.95,
+                "topK": 64,
+            }]})
+        else:
+            self.send_json(404, {"error": {"message": f"Unknown path {path}"}})
+
+    def do_DELETE(self):
+        path = urlparse(self.path).path
+        self.config.context_caches.pop(path[len("/v1beta/"):], None)
+        self.send_json(200, {})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        body = self.read_json()
+
+        if url.path == "/v1beta/cachedContents":
+            prompt = contents_text(body.get("contents", []))
+            name = f"cachedContents/{uuid.uuid4().hex[:12]}"
+            resource = cached_content_resource(name, body, prompt)
+            self.config.context_caches[name] = {"text": prompt, "resource": resource}
+            self.send_json(200, resource)
+            return
+        if url.path == "/v1/responses":
+            route = "openai"
+        elif url.path.startswith("/v1beta/models/"):
+            route = "gemini"
+        elif url.path == "/api/v2/cortex/inference:complete":
+            route = "cortex"
+        else:
+            self.send_json(404, {"error": {"message": f"Unknown path {url.path}"}})
+            return
+
+        latency, failed = self.config.draw()
+        time.sleep(latency)
+        self.config.record(route, latency, failed)
+        if failed:
+            self.send_json(429, error_body(route))
+            return
+
+        if route == "openai":
+            self.handle_openai(body)
+        elif route == "gemini":
+            self.handle_gemini(url, body)
+        else:
+            self.handle_cortex(body)
+
+    def handle_openai(self, body):
+        prompt = body.get("input", "")
+        if isinstance(prompt, list):
+            prompt = "\n".join(str(m.get("content", "")) for m in prompt)
+        model = body.get("model", "gpt-4o")
+        json_mode = body.get("text", {}).get("format", {}).get("type") in ("json_schema", "json_object")
+        text = fake_json_reply(prompt) if json_mode else fake_reply(prompt, self.config.reply_words)
+        response = openai_response(model, text, prompt)
+        if not body.get("stream"):
+            self.send_json(200, response)
+            return
+
+        item_id = response["output"][0]["id"]
+        events = [("response.created", {"type": "response.created", "response": dict(response, status="in_progress", output=[])})]
+        for piece in chunk_words(text):
+            events.append(("response.output_text.delta", {
+                "type": "response.output_text.delta", "item_id": item_id,
+                "output_index": 0, "content_index": 0, "delta": piece,
+            }))
+        events.append(("response.completed", {"type": "response.completed", "response": response}))
+        self.send_events(events)
+
+    def handle_gemini(self, url, body):
+        prompt = contents_text(body.get("contents", []))
+        cache = self.config.context_caches.get(body.get("cachedContent", ""))
+        if body.get("cachedContent") and cache is None:
+            self.send_json(404, {"error": {"code": 404, "message": "Cached content not found", "status": "NOT_FOUND"}})
+            return
+        json_mode = body.get("generationConfig", {}).get("responseMimeType") == "application/json"
+        text = fake_json_reply(prompt) if json_mode else fake_reply(prompt, self.config.reply_words)
+        if ":streamGenerateContent" not in url.path:
+            response = gemini_response(text, prompt)
+            if cache:
+                cached_tokens = count_tokens(cache["text"])
+                response["usageMetadata"]["promptTokenCount"] += cached_tokens
+                response["usageMetadata"]["totalTokenCount"] += cached_tokens
+                response["usageMetadata"]["cachedContentTokenCount"] = cached_tokens
+            self.send_json(200, response)
+            return
+
+        pieces = chunk_words(text)
+        payloads = [gemini_response(p, prompt, "STOP" if i == len(pieces) - 1 else None) for i, p in enumerate(pieces)]
+        if parse_qs(url.query).get("alt") == ["sse"]:
+            self.send_events([(None, p) for p in payloads])
+        else:
+            self.send_json(200, payloads)
+
+    def handle_cortex(self, body):
+        prompt = "\n".join(m.get("content", "") for m in body.get("messages", []))
+        model = body.get("model", "claude-3-5-sonnet")
+        text = fake_reply(prompt, self.config.reply_words)
+        if not body.get("stream"):
+            self.send_json(200, cortex_response(model, text))
+            return
+        self.send_events([(None, {"choices": [{"delta": {"content": p}}]}) for p in chunk_words(text)])
+
+
+# Helper function to run the stub in a background thread (handy for benchmarks)
+def start_stub_server(host="127.0.0.1", port=0, **config):
+    """Starts the stub server in a daemon thread and returns (server, base_url)."""
+    handler = type("ConfiguredStubHandler", (StubHandler,), {"config": StubConfig(**config)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local OpenAI/Gemini/Cortex stub server for load testing.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", default="none",
+                        help="none, fixed:S, uniform:LO,HI, normal:MEAN,STD, lognormal:MEDIAN,SIGMA or exponential:MEAN (seconds)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 429")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="Seconds between streamed chunks")
+    parser.add_argument("--reply-words", type=int, default=40, help="Length of non-sentiment replies")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    StubHandler.config = StubConfig(args.latency, args.error_rate, args.token_delay, args.reply_words, args.seed)
+    server = ThreadingHTTPServer((args.host, args.port), StubHandler)
+    server.daemon_threads = True
+    print(f"LLM stub listening on http://{args.host}:{args.port} (set LLM_STUB_URL to this address)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+"""Map-reduce summarization of customer reviews into per-product insights.
+
+Reviews of each product are split into chunks, every chunk is summarized by
+Gemini in parallel (map), and the partial summaries are merged into one
+insight summary per product (reduce). Products with many chunks are reduced
+in several rounds of at most --fan-in summaries each. Near-duplicate reviews of
+a product are listed once in the map prompts, marked with how many reviews
+they stand for (see dedup.py).
+
+    python summarize_reviews.py                                   # writes product_summaries.json
+    python summarize_reviews.py --product "Alpine Skis" --concurrency 16
+    LLM_STUB_URL=http://127.0.0.1:8765 python summarize_reviews.py --data big_reviews.csv
+
+Every summary is cached on disk by a hash of its prompt, which contains the
+chunk's reviews. Chunk boundaries depend on review content rather than on
+position, so new or edited reviews only re-summarize the chunks they land in
+and the reduce steps above them; everything else comes from the cache.
+"""
+# import packages
+import argparse
+import os
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from dedup import find_near_duplicates
+from evaluate_sentiment import ReplyCache
+from incremental_refresh import KEY_COLUMN
+from llm import GEMINI_MODEL, configure_gemini, get_gemini_model
+from review_pipeline import get_dataset_path, load_reviews
+
+CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".summary_cache.jsonl")
+OUTPUT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "product_summaries.json")
+
+# Chunk sizes in characters (about 4 characters per token)
+MIN_CHUNK_CHARS = 6000
+MAX_CHUNK_CHARS = 16000
+# After MIN_CHUNK_CHARS, a chunk ends after a review whose hash is divisible by this
+BOUNDARY_DIVISOR = 8
+REDUCE_FAN_IN = 20
+MAX_ATTEMPTS = 3
+
+MAP_PROMPT = (
+    "You are analysing customer reviews of {product}. Summarize the main themes of the reviews below "
+    "as short bullet points: what customers praise, what they complain about, and any recurring "
+    "defects or delivery problems. Say roughly how many reviews mention each theme; a review "
+    "starting with [xN] stands for N near-identical reviews.\n\n"
+    "Reviews:\n{reviews}"
+)
+REDUCE_PROMPT = (
+    "Below are partial summaries of customer reviews of {product}, each covering a different set of "
+    "reviews. Merge them into one insight summary with the sections Strengths, Weaknesses, Recurring "
+    "issues and Recommendation. Keep themes that appear in several summaries, say how widespread they "
+    "are, and do not invent details.\n\n"
+    "Partial summaries:\n{summaries}"
+)
+
+
+# Helper function to split reviews (in a stable order) into content-defined chunks
+def chunk_reviews(texts, min_chars=MIN_CHUNK_CHARS, max_chars=MAX_CHUNK_CHARS, divisor=BOUNDARY_DIVISOR):
+    """Returns a list of chunks, each a list of review texts.
+
+    A boundary is placed after a review whose crc32 is divisible by divisor
+    once the chunk has min_chars, or when it reaches max_chars. Inserting a
+    review therefore changes only the chunk it falls into (and at most the
+    next one), instead of shifting every later chunk.
+    """
+    chunks, current, size = [], [], 0
+    for text in texts:
+        current.append(text)
+        size += len(text) + 1
+        if size >= max_chars or (size >= min_chars and zlib.crc32(text.encode("utf-8")) % divisor == 0):
+            chunks.append(current)
+            current, size = [], 0
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+# Helper function to get the cleaned review texts of each product in a stable order
+def product_reviews(df):
+    """Returns {product: list of review texts}."""
+    order = [KEY_COLUMN] if KEY_COLUMN in df.columns else ["SUMMARY"]
+    df = df.dropna(subset=["SUMMARY"]).sort_values(order, kind="stable")
+    texts = df["SUMMARY"].astype(str).str.split().str.join(" ")
+    return {product: group.tolist() for product, group in texts[texts != ""].groupby(df["PRODUCT"], sort=True)}
+
+
+# Helper function to list near-duplicate reviews once, marked with the number of reviews they stand for
+def collapse_near_duplicates(texts):
+    """Returns the first review of every near-duplicate cluster, in order, prefixed with [xN] when N > 1."""
+    representatives = find_near_duplicates(texts)
+    counts = np.bincount(representatives, minlength=len(texts))
+    return [f"[x{counts[i]}] {texts[i]}" if counts[i] > 1 else texts[i] for i in np.unique(representatives)]
+
+
+# Helper function to call Gemini with retries and exponential backoff
+def generate(model, prompt):
+    """Returns (summary, input tokens, output tokens); raises after MAX_ATTEMPTS failures."""
+    for attempt in range(MAX_ATTEMPTS):
+        try:
+            response = get_gemini_model(model).generate_content(prompt)
+            usage = response.usage_metadata
+            return response.text.strip(), usage.prompt_token_count, usage.candidates_token_count
+        except Exception:
+            if attempt == MAX_ATTEMPTS - 1:
+                raise
+            time.sleep(2 ** attempt)
+
+
+# Function to run a list of prompts through the model in parallel, reusing cached summaries
+def run_prompts(prompts, step, model, cache, concurrency, stats):
+    """Returns the summaries in order (None where the call failed); step is "map" or "reduce"."""
+    keys = [ReplyCache.key("gemini", model, step, prompt) for prompt in prompts]
+    summaries = [(cache.get(key) or {}).get("summary") for key in keys]
+    missing = [i for i, summary in enumerate(summaries) if summary is None]
+    stats[f"{step}_cached"] += len(prompts) - len(missing)
+    stats[f"{step}_calls"] += len(missing)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = {pool.submit(generate, model, prompts[i]): i for i in missing}
+        for done, future in enumerate(as_completed(futures), start=1):
+            i = futures[future]
+            try:
+                summary, input_tokens, output_tokens = future.result()
+            except Exception as e:
+                stats["failures"] += 1
+                stats["last_error"] = str(e)
+                continue
+            summaries[i] = summary
+            stats["input_tokens"] += input_tokens
+            stats["output_tokens"] += output_tokens
+            # Cache each summary as it arrives so an interrupted run keeps its progress
+            cache.add([{"key": keys[i], "summary": summary}])
+            if done % 50 == 0 or done == len(futures):
+                print(f"  {step}: {done}/{len(futures)} uncached summaries")
+    return summaries
+
+
+# Function to summarize the reviews of every product with map-reduce
+def summarize_products(df, cache, model=GEMINI_MODEL, concurrency=8, fan_in=REDUCE_FAN_IN, dedup=True):
+    """Returns (DataFrame with PRODUCT, Reviews, Distinct, Chunks, Summary, Complete columns, stats dict).
+
+    Distinct is the number of reviews left after collapsing near-duplicates (dedup=True).
+    """
+    stats = {"map_calls": 0, "map_cached": 0, "reduce_calls": 0, "reduce_cached": 0,
+             "failures": 0, "input_tokens": 0, "output_tokens": 0, "last_error": None}
+    start = time.perf_counter()
+    fan_in = max(2, fan_in)
+    reviews = product_reviews(df)
+    distinct = {product: collapse_near_duplicates(texts) if dedup else texts for product, texts in reviews.items()}
+    chunks = {product: chunk_reviews(texts) for product, texts in distinct.items()}
+
+    # Map: every chunk of every product goes through one worker pool
+    jobs = [(product, chunk) for product, product_chunks in chunks.items() for chunk in product_chunks]
+    prompts = [MAP_PROMPT.format(product=product, reviews="\n".join(f"- {t}" for t in chunk)) for product, chunk in jobs]
+    partials = {product: [] for product in chunks}
+    complete = {product: True for product in chunks}
+    for (product, _), summary in zip(jobs, run_prompts(prompts, "map", model, cache, concurrency, stats)):
+        if summary is None:
+            complete[product] = False
+        else:
+            partials[product].append(summary)
+
+    # Reduce in rounds until every product has a single summary
+    final = {product: None for product, summaries in partials.items() if not summaries}
+    partials = {product: summaries for product, summaries in partials.items() if summaries}
+    while partials:
+        jobs = []
+        for product, summaries in partials.items():
+            jobs.extend((product, summaries[i:i + fan_in]) for i in range(0, len(summaries), fan_in))
+        prompts = [
+            REDUCE_PROMPT.format(product=product, summaries="\n\n".join(f"Summary {i + 1}:\n{s}" for i, s in enumerate(group)))
+            for product, group in jobs
+        ]
+        reduced = {product: [] for product in partials}
+        for (product, group), summary in zip(jobs, run_prompts(prompts, "reduce", model, cache, concurrency, stats)):
+            if summary is None:
+                complete[product] = False
+            else:
+                reduced[product].append(summary)
+        partials = {}
+        for product, summaries in reduced.items():
+            if len(summaries) > 1:
+                partials[product] = summaries
+            else:
+                final[product] = summaries[0] if summaries else None
+
+    result = pd.DataFrame({
+        "PRODUCT": list(chunks),
+        "Reviews": [len(reviews[p]) for p in chunks],
+        "Distinct": [len(distinct[p]) for p in chunks],
+        "Chunks": [len(chunks[p]) for p in chunks],
+        "Summary": [final.get(p) for p in chunks],
+        "Complete": [complete[p] for p in chunks],
+    })
+    stats["wall_seconds"] = time.perf_counter() - start
+    return result, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize customer reviews per product with map-reduce.")
+    parser.add_argument("--data", default=get_dataset_path(), help="Review CSV with PRODUCT and SUMMARY")
+    parser.add_argument("--product", action="append", help="Only summarize this product (repeatable)")
+    parser.add_argument("--model", default=GEMINI_MODEL)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--fan-in", type=int, default=REDUCE_FAN_IN, help="Summaries merged per reduce call")
+    parser.add_argument("--no-dedup", action="store_true", help="List near-duplicate reviews separately")
+    parser.add_argument("--cache", default=CACHE_PATH, help="Summary cache file ('' disables caching)")
+    parser.add_argument("--output", default=OUTPUT_PATH, help="JSON file for the product summaries")
+    args = parser.parse_args()
+
+    if not configure_gemini():
+        raise SystemExit("GEMINI_API_KEY not found (or set LLM_STUB_URL to use the stub server).")
+
+    df = load_reviews(args.data)
+    if args.product:
+        df = df[df["PRODUCT"].isin(args.product)]
+    result, stats = summarize_products(df, ReplyCache(args.cache), args.model, args.concurrency, args.fan_in,
+                                       not args.no_dedup)
+
+    result.to_json(args.output, orient="records", indent=2)
+    print(f"Summarized {result['Reviews'].sum():,} reviews of {len(result)} products in {stats['wall_seconds']:.1f}s")
+    reviews, distinct = result["Reviews"].sum(), result["Distinct"].sum()
+    if reviews:
+        print(f"  dedup: {distinct:,} distinct reviews, {1 - distinct / reviews:.0%} near-duplicates")
+    print(f"  map: {stats['map_calls']} calls, {stats['map_cached']} cached; "
+          f"reduce: {stats['reduce_calls']} calls, {stats['reduce_cached']} cached")
+    print(f"  tokens: {stats['input_tokens']:,} in, {stats['output_tokens']:,} out")
+    if stats["failures"]:
+        print(f"  {stats['failures']} calls failed (last error: {stats['last_error']}); rerun to retry them")
+    print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
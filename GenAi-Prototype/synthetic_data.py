@@ -0,0 +1,84 @@
+# import packages
+import os
+import re
+import numpy as np
+import pandas as pd
+
+PRODUCTS = [
+    "Thermal Gloves", "Alpine Skis", "Carbon Fiber Poles", "Ski Goggles", "Insulated Jacket",
+    "Mountain Series Helmet", "Performance Racing Skis", "Avalanche Safety Pack", "Alpine Base Layer", "Pro Ski Boots",
+]
+CARRIERS = [
+    "SummitLine Express", "SnowRunner Logistics", "MountainRoute Express",
+    "AlpineSpeed Delivery", "PeakPath Shipping", "SwiftWing Logistics",
+]
+STATUSES = ["Delivered", "In Transit", "Processing"]
+STATUS_WEIGHTS = [0.57, 0.32, 0.11]
+# Region -> (latitude range, longitude range), taken from data/shipping_logs.csv
+REGIONS = {
+    "Asia": ((34.0, 51.0), (26.0, 139.0)),
+    "Europe": ((34.0, 51.0), (-41.0, 137.0)),
+    "North America": ((34.0, 51.0), (-120.5, -36.8)),
+    "Africa": ((34.3, 37.6), (-1.3, 18.8)),
+}
+REGION_WEIGHTS = [0.38, 0.32, 0.29, 0.01]
+
+
+# Helper function to collect review sentences to recombine into new summaries
+def load_sentence_pool():
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    csv_path = os.path.join(current_dir, "customer_reviews.csv")
+    try:
+        summaries = pd.read_csv(csv_path)["SUMMARY"].dropna()
+    except FileNotFoundError:
+        return ["The product arrived on time and works as described."]
+    sentences = [s.strip() for text in summaries for s in re.split(r"(?<=\.)\s+", text) if s.strip()]
+    return sentences
+
+
+# Function to create a synthetic reviews dataset with the customer_reviews.csv schema
+def make_reviews(n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    sentences = np.array(load_sentence_pool(), dtype=object)
+
+    # Each summary is two to four sentences drawn from the real reviews
+    picks = rng.integers(0, len(sentences), size=(n_rows, 4))
+    lengths = rng.integers(2, 5, size=n_rows)
+    summaries = [" ".join(sentences[row[:k]]) for row, k in zip(picks, lengths)]
+
+    start = np.datetime64("2023-10-01")
+    return pd.DataFrame({
+        "PRODUCT": np.array(PRODUCTS, dtype=object)[rng.integers(0, len(PRODUCTS), n_rows)],
+        "DATE": (start + rng.integers(0, 92, n_rows).astype("timedelta64[D]")).astype(str),
+        "SUMMARY": summaries,
+        "SENTIMENT_SCORE": rng.uniform(-0.9, 0.9, n_rows),
+        "Order ID": np.arange(2000, 2000 + n_rows),
+    })
+
+
+# Function to create a synthetic shipping log with the shipping_logs.csv schema
+def make_shipping_logs(n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    region_names = list(REGIONS)
+    region_idx = rng.choice(len(region_names), size=n_rows, p=REGION_WEIGHTS)
+    lat_bounds = np.array([REGIONS[r][0] for r in region_names])[region_idx]
+    lon_bounds = np.array([REGIONS[r][1] for r in region_names])[region_idx]
+
+    status = np.array(STATUSES, dtype=object)[rng.choice(len(STATUSES), size=n_rows, p=STATUS_WEIGHTS)]
+    delivered = status == "Delivered"
+    delivery_days = np.where(delivered, rng.integers(1, 11, n_rows), np.nan)
+    late = np.where(delivered, delivery_days > 5, None)
+
+    start = np.datetime64("2025-05-14")
+    return pd.DataFrame({
+        "Order ID": np.arange(2000, 2000 + n_rows),
+        "Shipping Date": (start + rng.integers(0, 59, n_rows).astype("timedelta64[D]")).astype(str),
+        "Carrier": np.array(CARRIERS, dtype=object)[rng.integers(0, len(CARRIERS), n_rows)],
+        "Tracking Number": rng.integers(100_000_000, 1_000_000_000, n_rows),
+        "Latitude": np.round(rng.uniform(lat_bounds[:, 0], lat_bounds[:, 1]), 4),
+        "Longitude": np.round(rng.uniform(lon_bounds[:, 0], lon_bounds[:, 1]), 4),
+        "Status": status,
+        "Delivery Days": delivery_days,
+        "Late": late,
+        "Region": np.array(region_names, dtype=object)[region_idx],
+    })
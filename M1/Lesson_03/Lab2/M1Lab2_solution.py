@@ -2,6 +2,7 @@
 import streamlit as st
 import pandas as pd
 import os
+import json
 import plotly.express as px
 import openai
 from dotenv import load_dotenv
@@ -10,8 +11,43 @@ from dotenv import load_dotenv
 # Load environment variables
 load_dotenv()
 
-# Initialize OpenAI client
-client = openai.OpenAI()
+# Initialize OpenAI client (set LLM_STUB_URL to load test against GenAi-Prototype/stub_server.py)
+stub_url = os.getenv("LLM_STUB_URL")
+if stub_url:
+    client = openai.OpenAI(base_url=f"{stub_url.rstrip('/')}/v1", api_key="stub-key")
+else:
+    client = openai.OpenAI()
+
+
+# Reviews classified per call; every review in a batch is tagged with its row id
+BATCH_SIZE = 25
+
+# JSON schema for the sentiment reply: one {id, label, confidence} result per review in the batch
+SENTIMENT_FORMAT = {
+    "type": "json_schema",
+    "name": "sentiment_batch",
+    "strict": True,
+    "schema": {
+        "type": "object",
+        "properties": {
+            "results": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "id": {"type": "integer"},
+                        "label": {"type": "string", "enum": ["Positive", "Negative", "Neutral"]},
+                        "confidence": {"type": "number"},
+                    },
+                    "required": ["id", "label", "confidence"],
+                    "additionalProperties": False,
+                },
+            },
+        },
+        "required": ["results"],
+        "additionalProperties": False,
+    },
+}
 
 
 # Helper function to get dataset path
@@ -23,27 +59,43 @@ def get_dataset_path():
     return csv_path
 
 
-# Function to get sentiment using GenAI
+# Helper function to classify one batch of reviews in a single call. Errors are raised, and
+# st.cache_data does not cache exceptions, so a failed batch is retried on the next click
 @st.cache_data
-def get_sentiment(text):
-    if not text or pd.isna(text):
-        return "Neutral"
-    try:
-        response = client.responses.create(
-            model="gpt-4o",  # Use the latest chat model
-            input=[
-                {"role": "system", "content": "Classify the sentiment of the following review as exactly one word: Positive, Negative, or Neutral."},
-                {"role": "user", "content": f"What's the sentiment of this review? {text}"}
-            ],
-            temperature=0,  # Deterministic output
-            max_output_tokens=100  # Limit response length
-        )
-        return response.output[0].content[0].text.strip()
-    except Exception as e:
-        st.error(f"API error: {e}")
-        return "Neutral"
-
-
+def get_batch_sentiment(texts):
+    """texts is a tuple of non-empty reviews; returns their labels in the same order."""
+    reviews = "\n".join(f"[{row_id}] {' '.join(str(text).split())}" for row_id, text in enumerate(texts))
+    response = client.responses.create(
+        model="gpt-4o",  # Use the latest chat model
+        input=[
+            {"role": "system", "content": "Classify the sentiment of each review below as Positive, Negative, or Neutral. "
+                                          "Return one result per review with its id, the label and your confidence from 0 to 1."},
+            {"role": "user", "content": reviews}
+        ],
+        temperature=0,  # Deterministic output
+        text={"format": SENTIMENT_FORMAT},  # Structured output: {"results": [{"id", "label", "confidence"}, ...]}
+        max_output_tokens=16 + 24 * len(texts)  # About 24 tokens per result plus the wrapper
+    )
+    labels = {item["id"]: item["label"] for item in json.loads(response.output[0].content[0].text)["results"]}
+    missing = [row_id for row_id in range(len(texts)) if row_id not in labels]
+    if missing:
+        raise ValueError(f"No sentiment returned for reviews {missing}")
+    return [labels[row_id] for row_id in range(len(texts))]
+
+
+# Function to get sentiment using GenAI, BATCH_SIZE reviews per call
+def get_sentiments(texts):
+    """Returns a label per review in order; empty reviews are Neutral and reviews in a failed batch are None."""
+    labels = ["Neutral" if not text or pd.isna(text) else None for text in texts]
+    pending = [i for i, label in enumerate(labels) if label is None]
+    for start in range(0, len(pending), BATCH_SIZE):
+        batch = pending[start:start + BATCH_SIZE]
+        try:
+            for i, label in zip(batch, get_batch_sentiment(tuple(texts[i] for i in batch))):
+                labels[i] = label
+        except Exception as e:
+            st.error(f"API error: {e}")
+    return labels
 
 
 st.title("🔍 GenAI Sentiment Analysis Dashboard")
@@ -67,7 +119,7 @@ with col2:
         if "df" in st.session_state:
             try:
                 with st.spinner("Analyzing sentiment..."):
-                    st.session_state["df"].loc[:, "Sentiment"] = st.session_state["df"]["SUMMARY"].apply(get_sentiment)
+                    st.session_state["df"].loc[:, "Sentiment"] = get_sentiments(st.session_state["df"]["SUMMARY"].tolist())
                     st.success("Sentiment analysis completed!")
             except Exception as e:
                 st.error(f"Something went wrong: {e}")
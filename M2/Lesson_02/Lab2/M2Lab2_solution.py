@@ -2,25 +2,60 @@ import streamlit as st
 from snowflake.snowpark.context import get_active_session
 import pandas as pd
 import matplotlib.pyplot as plt
-from snowflake.cortex import complete
+
+from cross_filter import CrossFilter
 
 # Connect to Snowflake and load data
 session = get_active_session()
-df = session.table('reviews_with_sentiment').to_pandas()
+
+
+# Table metadata only, checked at most once a minute, so new rows show up without scanning the table
+@st.cache_data(ttl=60)
+def get_table_version():
+    query_probe = """
+    SELECT
+        ROW_COUNT, LAST_ALTERED
+    FROM
+        INFORMATION_SCHEMA.TABLES
+    WHERE
+        TABLE_SCHEMA = CURRENT_SCHEMA() AND TABLE_NAME = 'REVIEWS_WITH_SENTIMENT'
+    """
+    return "-".join(str(part) for part in session.sql(query_probe).collect()[0])
+
+
+# Load the table once per version and precompute the filter bitmaps
+@st.cache_resource(max_entries=1)
+def get_cross_filter(version):
+    return CrossFilter(session.table('reviews_with_sentiment').to_pandas())
+
+
+# Serialize the table once per version; it is the same prompt prefix for every question
+@st.cache_resource(max_entries=1)
+def get_df_string(version):
+    return get_cross_filter(version).df.to_string(index=False)
+
+
+table_version = get_table_version()
+cross_filter = get_cross_filter(table_version)
+df = cross_filter.df
 
 # App title and sidebar filters
 st.title("Product Intelligence Dashboard")
-products = df['PRODUCT'].unique()
+products = cross_filter.values['PRODUCT']
 selected_products = st.sidebar.multiselect("Select Products:", options=products, default=products)
-filtered_df = df[df['PRODUCT'].isin(selected_products)]
+regions = cross_filter.values['REGION']
+selected_regions = st.sidebar.multiselect("Select Regions:", options=regions, default=regions)
+statuses = cross_filter.values['STATUS']
+selected_statuses = st.sidebar.multiselect("Select Delivery Status:", options=statuses, default=statuses)
+filters = {'PRODUCT': selected_products, 'REGION': selected_regions, 'STATUS': selected_statuses}
 
 # Data preview
 st.subheader("Data Preview")
-st.dataframe(filtered_df.head())
+st.dataframe(cross_filter.head(filters))
 
 # Visualization: Average Sentiment by Region
 st.subheader("Average Sentiment by Region")
-region_sentiment = filtered_df.groupby("REGION")['SENTIMENT_SCORE'].mean().sort_values()
+region_sentiment = cross_filter.groupby(filters, "REGION", 'SENTIMENT_SCORE', "mean").sort_values()
 fig, ax = plt.subplots()
 region_sentiment.plot(kind="barh", ax=ax, title="Average Sentiment by Region")
 ax.set_xlabel("Sentiment Score")
@@ -28,13 +63,18 @@ st.pyplot(fig)
 
 # Highlight Delivery Issues
 st.subheader("Delivery Issues by Region and Product")
-grouped_issues = filtered_df.groupby(['REGION', 'PRODUCT'])[['STATUS', 'SENTIMENT_SCORE']].first().reset_index()
+grouped_issues = cross_filter.groupby(filters, ['REGION', 'PRODUCT'], ['STATUS', 'SENTIMENT_SCORE'], "first").reset_index()
 st.dataframe(grouped_issues)
+st.sidebar.caption("Filter cache: {hits} hits, {misses} misses".format(**cross_filter.cache_info()))
 
 # Chatbot assistant
 st.subheader("Ask Questions About Your Data")
 user_question = st.text_input("Enter your question here:")
-df_string = df.to_string(index=False)
 if user_question:
-    response = complete(model="claude-3-5-sonnet", prompt=f"Answer this question using the dataset: {user_question} <context>{df_string}</context>", session=session)
-    st.write(response)
\ No newline at end of file
+    # Imported on first question so the dashboard renders without loading Cortex
+    from snowflake.cortex import complete
+
+    # Context first and the question last, so every prompt starts with the same prefix
+    df_string = get_df_string(table_version)
+    response = complete(model="claude-3-5-sonnet", prompt=f"<context>{df_string}</context> Answer this question using the dataset: {user_question}", session=session)
+    st.write(response)
@@ -0,0 +1,117 @@
+# import packages
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+FILTER_COLUMNS = ("PRODUCT", "REGION", "STATUS")
+# Filter value that stands for null cells, so those rows can still be selected
+MISSING_VALUE = "(missing)"
+
+
+class CrossFilter:
+    """Serves filtered views and group-bys of a DataFrame from precomputed bitmaps.
+
+    Every value of each filter column gets a packed bitmap (one bit per row).
+    A filter selection ORs the bitmaps of the selected values within a column
+    and ANDs the columns together, so a multiselect change never rescans the
+    frame. Masks and group-by results are memoized per filter combination in
+    an LRU cache. Null cells get their own value, MISSING_VALUE.
+    """
+
+    def __init__(self, df, columns=FILTER_COLUMNS, cache_size=64):
+        self.df = df.reset_index(drop=True)
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+        # The engine is shared by every session through st.cache_resource
+        self._lock = threading.Lock()
+
+        self.bitmaps = {}
+        self.values = {}
+        for column in columns:
+            codes, uniques = pd.factorize(self.df[column])
+            values = list(uniques)
+            # factorize gives nulls the code -1; give them a value of their own
+            if (codes == -1).any():
+                codes = np.where(codes == -1, len(values), codes)
+                values.append(MISSING_VALUE)
+            self.values[column] = values
+            self.bitmaps[column] = {
+                value: np.packbits(codes == i) for i, value in enumerate(values)
+            }
+        self._all_rows = np.packbits(np.ones(len(self.df), dtype=bool))
+
+    def __len__(self):
+        return len(self.df)
+
+    # Helper function to turn a selection into a hashable cache key
+    @staticmethod
+    def _filter_key(filters):
+        return tuple(sorted((column, frozenset(selected)) for column, selected in filters.items()))
+
+    def _memoize(self, key, compute):
+        with self._lock:
+            if key in self._cache:
+                self.hits += 1
+                self._cache.move_to_end(key)
+                return self._cache[key]
+            self.misses += 1
+        result = compute()
+        with self._lock:
+            self._cache[key] = result
+            self._cache.move_to_end(key)
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return result
+
+    def mask(self, filters):
+        """Returns the packed bitmap of rows matching filters ({column: selected values})."""
+        def compute():
+            mask = self._all_rows
+            for column, selected in filters.items():
+                column_mask = np.zeros_like(self._all_rows)
+                for value in selected:
+                    if value in self.bitmaps[column]:
+                        column_mask = column_mask | self.bitmaps[column][value]
+                mask = mask & column_mask
+            return mask
+        return self._memoize(("mask", self._filter_key(filters)), compute)
+
+    def rows(self, filters):
+        """Returns the positions of rows matching filters."""
+        return np.flatnonzero(np.unpackbits(self.mask(filters), count=len(self.df)))
+
+    def filter(self, filters):
+        """Returns the rows matching filters as a DataFrame."""
+        return self.df.iloc[self.rows(filters)]
+
+    def head(self, filters, n=5):
+        """Returns the first n rows matching filters, without unpacking the whole mask or copying the other rows."""
+        mask = self.mask(filters)
+        # Every nonzero byte holds at least one matching row, so the first n of them are enough
+        byte_positions = np.flatnonzero(mask)[:n]
+        bits = np.unpackbits(mask[byte_positions]).reshape(-1, 8).astype(bool)
+        positions = (byte_positions[:, None] * 8 + np.arange(8))[bits][:n]
+        return self.df.iloc[positions]
+
+    def count(self, filters):
+        return int(np.unpackbits(self.mask(filters), count=len(self.df)).sum())
+
+    def groupby(self, filters, by, columns, how):
+        """Returns df[filters].groupby(by)[columns].agg(how), memoized per filter combination."""
+        by = tuple(by) if isinstance(by, (list, tuple)) else by
+        columns = list(columns) if isinstance(columns, (list, tuple)) else columns
+        key = ("groupby", self._filter_key(filters), by, str(columns), how)
+
+        def compute():
+            frame = self.filter(filters)
+            # Null keys are grouped as MISSING_VALUE, so rows selected through that value stay in the result
+            keys = [frame[column].astype(object).fillna(MISSING_VALUE) for column in (by if isinstance(by, tuple) else [by])]
+            grouped = frame.groupby(keys if isinstance(by, tuple) else keys[0], dropna=False)[columns]
+            return grouped.agg(how)
+        return self._memoize(key, compute)
+
+    def cache_info(self):
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._cache), "max_size": self.cache_size}
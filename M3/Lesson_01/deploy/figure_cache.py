@@ -0,0 +1,126 @@
+# import packages
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+
+from matplotlib.figure import Figure
+
+FIGURE_CACHE_DIR = os.getenv("FIGURE_CACHE_DIR")
+
+
+class FigureCache:
+    """Rendered chart images keyed by (chart kind, filter, dataset version), shared by every session.
+
+    `image(kind, params, version, draw)` returns PNG bytes, calling
+    `draw(ax)` and encoding the figure only on a miss, so a chart whose inputs
+    have not changed is served without touching Matplotlib again. Images are
+    kept in memory up to `max_bytes`, evicting the least recently used, and
+    when `directory` is set they are also written there, so a restarted
+    process or another worker on the host reuses them. Files beyond
+    `max_disk_bytes` are removed oldest first.
+    """
+
+    def __init__(self, max_bytes=32 * 1024 * 1024, directory=FIGURE_CACHE_DIR, max_disk_bytes=256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self._images = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.renders = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(kind, params, version):
+        return hashlib.sha1(repr((kind, params, str(version))).encode("utf-8")).hexdigest()
+
+    def _disk_path(self, key):
+        return os.path.join(self.directory, f"{key}.png")
+
+    def _remember(self, key, png):
+        with self._lock:
+            if key in self._images:
+                self._images.move_to_end(key)
+                return
+            self._images[key] = png
+            self._size += len(png)
+            while self._size > self.max_bytes and len(self._images) > 1:
+                _, old = self._images.popitem(last=False)
+                self._size -= len(old)
+
+    def get(self, key):
+        """Returns cached PNG bytes from memory, then disk, or None."""
+        with self._lock:
+            png = self._images.get(key)
+            if png is not None:
+                self._images.move_to_end(key)
+                self.hits += 1
+                return png
+        if self.directory:
+            try:
+                with open(self._disk_path(key), "rb") as f:
+                    png = f.read()
+            except OSError:
+                return None
+            self.disk_hits += 1
+            self._remember(key, png)
+            return png
+        return None
+
+    def put(self, key, png):
+        self._remember(key, png)
+        if self.directory:
+            # Write to a temp file and rename, so other processes never read a partial image
+            temp_path = f"{self._disk_path(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_path, "wb") as f:
+                f.write(png)
+            os.replace(temp_path, self._disk_path(key))
+            self._prune_disk()
+
+    def _prune_disk(self):
+        try:
+            files = [(e.stat().st_mtime, e.stat().st_size, e.path)
+                     for e in os.scandir(self.directory) if e.name.endswith(".png")]
+        except OSError:
+            return
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+    def image(self, kind, params, version, draw, figsize=(8, 5), dpi=150):
+        """Returns the PNG bytes of a chart, rendering it with draw(ax) only on a miss."""
+        key = self.key(kind, (params, figsize, dpi), version)
+        png = self.get(key)
+        if png is not None:
+            return png
+        # A standalone Figure instead of pyplot: pyplot's global state is not safe across sessions
+        fig = Figure(figsize=figsize)
+        draw(fig.subplots())
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format="png", dpi=dpi, bbox_inches="tight")
+        png = buffer.getvalue()
+        with self._lock:
+            self.renders += 1
+        self.put(key, png)
+        return png
+
+    def stats(self):
+        with self._lock:
+            return {
+                "images": len(self._images),
+                "bytes": self._size,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "renders": self.renders,
+            }
@@ -1,10 +1,28 @@
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
+import numpy as np
+
+from figure_cache import FigureCache
+from paged_table import paged_dataframe
+from query_planner import QuerySpecError, answer_with_planner
+from semantic_cache import SemanticCache, cortex_embedding, dataset_version
 
 # This does not work outside Snowflake, so you have to use SQL instead.
 # from snowflake.cortex import complete
 
+
+# One answer cache per process, shared by every session
+@st.cache_resource
+def get_answer_cache():
+    return SemanticCache(ttl=3600, max_entries=500)
+
+
+# Rendered charts, shared by every session in the process
+@st.cache_resource
+def get_figure_cache():
+    return FigureCache()
+
+
 # Initialize the Streamlit app
 st.title("Avalanche Streamlit App")
 
@@ -16,8 +34,32 @@ SELECT
 FROM
     REVIEWS_WITH_SENTIMENT
 """
-df_reviews = session.sql(query).to_pandas()
-df_string = df_reviews.to_string(index=False)
+
+
+# Table metadata only, checked at most once a minute, so changes are noticed without scanning the table
+@st.cache_data(ttl=60)
+def get_table_version():
+    query_probe = """
+    SELECT
+        ROW_COUNT, LAST_ALTERED
+    FROM
+        INFORMATION_SCHEMA.TABLES
+    WHERE
+        TABLE_SCHEMA = CURRENT_SCHEMA() AND TABLE_NAME = 'REVIEWS_WITH_SENTIMENT'
+    """
+    return "-".join(str(part) for part in session.sql(query_probe).collect()[0])
+
+
+# Load the table once per table version; its content hash is computed once per load, not on every rerun
+@st.cache_data(max_entries=1)
+def load_reviews(table_version):
+    df = session.sql(query).to_pandas()
+    return df, dataset_version(df)
+
+
+df_reviews, data_version = load_reviews(get_table_version())
+# Charts are cached per dataset version (data_version), so they are only redrawn when the data changes
+native_charts = st.toggle("Interactive charts", help="Draw charts in the browser instead of serving cached images")
 
 # Convert date columns to datetime
 df_reviews['REVIEW_DATE'] = pd.to_datetime(df_reviews['REVIEW_DATE'])
@@ -27,11 +69,16 @@ df_reviews['SHIPPING_DATE'] = pd.to_datetime(df_reviews['SHIPPING_DATE'])
 st.subheader("Average Sentiment by Product")
 product_sentiment = df_reviews.groupby("PRODUCT")["SENTIMENT_SCORE"].mean().sort_values()
 
-fig, ax = plt.subplots()
-product_sentiment.plot(kind="barh", ax=ax, title="Average Sentiment by Product")
-ax.set_xlabel("Sentiment Score")
-plt.tight_layout()
-st.pyplot(fig)
+if native_charts:
+    st.bar_chart(product_sentiment, horizontal=True, x_label="Sentiment Score", y_label="Product")
+else:
+    # Only called on a cache miss
+    def draw_product_sentiment(ax):
+        product_sentiment.plot(kind="barh", ax=ax, title="Average Sentiment by Product")
+        ax.set_xlabel("Sentiment Score")
+
+    png = get_figure_cache().image("sentiment_by_product", None, data_version, draw_product_sentiment, figsize=(6.4, 4.8))
+    st.image(png, width="stretch")
 
 # Product filter on the main page
 st.subheader("Filter by Product")
@@ -46,24 +93,77 @@ else:
 
 # Display the filtered data as a table
 st.subheader(f"📁 Reviews for {product}")
-st.dataframe(filtered_data)
+paged_dataframe(filtered_data, key="reviews")
 
 # Visualization: Sentiment Distribution for Selected Products
 st.subheader(f"Sentiment Distribution for {product}")
-fig, ax = plt.subplots()
-filtered_data['SENTIMENT_SCORE'].hist(ax=ax, bins=20)
-ax.set_title("Distribution of Sentiment Scores")
-ax.set_xlabel("Sentiment Score")
-ax.set_ylabel("Frequency")
-st.pyplot(fig)
+if native_charts:
+    counts, edges = np.histogram(filtered_data['SENTIMENT_SCORE'].dropna(), bins=20)
+    bins = pd.Series(counts, index=[f"{left:.2f}" for left in edges[:-1]])
+    st.bar_chart(bins, x_label="Sentiment Score", y_label="Frequency")
+else:
+    # Only called on a cache miss
+    def draw_sentiment_histogram(ax):
+        # ax.hist rather than Series.hist, which expects a pyplot figure
+        ax.hist(filtered_data['SENTIMENT_SCORE'].dropna(), bins=20)
+        ax.grid(True)
+        ax.set_title("Distribution of Sentiment Scores")
+        ax.set_xlabel("Sentiment Score")
+        ax.set_ylabel("Frequency")
+
+    png = get_figure_cache().image("sentiment_histogram", product, data_version, draw_sentiment_histogram, figsize=(6.4, 4.8))
+    st.image(png, width="stretch")
 
 # Chatbot for Q&A
 st.subheader("Ask Questions About Your Data")
 user_question = st.text_input("Enter your question here:")
+exact_answers = st.toggle("Answer with exact queries on the data", value=True,
+                          help="The model writes a small query that runs on the table here; only its result is sent back")
 
 if user_question:
-    # The cortex complete does not work outside Snowflake
-    # response = complete(model="claude-3-5-sonnet", prompt=f"Answer this question using the dataset: {user_question} <context>{df_string}</context>", session=session)
-    # Use SQL instead:
-    response = session.sql(f"SELECT SNOWFLAKE.CORTEX.COMPLETE('claude-3-5-sonnet', '{user_question}');").collect()[0][0]
-    st.write(response)
\ No newline at end of file
+    # The cortex complete does not work outside Snowflake. A prompt with the table would put the context first,
+    # so every question starts with the same prefix that the provider can cache:
+    # response = complete(model="claude-3-5-sonnet", prompt=f"<context>{df_reviews.to_string(index=False)}</context> Answer this question using the dataset: {user_question}", session=session)
+    # Use SQL instead, and reuse the answer to a similar earlier question when there is one
+    model = "claude-3-5-sonnet"
+    plan = {}
+
+    # Helper function to call Cortex through SQL
+    def cortex_complete(prompt):
+        return session.sql("SELECT SNOWFLAKE.CORTEX.COMPLETE(?, ?)", params=[model, prompt]).collect()[0][0]
+
+    # Plan an exact query on the table when the question allows it. Its answer is cached by the validated
+    # query and the question, so questions that only read alike (another product or region) never share numbers.
+    response, cache_hit = None, None
+    if exact_answers:
+        try:
+            response, plan = answer_with_planner(
+                user_question, df_reviews, cortex_complete,
+                answer_cache=lambda key, compute: get_answer_cache().answer_exact(
+                    key, scope=(data_version, model, "query"), compute=compute
+                ),
+            )
+            cache_hit = plan["cache_hit"]
+        except QuerySpecError:
+            pass
+    # Otherwise ask Cortex directly, reusing the answer to a similar earlier question
+    if response is None:
+        response, cache_hit = get_answer_cache().answer(
+            user_question,
+            scope=(data_version, model),
+            embed=lambda question: cortex_embedding(session, question),
+            compute=lambda: cortex_complete(user_question),
+        )
+    st.write(response)
+    if plan:
+        with st.expander(f"Computed from {plan['matched_rows']:,} matching row{'s' if plan['matched_rows'] != 1 else ''}"):
+            st.json(plan["spec"])
+            st.dataframe(plan["result"], hide_index=True)
+    stats = get_answer_cache().stats()
+    if cache_hit and plan:
+        cached_note = "Cached answer to the same question. "
+    elif cache_hit:
+        cached_note = f"Cached answer to \"{cache_hit['question']}\" (similarity {cache_hit['similarity']:.2f}). "
+    else:
+        cached_note = ""
+    st.caption(cached_note + f"Answer cache hit rate: {stats['hit_rate']:.0%} of {stats['lookups']} questions")
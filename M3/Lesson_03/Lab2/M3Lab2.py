@@ -1,11 +1,39 @@
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
 import json
-from snowflake.core import Root
+import time
+from matplotlib.colors import to_hex
 from snowflake.snowpark.context import get_active_session
 
+from background_refresh import BackgroundRefresher
+from figure_cache import FigureCache
+from paged_table import paged_dataframe
+from shared_dataset import SharedDatasetStore, to_frame
+
 session = st.connection("snowflake").session()
+REFRESH_SECONDS = 300
+
+
+# Rendered charts, shared by every session in the process
+@st.cache_resource
+def get_figure_cache():
+    return FigureCache()
+
+
+# Show a horizontal bar chart as a cached image, or as a native chart drawn by the browser
+def show_barh(series, kind, params, version, color, xlabel, ylabel, native=False):
+    if native:
+        st.bar_chart(series, horizontal=True, color=to_hex(color), x_label=ylabel, y_label=xlabel)
+        return
+
+    # Only called on a cache miss
+    def draw(ax):
+        series.plot(kind="barh", color=color, ax=ax)
+        ax.set_xlabel(xlabel)
+        ax.set_ylabel(ylabel)
+
+    st.image(get_figure_cache().image(kind, params, version, draw), width="stretch")
+
 
 # Create tabs
 tab1, tab2 = st.tabs(["Data & Plots", "RAG App"])
@@ -15,8 +43,7 @@ with tab1:
     st.title("Customer Sentiment and Delivery Analysis")
 
     # Data loading functions
-    @st.cache_data
-    def load_data():
+    def query_data():
         query_reviews = """
         SELECT
             *
@@ -25,18 +52,54 @@ with tab1:
         """
         return session.sql(query_reviews).to_pandas()
 
+    # The first server process to see a table version pulls it and publishes an Arrow
+    # snapshot; the other processes on the host memory-map that snapshot instead of querying
+    def load_data(signature):
+        version = "-".join(str(part) for part in signature)
+        return to_frame(SharedDatasetStore().get_or_publish("reviews_with_sentiment", version, query_data))
+
+    # Table metadata only, so checking for changes does not scan the table
+    def probe_data():
+        query_probe = """
+        SELECT
+            ROW_COUNT, LAST_ALTERED
+        FROM
+            INFORMATION_SCHEMA.TABLES
+        WHERE
+            TABLE_SCHEMA = CURRENT_SCHEMA() AND TABLE_NAME = 'REVIEWS_WITH_SENTIMENT'
+        """
+        return tuple(session.sql(query_probe).collect()[0])
+
+    # One refresher per process; it reloads in the background when the table changes
+    @st.cache_resource
+    def get_refresher():
+        return BackgroundRefresher(load_data, probe_data, interval=REFRESH_SECONDS).start()
+
     # Load data
-    df = load_data()
+    refresher = get_refresher()
+    try:
+        df, data_version = refresher.get_with_signature(timeout=120)
+    except TimeoutError as e:
+        st.error(f"Could not load REVIEWS_WITH_SENTIMENT: {e}")
+        st.stop()
+
+    refresh_status = refresher.status()
+    col1, col2 = st.columns([3, 1])
+    col1.caption(
+        f"Data loaded at {time.strftime('%H:%M:%S', time.localtime(refresh_status['loaded_at']))}, "
+        f"checked for changes every {REFRESH_SECONDS // 60} min"
+        + (f" (last check failed: {refresh_status['last_error']})" if refresh_status["last_error"] else "")
+    )
+    if col2.button("Check now"):
+        refresher.request_refresh()
+        st.toast("Checking for new data in the background; it will show on your next interaction.")
+    native_charts = col2.toggle("Interactive charts", help="Draw charts in the browser instead of serving cached images")
 
     # Average sentiment by product
     st.header("Average Sentiment by Product")
     avg_sentiment_product = df.groupby("PRODUCT")["SENTIMENT_SCORE"].mean().sort_values()
-
-    fig1, ax1 = plt.subplots(figsize=(8,5))
-    avg_sentiment_product.plot(kind="barh", color="skyblue", ax=ax1)
-    ax1.set_xlabel("Sentiment Score")
-    ax1.set_ylabel("Product")
-    st.pyplot(fig1)
+    show_barh(avg_sentiment_product, "sentiment_by_product", None, data_version,
+              "skyblue", "Sentiment Score", "Product", native_charts)
 
     # Filter by product selection
     product = st.selectbox("Choose a product", ["All Products"] + list(df["PRODUCT"].unique()))
@@ -48,17 +111,13 @@ with tab1:
 
     # Display combined dataset
     st.subheader(f"📁 Reviews for {product}")
-    st.dataframe(filtered_data)
+    paged_dataframe(filtered_data, key="reviews")
 
     # Average sentiment by delivery status
     st.header(f"Average Sentiment by Delivery Status for {product}")
     avg_sentiment_status = filtered_data.groupby("STATUS")["SENTIMENT_SCORE"].mean().sort_values()
-
-    fig2, ax2 = plt.subplots(figsize=(8,5))
-    avg_sentiment_status.plot(kind="barh", color="slateblue", ax=ax2)
-    ax2.set_xlabel("Sentiment Score")
-    ax2.set_ylabel("Delivery Status")
-    st.pyplot(fig2)
+    show_barh(avg_sentiment_status, "sentiment_by_status", product, data_version,
+              "slateblue", "Sentiment Score", "Delivery Status", native_charts)
 
 # Tab 2: RAG App
 with tab2:
@@ -71,6 +130,9 @@ with tab2:
 
     if prompt:
         if st.button("Run Query"):
+            # Imported here so the Data & Plots tab does not pay for snowflake.core
+            from snowflake.core import Root
+
             root = Root(session)
 
             # Query service
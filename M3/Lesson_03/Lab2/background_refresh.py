@@ -0,0 +1,88 @@
+# import packages
+import threading
+import time
+
+
+class BackgroundRefresher:
+    """Keeps a snapshot of a table fresh from a worker thread (stale-while-revalidate).
+
+    `probe()` returns a cheap signature of the table, such as its row count
+    and last change time, and `load(signature)` returns the full data. Every
+    `interval` seconds the worker runs the probe and reloads only when the
+    signature changed. Readers always get the last complete snapshot; a new one replaces
+    it in a single assignment, so nobody sees a half-loaded table or waits on
+    a reload. Only the very first load, before any snapshot exists, blocks.
+    """
+
+    def __init__(self, load, probe, interval=300):
+        self.load = load
+        self.probe = probe
+        self.interval = interval
+        self.loaded_at = None
+        self.checked_at = None
+        self.last_error = None
+        self.reloads = 0
+        self.skipped = 0
+        # (data, signature), replaced in one assignment so both always match
+        self._current = (None, None)
+        self._ready = threading.Event()
+        self._wake = threading.Event()
+        self._refresh_lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        """Starts the worker thread; the first load runs on it right away."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="background-refresh", daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        while True:
+            self.refresh()
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def refresh(self, force=False):
+        """Reloads if the probe signature changed (or force). Returns True when the snapshot was replaced."""
+        with self._refresh_lock:
+            try:
+                signature = self.probe()
+                self.checked_at = time.time()
+                if not force and self._current[0] is not None and signature == self._current[1]:
+                    self.skipped += 1
+                    return False
+                data = self.load(signature)
+            except Exception as e:
+                # Keep serving the previous snapshot and try again on the next tick
+                self.last_error = f"{type(e).__name__}: {e}"
+                return False
+            self._current = (data, signature)
+            self.loaded_at = time.time()
+            self.last_error = None
+            self.reloads += 1
+            self._ready.set()
+            return True
+
+    def request_refresh(self):
+        """Asks the worker to check for changes now, without waiting for it."""
+        self._wake.set()
+
+    def get(self, timeout=None):
+        """Returns the current snapshot, waiting only if none has been loaded yet."""
+        return self.get_with_signature(timeout)[0]
+
+    def get_with_signature(self, timeout=None):
+        """Returns (snapshot, probe signature it was loaded for); the signature works as a version."""
+        if not self._ready.wait(timeout):
+            raise TimeoutError(self.last_error or "No data loaded yet")
+        return self._current
+
+    def status(self):
+        return {
+            "loaded_at": self.loaded_at,
+            "checked_at": self.checked_at,
+            "reloads": self.reloads,
+            "skipped": self.skipped,
+            "last_error": self.last_error,
+        }
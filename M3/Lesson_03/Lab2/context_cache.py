@@ -0,0 +1,101 @@
+# import packages
+import datetime
+import os
+import threading
+import time
+
+GEMINI_MODEL = "gemini-2.5-flash"
+# Renew a context cache this many seconds before it expires
+RENEW_MARGIN = 60
+
+
+# Helper function to import and configure the Gemini SDK (only needed when a Gemini model is used)
+def load_gemini():
+    """Returns google.generativeai configured for the real API or the local stub server."""
+    import google.generativeai as genai
+
+    stub_url = os.getenv("LLM_STUB_URL", "").rstrip("/")
+    if stub_url:
+        genai.configure(api_key=os.getenv("GEMINI_API_KEY") or "stub-key", transport="rest",
+                        client_options={"api_endpoint": stub_url})
+    else:
+        genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+    return genai
+
+
+class GeminiContextCache:
+    """One explicit Gemini context cache per (model, dataset version).
+
+    The stable prompt prefix (instructions and the serialized table) is
+    uploaded once as a CachedContent with a TTL, and each question only sends
+    the variable suffix, so the prefix is not re-tokenized or billed at the
+    full input rate on every turn. A new dataset version gets a new cache and
+    the previous one is deleted. If the cache cannot be created (for example
+    the prefix is below the model's minimum cacheable size) the model falls
+    back to sending the prefix as a system instruction.
+    """
+
+    def __init__(self, ttl=3600):
+        self.ttl = ttl
+        self._genai = None
+        self._caches = {}
+        self._lock = threading.Lock()
+        self.counters = {"created": 0, "reused": 0, "fallbacks": 0, "cached_tokens": 0}
+
+    def _load(self):
+        if self._genai is None:
+            self._genai = load_gemini()
+        return self._genai
+
+    # Helper function to delete a cache we no longer need; it would expire on its own anyway
+    @staticmethod
+    def _delete(entry):
+        if entry["cache"] is not None:
+            try:
+                entry["cache"].delete()
+            except Exception:
+                pass
+
+    def get_model(self, model_name, version, prefix):
+        """Returns a GenerativeModel whose requests reuse the cached prefix for this version."""
+        key = (model_name, version)
+        with self._lock:
+            entry = self._caches.get(key)
+            if entry is not None and entry["expires"] - time.time() > RENEW_MARGIN:
+                self.counters["reused"] += 1
+                return entry["model"]
+
+            # Drop caches of older dataset versions for this model
+            for old_key in [k for k in self._caches if k[0] == model_name and k != key]:
+                self._delete(self._caches.pop(old_key))
+            if entry is not None:
+                self._delete(entry)
+
+            genai = self._load()
+            try:
+                cache = genai.caching.CachedContent.create(
+                    model=f"models/{model_name}",
+                    display_name=f"context-{version}"[:128],
+                    contents=[{"role": "user", "parts": [prefix]}],
+                    ttl=datetime.timedelta(seconds=self.ttl),
+                )
+                model = genai.GenerativeModel.from_cached_content(cache)
+                self.counters["created"] += 1
+            except Exception:
+                cache = None
+                model = genai.GenerativeModel(model_name, system_instruction=prefix)
+                self.counters["fallbacks"] += 1
+            self._caches[key] = {"cache": cache, "model": model, "expires": time.time() + self.ttl}
+            return model
+
+    def generate(self, model_name, version, prefix, suffix):
+        """Answers suffix (the question part of the prompt) on top of the cached prefix."""
+        response = self.get_model(model_name, version, prefix).generate_content(suffix)
+        usage = getattr(response, "usage_metadata", None)
+        with self._lock:
+            self.counters["cached_tokens"] += getattr(usage, "cached_content_token_count", 0) or 0
+        return response.text
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters, caches=len(self._caches))
@@ -1,11 +1,24 @@
+import json
+import os
+import urllib.request
 import streamlit as st
 import pandas as pd
 from snowflake.snowpark.context import get_active_session
 
+from context_cache import GEMINI_MODEL, GeminiContextCache, load_gemini
+from query_planner import QuerySpecError, answer_with_planner, describe_schema
+from semantic_cache import EMBEDDER_THRESHOLDS, SemanticCache, cortex_embedding, dataset_version, hashed_embedding
+from transcript_store import TranscriptStore
+
 # --- Constants and Configuration ---
 MODELS = ['claude-3-5-sonnet', 'mistral-large', 'gemma-7b', 'llama3-8b']
+# Gemini keeps the table in an explicit context cache; offered when an API key is set
+if os.getenv("GEMINI_API_KEY"):
+    MODELS.append(GEMINI_MODEL)
 CONTEXT_TABLE = "AVALANCHE_DB.AVALANCHE_SCHEMA.COMBINED_REVIEWS_SHIPPING"
 DEFAULT_HISTORY_LENGTH = 5
+# Messages drawn per rerun; "Load earlier messages" shows this many more each time
+VISIBLE_MESSAGES = 20
 
 # --- Data Loading (Cached) ---
 @st.cache_data
@@ -17,22 +30,58 @@ def load_context_dataframe(table_name: str) -> pd.DataFrame:
         st.error(f"Error loading data from {table_name}: {e}")
         return pd.DataFrame()
 
+@st.cache_data
+def get_context_version(table_name: str) -> str:
+    """Returns a content version of the context table, used to scope cached answers."""
+    return dataset_version(load_context_dataframe(table_name))
+
+@st.cache_data
+def get_schema_description(table_name: str) -> str:
+    """Describes the context table's columns for the query planner, once per table version."""
+    return describe_schema(load_context_dataframe(table_name))
+
+# --- Answer Cache (shared by all sessions) ---
+@st.cache_resource
+def get_answer_cache() -> SemanticCache:
+    """Creates the semantic answer cache once per process, with the threshold of the embedder in use."""
+    return SemanticCache(threshold=EMBEDDER_THRESHOLDS[get_embedder_name()], ttl=3600, max_entries=500)
+
+@st.cache_resource
+def get_context_cache() -> GeminiContextCache:
+    """Creates the Gemini context cache registry once per process."""
+    return GeminiContextCache(ttl=3600)
+
+# --- Transcript Store (shared by all sessions) ---
+@st.cache_resource
+def get_transcript_store() -> TranscriptStore:
+    """Opens the SQLite transcript store once per process."""
+    return TranscriptStore(tail_size=50, idle_seconds=1800)
+
 # --- Session State Initialization ---
 def initialize_session_state():
     """Initializes required session state variables if they don't exist."""
-    if "messages" not in st.session_state:
-        st.session_state.messages = []
+    # Only the conversation id lives in the session; messages are in the transcript store.
+    # The id is kept in the URL, so reloading the page resumes the conversation
+    if "chat_id" not in st.session_state:
+        st.session_state.chat_id = st.query_params.get("chat") or TranscriptStore.new_chat_id()
+    st.query_params["chat"] = st.session_state.chat_id
+    if "visible_messages" not in st.session_state:
+        st.session_state.visible_messages = VISIBLE_MESSAGES
     if "model_name" not in st.session_state:
         st.session_state.model_name = MODELS[0]
     if "use_chat_history" not in st.session_state:
         st.session_state.use_chat_history = True
     if "debug" not in st.session_state:
          st.session_state.debug = False
+    if "use_answer_cache" not in st.session_state:
+        st.session_state.use_answer_cache = True
+    if "use_query_planner" not in st.session_state:
+        st.session_state.use_query_planner = True
 
 # --- UI Setup ---
 def setup_sidebar():
     """Sets up the sidebar widgets."""
-    st.sidebar.button("Clear conversation", on_click=lambda: st.session_state.update({"messages": []}))
+    st.sidebar.button("Clear conversation", on_click=clear_conversation)
     st.sidebar.toggle("Debug", key="debug")
     st.sidebar.toggle("Use chat history", key="use_chat_history")
 
@@ -46,20 +95,41 @@ def setup_sidebar():
             value=DEFAULT_HISTORY_LENGTH,
             step=1,
         )
+        st.toggle(
+            "Answer data questions with exact queries",
+            key="use_query_planner",
+            help="The model writes a small query that runs on the table locally, instead of reading the whole table",
+        )
+
+    with st.sidebar.expander("Answer Cache"):
+        st.toggle("Reuse answers to similar questions", key="use_answer_cache")
+        if get_answer_cache().threshold is None:
+            st.caption("The local embedder cannot tell paraphrases from different questions, so only repeated questions are reused.")
+        stats = get_answer_cache().stats()
+        st.metric("Hit rate", f"{stats['hit_rate']:.0%}")
+        st.caption(f"{stats['hits']} hits, {stats['misses']} misses, {stats['entries']} cached answers")
 
     if st.session_state.debug:
         st.sidebar.expander("Session State").write(st.session_state)
+        st.sidebar.expander("Transcript Store").write(get_transcript_store().stats())
 
 
 # --- Helper Functions ---
+def clear_conversation():
+    """Deletes the current transcript and starts a new conversation."""
+    get_transcript_store().clear(st.session_state.chat_id)
+    st.session_state.chat_id = TranscriptStore.new_chat_id()
+    st.session_state.visible_messages = VISIBLE_MESSAGES
+
+
 def get_formatted_chat_history() -> str:
     """Retrieves and formats the recent chat history."""
     if not st.session_state.use_chat_history:
         return "Chat history is disabled."
 
     num_messages = st.session_state.num_chat_messages
-    messages = st.session_state.messages
-    relevant_messages = messages[max(0, len(messages) - num_messages) : -1]
+    # The last message is the question being answered
+    relevant_messages = get_transcript_store().recent(st.session_state.chat_id, num_messages)[:-1]
 
     if not relevant_messages:
         return "No prior chat history available or used."
@@ -67,18 +137,63 @@ def get_formatted_chat_history() -> str:
     return "\n".join([f"{msg['role']}: {msg['content']}" for msg in relevant_messages])
 
 
-def complete(model: str, prompt: str) -> str:
-    """Calls the Snowflake Cortex complete function using parameterized query."""
+def has_chat_history() -> bool:
+    """True when the prompt will include earlier messages."""
+    if not st.session_state.use_chat_history:
+        return False
+    return len(get_transcript_store().recent(st.session_state.chat_id, st.session_state.num_chat_messages)) > 1
+
+
+def get_embedder_name() -> str:
+    """The answer cache embeds locally when using the stub server, and with Cortex otherwise."""
+    return "hashed" if os.getenv("LLM_STUB_URL") else "cortex"
+
+
+def embed_question(question: str):
+    """Embeds a question for the answer cache."""
+    if get_embedder_name() == "hashed":
+        return hashed_embedding(question)
+    return cortex_embedding(session, question)
+
+
+def complete_with_stub(stub_url: str, model: str, prompt: str) -> str:
+    """Calls the local stub server's Cortex inference endpoint (used for load testing)."""
+    request = urllib.request.Request(
+        f"{stub_url.rstrip('/')}/api/v2/cortex/inference:complete",
+        data=json.dumps({"model": model, "messages": [{"content": prompt}]}).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+    )
+    with urllib.request.urlopen(request) as response:
+        return json.load(response)["choices"][0]["message"]["content"]
+
+
+def complete_prompt(model: str, prompt: str) -> str:
+    """Calls the model with a whole prompt, without a cached prefix. Errors are raised."""
+    if model == GEMINI_MODEL:
+        return load_gemini().GenerativeModel(model).generate_content(prompt).text
+    stub_url = os.getenv("LLM_STUB_URL")
+    if stub_url:
+        return complete_with_stub(stub_url, model, prompt)
+    result = session.sql(
+        "SELECT snowflake.cortex.complete(?, ?)",
+        params=[model, prompt]
+    ).collect()
+    return result[0][0] if result else ""
+
+
+def complete(model: str, prompt_prefix: str, prompt_suffix: str, context_version: str) -> str:
+    """Calls the model with the stable prompt prefix followed by the question suffix.
+
+    Gemini models get the prefix from an explicit context cache. Cortex gets one
+    parameterized prompt that starts with the same prefix on every turn, so
+    providers with automatic prefix caching can reuse it.
+    """
     try:
-        result = session.sql(
-            "SELECT snowflake.cortex.complete(?, ?)",
-            params=[model, prompt]
-        ).collect()
-        if not result:
-            return "Sorry, received no response from the model."
-        return result[0][0]
+        if model == GEMINI_MODEL:
+            return get_context_cache().generate(model, context_version, prompt_prefix, prompt_suffix)
+        return complete_prompt(model, f"{prompt_prefix}\n\n{prompt_suffix}") or "Sorry, received no response from the model."
     except Exception as e:
-        st.error(f"Error calling Cortex complete function: {e}")
+        st.error(f"Error calling {model}: {e}")
         return "Sorry, I encountered an error trying to generate a response."
 
 def format_dataframe_context(df: pd.DataFrame) -> str:
@@ -89,8 +204,10 @@ def format_dataframe_context(df: pd.DataFrame) -> str:
 
 
 # --- Prompt Generation ---
-def create_prompt(user_question: str, dataframe_context: str, chat_history: str) -> str:
-    """Creates the prompt for the LLM."""
+# The prompt is split into a prefix that only changes with the data (instructions and
+# table) and a suffix with the history and question, so the prefix can be cached
+def create_prompt_prefix(dataframe_context: str) -> str:
+    """Creates the stable start of the prompt."""
     prompt_template = f"""
 [INST]
 You are a helpful AI chat assistant. Answer the user's question based on the provided
@@ -100,13 +217,25 @@ Use the data in the <context> section to inform your answer about customer revie
 if the question relates to it. If the question is general and not answerable from the context
 or chat history, answer naturally. Do not explicitly mention "based on the context" unless necessary for clarity.
 
-<chat_history>
-{chat_history}
-</chat_history>
-
 <context>
 {dataframe_context}
 </context>
+"""
+    return prompt_template.strip()
+
+
+@st.cache_data
+def get_prompt_prefix(table_name: str) -> str:
+    """Serializes the context table into the prompt prefix once per table version."""
+    return create_prompt_prefix(format_dataframe_context(load_context_dataframe(table_name)))
+
+
+def create_prompt_suffix(user_question: str, chat_history: str) -> str:
+    """Creates the part of the prompt that changes with every question."""
+    prompt_template = f"""
+<chat_history>
+{chat_history}
+</chat_history>
 
 <question>
 {user_question}
@@ -118,7 +247,7 @@ Answer:
     prompt = prompt_template.strip()
 
     if st.session_state.debug:
-        st.sidebar.text_area("Generated Prompt", prompt, height=400)
+        st.sidebar.text_area("Generated Prompt (after the cached context prefix)", prompt, height=400)
     return prompt
 
 # --- Main Application Logic ---
@@ -132,14 +261,31 @@ def main():
     if context_df.empty and CONTEXT_TABLE:
         st.warning(f"Could not load data from {CONTEXT_TABLE} or it is empty. No DataFrame context will be used.")
 
+    # Read the input first, so a new turn goes back to showing only the latest messages
+    user_input = st.chat_input("Ask something (e.g., about customer reviews)...")
+    if user_input:
+        st.session_state.visible_messages = VISIBLE_MESSAGES
+
+    # Draw only the latest messages, so a rerun costs the same however long the conversation is
+    store = get_transcript_store()
+    store.evict_idle()
+    chat_id = st.session_state.chat_id
+    messages = store.recent(chat_id, st.session_state.visible_messages)
+    earlier = store.count(chat_id) - len(messages)
+    if earlier > 0:
+        st.button(
+            f"Load earlier messages ({earlier} more)",
+            on_click=lambda: st.session_state.update(visible_messages=st.session_state.visible_messages + VISIBLE_MESSAGES),
+        )
+
     icons = {"assistant": "❄️", "user": "👤"}
-    for message in st.session_state.messages:
+    for message in messages:
         avatar = icons.get(message["role"])
         with st.chat_message(message["role"], avatar=avatar):
             st.markdown(message["content"])
 
-    if user_input := st.chat_input("Ask something (e.g., about customer reviews)..."):
-        st.session_state.messages.append({"role": "user", "content": user_input})
+    if user_input:
+        store.append(chat_id, "user", user_input)
 
         with st.chat_message("user", avatar=icons["user"]):
             st.markdown(user_input)
@@ -147,14 +293,70 @@ def main():
         with st.chat_message("assistant", avatar=icons["assistant"]):
             message_placeholder = st.empty()
             with st.spinner("Thinking..."):
-                dataframe_context_str = format_dataframe_context(context_df)
-                chat_history_str = get_formatted_chat_history()
-                full_prompt = create_prompt(user_input, dataframe_context_str, chat_history_str)
                 model_to_use = st.session_state.model_name
-                generated_response = complete(model_to_use, full_prompt)
+
+                use_planner = st.session_state.use_query_planner and not context_df.empty
+                use_cache = st.session_state.use_answer_cache
+                version = get_context_version(CONTEXT_TABLE)
+                plan = {}
+                cache_hit = None
+                generated_response = None
+
+                if use_planner:
+                    # Plan an exact query on the table; only its small result is sent back to the model
+                    question = user_input
+                    if has_chat_history():
+                        question = f"Earlier messages:\n{get_formatted_chat_history()}\n\nCurrent question: {user_input}"
+
+                    # Exact answers are cached by their validated query and question, never by how similar the
+                    # question reads; like other answers, only prompts without chat history use the cache
+                    def cached_by_query(key, compute):
+                        return get_answer_cache().answer_exact(key, scope=(version, model_to_use, "query"), compute=compute)
+
+                    try:
+                        generated_response, details = answer_with_planner(
+                            question, context_df, lambda prompt: complete_prompt(model_to_use, prompt),
+                            schema=get_schema_description(CONTEXT_TABLE),
+                            answer_cache=cached_by_query if use_cache and not has_chat_history() else None,
+                        )
+                        plan.update(details)
+                        cache_hit = details["cache_hit"]
+                    except QuerySpecError as e:
+                        # Not a single-query question; answer from the whole table instead
+                        plan["fallback"] = str(e)
+                    except Exception as e:
+                        st.error(f"Error calling {model_to_use}: {e}")
+                        generated_response = "Sorry, I encountered an error trying to generate a response."
+
+                # The prompt is only built when the model is actually called
+                def generate_response() -> str:
+                    prompt_suffix = create_prompt_suffix(user_input, get_formatted_chat_history())
+                    return complete(model_to_use, get_prompt_prefix(CONTEXT_TABLE), prompt_suffix, version)
+
+                if generated_response is None:
+                    # Answers depend on the chat history, so only history-free prompts use the cache
+                    if use_cache and not has_chat_history():
+                        generated_response, cache_hit = get_answer_cache().answer(
+                            user_input,
+                            scope=(version, model_to_use),
+                            embed=embed_question,
+                            compute=generate_response,
+                            should_cache=lambda response: not response.startswith("Sorry,"),
+                        )
+                    else:
+                        generated_response = generate_response()
                 message_placeholder.markdown(generated_response)
+            if "result" in plan:
+                label = f"Exact answer from {plan['matched_rows']:,} matching row{'s' if plan['matched_rows'] != 1 else ''}"
+                with st.expander(label + (" (cached answer to the same question)" if cache_hit else "")):
+                    st.json(plan["spec"])
+                    st.dataframe(plan["result"], hide_index=True)
+            elif cache_hit:
+                st.caption(f"Cached answer to a similar question: \"{cache_hit['question']}\" (similarity {cache_hit['similarity']:.2f})")
+            if "fallback" in plan:
+                st.caption(f"Answered from the whole table ({plan['fallback']}).")
 
-        st.session_state.messages.append({"role": "assistant", "content": generated_response})
+        store.append(chat_id, "assistant", generated_response)
 
 # --- Entry Point ---
 if __name__ == "__main__":
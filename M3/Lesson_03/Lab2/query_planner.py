@@ -0,0 +1,287 @@
+# import packages
+import json
+import re
+import numpy as np
+import pandas as pd
+
+from semantic_cache import normalize_question
+
+FILTER_OPS = ("==", "!=", ">", ">=", "<", "<=", "in", "not in", "contains")
+AGGREGATES = ("count", "mean", "sum", "min", "max", "median", "nunique")
+MAX_GROUP_BY = 2
+MAX_RESULT_ROWS = 50
+# Text columns with at most this many distinct values have them listed in the planner prompt
+MAX_LISTED_VALUES = 30
+
+PLANNER_PROMPT = """
+You translate questions about a table into a query spec. Return only a JSON query spec, no other text.
+
+Columns:
+{schema}
+
+The spec has this shape:
+{{"filters": [{{"column": "...", "op": "==", "value": "..."}}],
+  "group_by": ["..."],
+  "aggregate": {{"function": "mean", "column": "..."}},
+  "order": "desc",
+  "limit": 10}}
+
+- op is one of {ops}; use "in" and "not in" with a list of values and "contains" for text search
+- function is one of {aggregates}; "count" counts rows and needs no column
+- group_by has at most {max_group_by} columns and may be empty; order is "asc", "desc" or null
+- Use only the columns above, and for listed columns only the listed values
+- If the question cannot be answered with one such query, return {{"answerable": false}}
+
+<question>
+{question}
+</question>
+"""
+
+ANSWER_PROMPT = """
+Answer the question using only the exact result below, which was computed from the full table
+({matched_rows} matching rows). Quote the numbers as they are (rounding is fine) and do not add facts.
+
+<query>
+{spec}
+</query>
+
+<result>
+{result}
+</result>
+
+<question>
+{question}
+</question>
+
+Answer:
+"""
+
+
+class QuerySpecError(ValueError):
+    """The model's query spec is missing, malformed or does not fit the table."""
+
+
+# Helper function to describe the columns (type, range, listed values) for the planner prompt
+def describe_schema(df, max_values=MAX_LISTED_VALUES):
+    lines = []
+    for column in df.columns:
+        values = df[column]
+        if pd.api.types.is_bool_dtype(values):
+            lines.append(f"- {column} (true/false)")
+        elif pd.api.types.is_numeric_dtype(values):
+            if values.notna().any():
+                lines.append(f"- {column} (number, {values.min():.6g} to {values.max():.6g})")
+            else:
+                lines.append(f"- {column} (number, no values)")
+        elif pd.api.types.is_datetime64_any_dtype(values):
+            # min/max of an empty or all-NaT column is NaT, which cannot be formatted
+            if values.notna().any():
+                lines.append(f"- {column} (date, {values.min():%Y-%m-%d} to {values.max():%Y-%m-%d})")
+            else:
+                lines.append(f"- {column} (date, no values)")
+        else:
+            distinct = values.dropna().unique()
+            if len(distinct) <= max_values:
+                listed = ", ".join(json.dumps(str(v)) for v in sorted(distinct, key=str))
+                lines.append(f"- {column} (text): {listed}")
+            else:
+                lines.append(f"- {column} (free text)")
+    return "\n".join(lines)
+
+
+def planner_prompt(question, schema):
+    return PLANNER_PROMPT.format(
+        schema=schema, question=question, ops=", ".join(FILTER_OPS),
+        aggregates=", ".join(AGGREGATES), max_group_by=MAX_GROUP_BY,
+    ).strip()
+
+
+# Helper function to get the JSON object out of a model reply (which may add code fences)
+def parse_spec(text):
+    match = re.search(r"\{.*\}", text or "", flags=re.DOTALL)
+    if not match:
+        raise QuerySpecError("The model did not return a query spec")
+    try:
+        spec = json.loads(match.group(0))
+    except json.JSONDecodeError as e:
+        raise QuerySpecError(f"The query spec is not valid JSON: {e}") from None
+    if not isinstance(spec, dict):
+        raise QuerySpecError("The query spec must be a JSON object")
+    return spec
+
+
+# Helper function to match filter values to the column's type (and text values to their exact spelling)
+def _coerce_values(df, column, op, value):
+    values = value if isinstance(value, list) else [value]
+    if op in ("in", "not in") and not isinstance(value, list):
+        raise QuerySpecError(f'"{op}" needs a list of values')
+    if op not in ("in", "not in") and isinstance(value, list):
+        raise QuerySpecError(f'"{op}" needs a single value')
+
+    data = df[column]
+    is_text = not (pd.api.types.is_numeric_dtype(data) or pd.api.types.is_datetime64_any_dtype(data))
+    if is_text and op in (">", ">=", "<", "<="):
+        raise QuerySpecError(f'"{op}" needs a number or date column, not {column}')
+    try:
+        if pd.api.types.is_bool_dtype(data):
+            coerced = [v if isinstance(v, bool) else str(v).strip().lower() in ("true", "1", "yes") for v in values]
+        elif pd.api.types.is_numeric_dtype(data):
+            coerced = [float(v) for v in values]
+        elif pd.api.types.is_datetime64_any_dtype(data):
+            coerced = [pd.Timestamp(v) for v in values]
+        elif op == "contains":
+            coerced = [str(v) for v in values]
+        else:
+            # Case-insensitive match against the distinct values, so "alpine skis" finds "Alpine Skis"
+            known = {str(v).casefold(): v for v in data.dropna().unique()}
+            coerced = [known.get(str(v).casefold()) for v in values]
+    except (TypeError, ValueError):
+        raise QuerySpecError(f"Bad value for {column}: {value!r}") from None
+    if None in coerced:
+        raise QuerySpecError(f"{values[coerced.index(None)]!r} is not a value of {column}")
+    return coerced if isinstance(value, list) else coerced[0]
+
+
+# Function to check a query spec against the table and normalize it
+def validate_spec(spec, df):
+    """Returns a normalized copy of spec; raises QuerySpecError if it cannot run on df."""
+    if spec.get("answerable") is False:
+        raise QuerySpecError("The question cannot be answered with a single query")
+
+    def check_column(column):
+        if not isinstance(column, str) or column not in df.columns:
+            raise QuerySpecError(f"Unknown column: {column!r}")
+        return column
+
+    filters = []
+    filter_items = spec.get("filters") or []
+    if not isinstance(filter_items, list):
+        raise QuerySpecError("The filters must be a list")
+    for item in filter_items:
+        if not isinstance(item, dict):
+            raise QuerySpecError("Each filter must be an object")
+        column = check_column(item.get("column"))
+        op = str(item.get("op", "==")).lower()
+        if op not in FILTER_OPS:
+            raise QuerySpecError(f"Unsupported filter operator: {op!r}")
+        filters.append({"column": column, "op": op, "value": _coerce_values(df, column, op, item.get("value"))})
+
+    group_by = spec.get("group_by") or []
+    if isinstance(group_by, str):
+        group_by = [group_by]
+    if not isinstance(group_by, list):
+        raise QuerySpecError("group_by must be a list of columns")
+    if len(group_by) > MAX_GROUP_BY:
+        raise QuerySpecError(f"At most {MAX_GROUP_BY} group-by columns are supported")
+    group_by = [check_column(column) for column in group_by]
+
+    aggregate = spec.get("aggregate") or {"function": "count"}
+    if isinstance(aggregate, str):
+        aggregate = {"function": aggregate}
+    if not isinstance(aggregate, dict):
+        raise QuerySpecError("The aggregate must be an object")
+    function = str(aggregate.get("function", "count")).lower()
+    if function not in AGGREGATES:
+        raise QuerySpecError(f"Unsupported aggregate: {function!r}")
+    column = aggregate.get("column")
+    if function == "count":
+        column = None
+    else:
+        check_column(column)
+        if function in ("mean", "sum", "median") and not pd.api.types.is_numeric_dtype(df[column]):
+            raise QuerySpecError(f"{function} needs a number column, not {column}")
+
+    order = spec.get("order")
+    if order not in (None, "asc", "desc"):
+        raise QuerySpecError(f"Unsupported order: {order!r}")
+    try:
+        limit = min(int(spec.get("limit") or MAX_RESULT_ROWS), MAX_RESULT_ROWS)
+    except (TypeError, ValueError):
+        raise QuerySpecError(f"Bad limit: {spec.get('limit')!r}") from None
+
+    return {"filters": filters, "group_by": group_by, "aggregate": {"function": function, "column": column},
+            "order": order, "limit": max(1, limit)}
+
+
+# Helper function to build the boolean row mask of one filter
+def _filter_mask(data, op, value):
+    if op == "==":
+        return (data == value).to_numpy(dtype=bool, na_value=False)
+    if op == "!=":
+        return (data != value).to_numpy(dtype=bool, na_value=True)
+    if op == "in":
+        return data.isin(value).to_numpy()
+    if op == "not in":
+        return ~data.isin(value).to_numpy()
+    if op == "contains":
+        return data.astype("string").str.contains(value, case=False, regex=False, na=False).to_numpy(dtype=bool)
+    compare = {">": np.greater, ">=": np.greater_equal, "<": np.less, "<=": np.less_equal}[op]
+    return compare(data, value).to_numpy(dtype=bool, na_value=False)
+
+
+# Function to run a validated spec on the table with vectorized filters and a single group-by
+def run_spec(spec, df):
+    """Returns (result DataFrame of at most spec["limit"] rows, number of rows matching the filters)."""
+    mask = np.ones(len(df), dtype=bool)
+    for item in spec["filters"]:
+        mask &= _filter_mask(df[item["column"]], item["op"], item["value"])
+    matched_rows = int(mask.sum())
+
+    function, column = spec["aggregate"]["function"], spec["aggregate"]["column"]
+    name = "count" if function == "count" else f"{function}({column})"
+    # Only the columns the query needs are taken from the matching rows
+    columns = list(dict.fromkeys(spec["group_by"] + ([column] if column else [])))
+    rows = df.loc[mask, columns] if columns else None
+
+    if spec["group_by"]:
+        grouped = rows.groupby(spec["group_by"], observed=True, dropna=False)
+        values = grouped.size() if function == "count" else grouped[column].agg(function)
+        result = values.rename(name)
+        if spec["order"]:
+            result = result.sort_values(ascending=spec["order"] == "asc")
+        result = result.head(spec["limit"]).reset_index()
+    else:
+        value = matched_rows if function == "count" else rows[column].agg(function)
+        result = pd.DataFrame({name: [value]})
+    return result, matched_rows
+
+
+def answer_prompt(question, spec, result, matched_rows):
+    return ANSWER_PROMPT.format(
+        question=question, spec=json.dumps(spec, default=str), result=result.to_string(index=False),
+        matched_rows=matched_rows,
+    ).strip()
+
+
+# Helper function to get a cache key that is equal only for the same validated query
+def spec_key(spec):
+    return json.dumps(spec, sort_keys=True, default=str)
+
+
+# Helper function to get the cache key of a worded answer: the same query asked with the same (normalized) question
+def answer_key(spec, question):
+    return f"{spec_key(spec)}\n{normalize_question(question)}"
+
+
+# Function to answer a data question from an exact local query instead of the whole table
+def answer_with_planner(question, df, complete, schema=None, answer_cache=None):
+    """Answers with two small model calls: one plans the query, one phrases its result.
+
+    complete(prompt) returns the model's reply. schema is describe_schema(df),
+    which callers can cache. answer_cache(key, compute), if given, returns
+    (answer, hit) for answer_key(spec, question), for example
+    SemanticCache.answer_exact. The answer is worded for its question, so it is
+    only reused when the same question plans to the same query; pass no
+    answer_cache when the question carries chat history.
+    Returns (answer, details dict with spec, result, matched_rows and
+    cache_hit); raises QuerySpecError when the question cannot be planned, so
+    the caller can fall back to another way of answering.
+    """
+    spec = validate_spec(parse_spec(complete(planner_prompt(question, schema or describe_schema(df)))), df)
+    result, matched_rows = run_spec(spec, df)
+
+    def phrase_answer():
+        return complete(answer_prompt(question, spec, result, matched_rows))
+
+    answer, hit = answer_cache(answer_key(spec, question), phrase_answer) if answer_cache else (phrase_answer(), None)
+    return answer, {"spec": spec, "result": result, "matched_rows": matched_rows, "cache_hit": hit}
@@ -0,0 +1,258 @@
+# import packages
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+CORTEX_EMBED_MODEL = "snowflake-arctic-embed-m-v1.5"
+# Near-match threshold per embedder; None turns near-matching off, so only repeats of the same
+# (normalized) question are served from the cache. Measure an embedder with threshold_report().
+# The hashed embedder scores questions about other entities ("... Pro Ski Boots" / "... Ski Boots",
+# "North America" / "South America") at 0.83-0.93 and real paraphrases ("what do people think of
+# goggles?" / "goggles reviews?") at 0.29-0.66, so no threshold separates them.
+EMBEDDER_THRESHOLDS = {"cortex": 0.92, "hashed": None}
+DEFAULT_THRESHOLD = EMBEDDER_THRESHOLDS["cortex"]
+
+# Labelled question pairs for calibrating a threshold: (question, question, same answer?)
+CALIBRATION_PAIRS = [
+    ("What do people think of goggles?", "goggles reviews?", True),
+    ("What is the average sentiment for skis?", "Average sentiment of skis", True),
+    ("How many reviews are there for Ski Boots?", "How many Ski Boots reviews are there?", True),
+    ("Which product has the worst reviews?", "What product is rated lowest?", True),
+    ("How many shipments were late in Europe?", "Number of late shipments in Europe", True),
+    ("Which region has the most delivery issues?", "Where do most delivery problems happen?", True),
+    ("What do customers complain about for Snowboards?", "Common complaints about snowboards", True),
+    ("Is the sentiment for goggles positive?", "Do customers like the goggles?", True),
+    ("How many reviews for Pro Ski Boots", "How many reviews for Ski Boots", False),
+    ("How many late shipments in North America?", "How many late shipments in South America?", False),
+    ("What is the average sentiment for skis?", "What is the average sentiment for goggles?", False),
+    ("Which product has the best reviews?", "Which product has the worst reviews?", False),
+    ("How many reviews in 2023?", "How many reviews in 2024?", False),
+    ("What is the highest sentiment score?", "What is the lowest sentiment score?", False),
+    ("How many shipments were delivered in Asia?", "How many shipments were late in Asia?", False),
+    ("Average sentiment for Alpine Skis in Europe", "Average sentiment for Alpine Skis in Asia", False),
+]
+
+
+# Helper function to normalize a question for exact matching
+def normalize_question(question):
+    return " ".join(re.sub(r"[^\w\s]", " ", question.lower()).split())
+
+
+# Helper function to embed text locally with hashed words and character trigrams (no model call)
+def hashed_embedding(text, dim=512):
+    vector = np.zeros(dim, dtype=np.float32)
+    for word in normalize_question(text).split():
+        padded = f" {word} "
+        features = [word] + [padded[i:i + 3] for i in range(len(padded) - 2)]
+        for feature in features:
+            h = zlib.crc32(feature.encode("utf-8"))
+            vector[h % dim] += 1.0 if h & 0x80000000 else -1.0
+    return vector
+
+
+# Helper function to embed a question with Snowflake Cortex
+def cortex_embedding(session, text, model=CORTEX_EMBED_MODEL):
+    row = session.sql("SELECT SNOWFLAKE.CORTEX.EMBED_TEXT_768(?, ?)", params=[model, text]).collect()[0]
+    return np.asarray(row[0], dtype=np.float32)
+
+
+# Function to measure how well an embedder separates paraphrases from different questions
+def threshold_report(embed, pairs=CALIBRATION_PAIRS, thresholds=(0.8, 0.85, 0.9, 0.92, 0.95, 0.98)):
+    """Returns a DataFrame with, per threshold, the share of paraphrase pairs that hit (hit_rate)
+    and the share of different-question pairs that would wrongly hit (false_hit_rate)."""
+    similarities, same = [], []
+    for first, second, is_same in pairs:
+        a, b = SemanticCache._normalize(embed(first)), SemanticCache._normalize(embed(second))
+        similarities.append(float(a @ b))
+        same.append(is_same)
+    similarities, same = np.array(similarities), np.array(same)
+    return pd.DataFrame([
+        {"threshold": t, "hit_rate": (similarities[same] >= t).mean(), "false_hit_rate": (similarities[~same] >= t).mean()}
+        for t in thresholds
+    ])
+
+
+# Helper function to get a short version string for a DataFrame's content
+def dataset_version(df):
+    return f"{len(df)}-{int(pd.util.hash_pandas_object(df, index=False).sum()) & 0xFFFFFFFF:08x}"
+
+
+class SemanticCache:
+    """Answers keyed by question similarity, shared by every session.
+
+    Questions are embedded and compared by cosine similarity; an answer is
+    reused when a previous question in the same scope (for example dataset
+    version and model) is at least `threshold` similar. Candidates are found
+    with random-hyperplane LSH: each of `n_tables` tables hashes a vector to
+    `n_bits` sign bits, and only entries sharing a bucket in some table are
+    compared exactly. Entries expire after `ttl` seconds and the least
+    recently used are evicted beyond `max_entries`. With threshold None only
+    exact (normalized) repeats are matched and nothing is embedded.
+    """
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD, ttl=3600, max_entries=500, n_tables=16, n_bits=8, seed=0):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.n_tables = n_tables
+        self.n_bits = n_bits
+        self.seed = seed
+        self._planes = None
+        self._entries = OrderedDict()
+        self._buckets = {}
+        self._exact = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.counters = {"lookups": 0, "hits": 0, "exact_hits": 0, "misses": 0,
+                         "evictions": 0, "expirations": 0, "embed_errors": 0}
+
+    # Helper function to get the LSH bucket keys of a normalized vector
+    def _bucket_keys(self, scope, vector):
+        if self._planes is None:
+            rng = np.random.default_rng(self.seed)
+            self._planes = rng.standard_normal((self.n_tables, self.n_bits, len(vector))).astype(np.float32)
+        bits = (self._planes @ vector) > 0
+        codes = bits @ (1 << np.arange(self.n_bits))
+        return [(scope, table, int(code)) for table, code in enumerate(codes)]
+
+    @staticmethod
+    def _normalize(vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _remove(self, entry_id):
+        entry = self._entries.pop(entry_id)
+        for key in entry["buckets"]:
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(entry_id)
+                if not bucket:
+                    del self._buckets[key]
+        if self._exact.get((entry["scope"], entry["normalized"])) == entry_id:
+            del self._exact[(entry["scope"], entry["normalized"])]
+
+    def _expire(self, now):
+        expired = [entry_id for entry_id, entry in self._entries.items() if now - entry["created"] > self.ttl]
+        for entry_id in expired:
+            self._remove(entry_id)
+        self.counters["expirations"] += len(expired)
+
+    def _hit(self, entry_id, similarity, exact):
+        entry = self._entries[entry_id]
+        entry["hits"] += 1
+        self._entries.move_to_end(entry_id)
+        self.counters["hits"] += 1
+        self.counters["exact_hits"] += exact
+        return {"answer": entry["answer"], "question": entry["question"], "similarity": similarity}
+
+    def lookup_exact(self, question, scope):
+        """Returns a hit dict for the same question (after normalization) in scope, or None."""
+        return self._lookup_key(normalize_question(question), scope, count_miss=False)
+
+    def _lookup_key(self, key, scope, count_miss):
+        with self._lock:
+            self._expire(time.time())
+            entry_id = self._exact.get((scope, key))
+            if entry_id is None:
+                if count_miss:
+                    self.counters["lookups"] += 1
+                    self.counters["misses"] += 1
+                return None
+            self.counters["lookups"] += 1
+            return self._hit(entry_id, 1.0, exact=True)
+
+    def lookup(self, vector, scope):
+        """Returns {answer, question, similarity} for the most similar cached question, or None."""
+        if self.threshold is None:
+            return None
+        vector = self._normalize(vector)
+        with self._lock:
+            self._expire(time.time())
+            self.counters["lookups"] += 1
+            candidates = set()
+            for key in self._bucket_keys(scope, vector):
+                candidates |= self._buckets.get(key, set())
+            best_id, best_similarity = None, self.threshold
+            for entry_id in candidates:
+                similarity = float(self._entries[entry_id]["vector"] @ vector)
+                if similarity >= best_similarity:
+                    best_id, best_similarity = entry_id, similarity
+            if best_id is None:
+                self.counters["misses"] += 1
+                return None
+            return self._hit(best_id, best_similarity, exact=False)
+
+    def add(self, vector, scope, question, answer, key=None):
+        """Stores an answer; with vector None it can only be found by its exact key (default: the normalized question)."""
+        vector = None if vector is None else self._normalize(vector)
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            buckets = [] if vector is None else self._bucket_keys(scope, vector)
+            normalized = normalize_question(question) if key is None else key
+            self._entries[entry_id] = {
+                "scope": scope, "question": question, "normalized": normalized, "vector": vector,
+                "answer": answer, "created": time.time(), "hits": 0, "buckets": buckets,
+            }
+            for bucket in buckets:
+                self._buckets.setdefault(bucket, set()).add(entry_id)
+            self._exact[(scope, normalized)] = entry_id
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.counters["evictions"] += 1
+
+    def answer(self, question, scope, embed, compute, should_cache=None):
+        """Returns (answer, hit) where hit is the lookup result or None if compute() was called.
+
+        embed(question) returns a vector; if it fails the answer is computed and not cached.
+        should_cache(answer) can reject answers such as error messages.
+        """
+        if self.threshold is None:
+            return self.answer_exact(normalize_question(question), scope, compute, should_cache)
+        hit = self.lookup_exact(question, scope)
+        if hit is not None:
+            return hit["answer"], hit
+        try:
+            vector = embed(question)
+        except Exception:
+            with self._lock:
+                self.counters["embed_errors"] += 1
+            return compute(), None
+        hit = self.lookup(vector, scope)
+        if hit is not None:
+            return hit["answer"], hit
+        result = compute()
+        if should_cache is None or should_cache(result):
+            self.add(vector, scope, question, result)
+        return result, None
+
+    def answer_exact(self, key, scope, compute, should_cache=None):
+        """Like answer(), but only reuses an answer stored under the same key, never a similar one.
+
+        For answers that must not be shared between questions that merely read
+        alike, such as exact query results keyed by their validated query spec.
+        """
+        hit = self._lookup_key(key, scope, count_miss=True)
+        if hit is not None:
+            return hit["answer"], hit
+        result = compute()
+        if should_cache is None or should_cache(result):
+            self.add(None, scope, key, result, key=key)
+        return result, None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+            self._exact.clear()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters, entries=len(self._entries))
+        stats["hit_rate"] = stats["hits"] / stats["lookups"] if stats["lookups"] else 0.0
+        return stats
@@ -0,0 +1,135 @@
+# import packages
+import glob
+import json
+import os
+import re
+import tempfile
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+import pyarrow as pa
+
+try:
+    import fcntl
+except ImportError:  # Windows: publishing is still atomic, two workers may just both build a version
+    fcntl = None
+
+DEFAULT_DIR = os.getenv("SHARED_DATASET_DIR") or os.path.join(tempfile.gettempdir(), "streamlit_shared_datasets")
+
+
+# Helper function to turn a file's size and modification time into a version string
+def file_version(path):
+    stat = os.stat(path)
+    return f"{stat.st_size}-{stat.st_mtime_ns}"
+
+
+class SharedDatasetStore:
+    """Columnar snapshots shared by every Streamlit process on the host.
+
+    A dataset is published once as an uncompressed Arrow IPC file, and every
+    process memory-maps it instead of loading its own copy, so the pages are
+    shared through the OS page cache. `<name>.json` is a manifest naming the
+    current version; it is replaced atomically, so readers see either the old
+    or the new version, never a half-written one. Files of older versions are
+    removed after the next publish; processes that still have one mapped keep
+    reading it until they attach to the new version.
+    """
+
+    def __init__(self, directory=DEFAULT_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._attached = {}
+
+    def _manifest_path(self, name):
+        return os.path.join(self.directory, f"{name}.json")
+
+    @contextmanager
+    def _publish_lock(self, name):
+        # Only one process builds and publishes a version; the others wait and then attach
+        with open(os.path.join(self.directory, f"{name}.lock"), "w") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def manifest(self, name):
+        """Returns the manifest dict of the published version, or None."""
+        try:
+            with open(self._manifest_path(name)) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def publish(self, name, table, version):
+        """Writes table (a pyarrow.Table or DataFrame) as the current version of name."""
+        if isinstance(table, pd.DataFrame):
+            table = pa.Table.from_pandas(table, preserve_index=False)
+        # One chunk per column, so readers can view every column as a single array
+        table = table.combine_chunks()
+        safe_version = re.sub(r"[^\w.-]", "_", str(version))
+        path = os.path.join(self.directory, f"{name}-{safe_version}.arrow")
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with pa.OSFile(temp_path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(temp_path, path)
+
+        previous = self.manifest(name)
+        manifest = {"version": str(version), "path": os.path.basename(path), "rows": table.num_rows,
+                    "published_at": time.time()}
+        temp_manifest = f"{self._manifest_path(name)}.{os.getpid()}.tmp"
+        with open(temp_manifest, "w") as f:
+            json.dump(manifest, f)
+        os.replace(temp_manifest, self._manifest_path(name))
+
+        # Keep the current and the previous file; older ones are no longer referenced
+        keep = {manifest["path"], previous["path"] if previous else None}
+        for old_path in glob.glob(os.path.join(self.directory, f"{name}-*.arrow")):
+            if os.path.basename(old_path) not in keep:
+                try:
+                    os.remove(old_path)
+                except OSError:
+                    pass
+        return manifest
+
+    def attach(self, name, version=None):
+        """Returns the published table, memory-mapped (zero-copy), or None.
+
+        With version given, returns None unless that version is the published one.
+        """
+        manifest = self.manifest(name)
+        if manifest is None or (version is not None and manifest["version"] != str(version)):
+            return None
+        key = (name, manifest["version"])
+        if key not in self._attached:
+            source = pa.memory_map(os.path.join(self.directory, manifest["path"]), "r")
+            self._attached = {k: v for k, v in self._attached.items() if k[0] != name}
+            self._attached[key] = pa.ipc.open_file(source).read_all()
+        return self._attached[key]
+
+    def get_or_publish(self, name, version, load):
+        """Attaches to version of name, calling load() and publishing it first if needed."""
+        table = self.attach(name, version)
+        if table is not None:
+            return table
+        with self._publish_lock(name):
+            # Another process may have published while we waited for the lock
+            table = self.attach(name, version)
+            if table is None:
+                self.publish(name, load(), version)
+                table = self.attach(name, version)
+        return table
+
+
+# Helper function to view a shared table as a DataFrame without copying its buffers
+def to_frame(table):
+    """Returns a new DataFrame over the mapped data, with the same dtypes as read_csv.
+
+    split_blocks keeps each numeric column as a read-only view of its Arrow
+    buffer instead of consolidating them into a copied block, and strings stay
+    Arrow-backed. Adding columns to the result does not affect other callers.
+    """
+    return table.to_pandas(split_blocks=True)
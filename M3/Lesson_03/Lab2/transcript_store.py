@@ -0,0 +1,128 @@
+# import packages
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+
+DEFAULT_PATH = os.getenv("CHAT_TRANSCRIPT_DB") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), ".chat_transcripts.sqlite"
+)
+
+
+class TranscriptStore:
+    """Chat transcripts in SQLite, shared by every session in the process.
+
+    Every message is written to the database as it is added, and only the
+    last `tail_size` messages of each active conversation are kept in memory,
+    which is all a rerun needs to draw the latest turns and build the prompt
+    history. Older messages are read from the database on request, one page
+    at a time. Conversations idle for more than `idle_seconds` are dropped
+    from memory (not from the database) by evict_idle(), and conversations
+    not touched for `max_age_days` are deleted when the store opens.
+    """
+
+    def __init__(self, path=DEFAULT_PATH, tail_size=50, idle_seconds=1800, max_age_days=30):
+        self.path = path
+        self.tail_size = tail_size
+        self.idle_seconds = idle_seconds
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS messages ("
+            "chat_id TEXT, seq INTEGER, role TEXT, content TEXT, created_at REAL, "
+            "PRIMARY KEY (chat_id, seq))"
+        )
+        self.connection.execute(
+            "DELETE FROM messages WHERE chat_id IN ("
+            "SELECT chat_id FROM messages GROUP BY chat_id HAVING MAX(created_at) < ?)",
+            [time.time() - max_age_days * 86400],
+        )
+        self.connection.commit()
+        # chat id -> {"tail": deque of the newest messages, "count": total messages, "used": last access}
+        self._tails = OrderedDict()
+        self._lock = threading.Lock()
+        self.evicted = 0
+
+    @staticmethod
+    def new_chat_id():
+        return uuid.uuid4().hex
+
+    def _tail(self, chat_id):
+        """Returns the in-memory tail of a conversation, loading it from the database if needed."""
+        entry = self._tails.get(chat_id)
+        if entry is None:
+            rows = self.connection.execute(
+                "SELECT seq, role, content FROM messages WHERE chat_id = ? ORDER BY seq DESC LIMIT ?",
+                [chat_id, self.tail_size],
+            ).fetchall()
+            count = rows[0][0] + 1 if rows else 0
+            tail = deque(({"seq": s, "role": r, "content": c} for s, r, c in reversed(rows)), maxlen=self.tail_size)
+            entry = self._tails[chat_id] = {"tail": tail, "count": count}
+        entry["used"] = time.time()
+        self._tails.move_to_end(chat_id)
+        return entry
+
+    def append(self, chat_id, role, content):
+        """Adds a message to the end of the conversation and returns its sequence number."""
+        with self._lock:
+            entry = self._tail(chat_id)
+            seq = entry["count"]
+            self.connection.execute(
+                "INSERT INTO messages VALUES (?, ?, ?, ?, ?)", [chat_id, seq, role, content, time.time()]
+            )
+            self.connection.commit()
+            entry["tail"].append({"seq": seq, "role": role, "content": content})
+            entry["count"] += 1
+            return seq
+
+    def count(self, chat_id):
+        with self._lock:
+            return self._tail(chat_id)["count"]
+
+    def recent(self, chat_id, n):
+        """Returns the last n messages, oldest first, as dicts with seq, role and content."""
+        if n <= 0:
+            return []
+        with self._lock:
+            entry = self._tail(chat_id)
+            if n <= len(entry["tail"]) or entry["count"] <= len(entry["tail"]):
+                return list(entry["tail"])[-n:]
+        return self.before(chat_id, self.count(chat_id), n)
+
+    def before(self, chat_id, seq, n):
+        """Returns up to n messages with a sequence number below seq, oldest first."""
+        with self._lock:
+            rows = self.connection.execute(
+                "SELECT seq, role, content FROM messages WHERE chat_id = ? AND seq < ? ORDER BY seq DESC LIMIT ?",
+                [chat_id, seq, n],
+            ).fetchall()
+        return [{"seq": s, "role": r, "content": c} for s, r, c in reversed(rows)]
+
+    def clear(self, chat_id):
+        """Deletes a conversation from memory and from the database."""
+        with self._lock:
+            self._tails.pop(chat_id, None)
+            self.connection.execute("DELETE FROM messages WHERE chat_id = ?", [chat_id])
+            self.connection.commit()
+
+    def evict_idle(self):
+        """Drops the in-memory tails of idle conversations; returns how many were dropped."""
+        cutoff = time.time() - self.idle_seconds
+        dropped = 0
+        with self._lock:
+            # Tails are kept in order of last use, so the idle ones are at the front
+            while self._tails and next(iter(self._tails.values()))["used"] < cutoff:
+                self._tails.popitem(last=False)
+                dropped += 1
+            self.evicted += dropped
+        return dropped
+
+    def stats(self):
+        with self._lock:
+            return {
+                "active_chats": len(self._tails),
+                "messages_in_memory": sum(len(entry["tail"]) for entry in self._tails.values()),
+                "evicted": self.evicted,
+            }